@@ -0,0 +1,111 @@
+"""
+Compare break analytics computed by scanning BreakLog at request time with
+the pre-aggregated hourly buckets and daily rollups, as the number of logs
+grows.
+
+    python -m benchmarks.bench_analytics --sizes 100000 1000000 --users 100
+"""
+
+import argparse
+from datetime import timedelta, timezone as dt_timezone
+
+from benchmarks.common import create_users, measure, report, test_database
+
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+from django.utils import timezone
+
+from breaks.analytics import break_analytics
+from breaks.models import BreakDailyRollup, BreakHourlyBucket, BreakLog
+from breaks.retention import rollup_daily_breaks
+
+# Each user's logs are spread back from now at this spacing (a 60-minute interval),
+# so larger sizes reach further back.
+SPACING = timedelta(minutes=60)
+
+
+def populate(users, start, count, now):
+    for offset in range(start, start + count, 50000):
+        BreakLog.objects.bulk_create(
+            (
+                BreakLog(
+                    user=users[i % len(users)],
+                    triggered_at=now - SPACING * (i // len(users)),
+                )
+                for i in range(offset, min(offset + 50000, start + count))
+            ),
+            batch_size=5000,
+        )
+
+
+def rebuild_aggregates():
+    BreakDailyRollup.objects.all().delete()
+    rollup_daily_breaks()
+
+    BreakHourlyBucket.objects.all().delete()
+    counts = (
+        BreakLog.objects.annotate(hour=TruncHour('triggered_at', tzinfo=dt_timezone.utc))
+        .values('user_id', 'hour')
+        .annotate(breaks=Count('id'))
+        .order_by()
+    )
+    BreakHourlyBucket.objects.bulk_create(
+        (BreakHourlyBucket(**row) for row in counts.iterator()), batch_size=5000
+    )
+
+
+def raw_scan(since, until, bucket, user=None):
+    truncate = {
+        'hour': TruncHour('triggered_at', tzinfo=dt_timezone.utc),
+        'day': TruncDay('triggered_at', tzinfo=dt_timezone.utc),
+        'week': TruncWeek('triggered_at', tzinfo=dt_timezone.utc),
+    }[bucket]
+    logs = BreakLog.objects.filter(triggered_at__gte=since, triggered_at__lt=until)
+    if user is not None:
+        logs = logs.filter(user=user)
+    return list(logs.annotate(start=truncate).values('start').annotate(breaks=Count('id')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--users', type=int, default=100)
+    args = parser.parse_args()
+
+    queries = [
+        ('user/hour/2d', 'hour', timedelta(days=2), True),
+        ('user/day/30d', 'day', timedelta(days=30), True),
+        ('user/week/1y', 'week', timedelta(days=365), True),
+        ('all/day/30d', 'day', timedelta(days=30), False),
+        ('all/week/1y', 'week', timedelta(days=365), False),
+    ]
+
+    rows = []
+    with test_database():
+        users = create_users(args.users)
+        now = timezone.now()
+        populated = 0
+        for size in sorted(args.sizes):
+            populate(users, populated, size - populated, now)
+            populated = size
+            rebuild_aggregates()
+
+            for name, bucket, window, per_user in queries:
+                user = users[0] if per_user else None
+                since = now - window
+                with measure() as raw:
+                    raw_scan(since, now, bucket, user)
+                with measure() as aggregated:
+                    break_analytics(since, now, bucket, user)
+                rows.append({
+                    'logs': size,
+                    'query': name,
+                    'raw_scan_s': f"{raw['seconds']:.4f}",
+                    'aggregates_s': f"{aggregated['seconds']:.4f}",
+                })
+
+    report("Break analytics latency", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
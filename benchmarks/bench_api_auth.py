@@ -0,0 +1,63 @@
+"""
+Compare API requests/sec through the full middleware stack under session
+authentication and signed-token authentication, with and without the
+token -> user cache.
+
+    python -m benchmarks.bench_api_auth --requests 2000
+"""
+
+import argparse
+
+from benchmarks.common import create_users, measure, report, test_database
+
+from django.core.cache import cache
+from django.test import Client
+from django.test.utils import override_settings
+
+from breaks.authentication import issue_token
+from breaks.models import BreakInterval
+
+ENDPOINT = '/api/break-intervals/'
+
+
+def run(name, client, requests, **headers):
+    client.get(ENDPOINT, **headers)
+    with measure() as stats:
+        for _ in range(requests):
+            response = client.get(ENDPOINT, **headers)
+            assert response.status_code == 200, response.status_code
+    return {
+        'auth': name,
+        'requests': requests,
+        'queries_per_req': f"{stats['queries'] / requests:.1f}",
+        'seconds': f"{stats['seconds']:.2f}",
+        'req_per_s': f"{requests / stats['seconds']:.0f}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = []
+    with test_database():
+        user = create_users(1)[0]
+        BreakInterval.objects.create(user=user)
+
+        session_client = Client()
+        session_client.force_login(user)
+        rows.append(run('session', session_client, args.requests))
+
+        bearer = {'HTTP_AUTHORIZATION': f"Bearer {issue_token(user)}"}
+        with override_settings(API_TOKEN_CACHE_SECONDS=0):
+            rows.append(run('token', Client(), args.requests, **bearer))
+
+        cache.clear()
+        rows.append(run('token_cached', Client(), args.requests, **bearer))
+
+    report("GET /api/break-intervals/", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
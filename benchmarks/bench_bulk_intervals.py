@@ -0,0 +1,80 @@
+"""
+Compare rows/sec and queries of onboarding users one POST at a time through
+BreakIntervalViewSet vs. the bulk endpoint (chunked bulk_create/bulk_update),
+for a first import and for re-importing the same users with new intervals.
+
+    python -m benchmarks.bench_bulk_intervals --sizes 500 5000
+"""
+
+import argparse
+
+from benchmarks.common import create_users, measure, report, test_database
+
+from rest_framework.test import APIClient
+
+from breaks.models import BreakInterval
+
+SINGLE_ENDPOINT = '/api/break-intervals/'
+BULK_ENDPOINT = '/api/break-intervals/bulk/'
+
+
+def single_path(users, interval_minutes):
+    client = APIClient()
+    for user in users:
+        client.force_authenticate(user)
+        response = client.post(SINGLE_ENDPOINT, {'interval_minutes': interval_minutes})
+        assert response.status_code == 201, response.status_code
+
+
+def bulk_path(admin, users, interval_minutes):
+    client = APIClient()
+    client.force_authenticate(admin)
+    response = client.post(BULK_ENDPOINT, [
+        {'username': user.username, 'interval_minutes': interval_minutes} for user in users
+    ], format='json')
+    assert response.status_code == 200 and not response.data['errors'], response.data
+
+
+def row(path, size, stats):
+    return {
+        'path': path,
+        'rows': size,
+        'queries': stats['queries'],
+        'seconds': f"{stats['seconds']:.2f}",
+        'rows_per_s': f"{size / stats['seconds']:.0f}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000])
+    args = parser.parse_args()
+
+    rows = []
+    with test_database():
+        admin = create_users(1, prefix='admin')[0]
+        admin.is_staff = True
+        admin.save()
+
+        for size in args.sizes:
+            users = create_users(size, prefix='single')
+            with measure() as stats:
+                single_path(users, 30)
+            rows.append(row('single_create', size, stats))
+
+            users = create_users(size, prefix='bulk')
+            with measure() as stats:
+                bulk_path(admin, users, 30)
+            rows.append(row('bulk_create', size, stats))
+
+            with measure() as stats:
+                bulk_path(admin, users, 45)
+            rows.append(row('bulk_update', size, stats))
+
+            BreakInterval.objects.all().delete()
+
+    report("Break interval onboarding", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
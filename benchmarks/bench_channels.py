@@ -0,0 +1,82 @@
+"""
+Compare the time to deliver one batch of reminders on email, webhook and
+in-app channels when the channels are sent one after another vs. routed
+in parallel by route_reminders, against local SMTP and HTTP sinks that add
+a fixed per-message latency.
+
+    python -m benchmarks.bench_channels --users 200 --latency 0.01
+"""
+
+import argparse
+import time
+
+from benchmarks.common import (
+    create_users,
+    local_smtp_server,
+    local_webhook_server,
+    report,
+    test_database,
+)
+
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+
+from breaks.models import BreakInterval, Notification
+from breaks.notifications import Reminder, get_transports, route_reminders
+
+
+def sequential(reminders):
+    return {
+        channel: len(reminders) - len(transport.send(reminders))
+        for channel, transport in get_transports().items()
+    }
+
+
+def routed(reminders):
+    return route_reminders(reminders).sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--webhook-concurrency', type=int, nargs='+', default=[1, 20])
+    args = parser.parse_args()
+
+    rows = []
+    with test_database(), local_smtp_server(latency=args.latency), \
+            local_webhook_server(latency=args.latency) as webhook:
+        users = create_users(args.users)
+        BreakInterval.objects.bulk_create(
+            BreakInterval(
+                user=user, channels=['email', 'webhook', 'in_app'], webhook_url=webhook.url,
+            )
+            for user in users
+        )
+        users = list(User.objects.filter(id__in=[user.id for user in users])
+                     .select_related('breakinterval'))
+        reminders = [Reminder(user, "Time for a break!", "Take a few minutes.") for user in users]
+
+        for concurrency in args.webhook_concurrency:
+            with override_settings(WEBHOOK_CONCURRENCY=concurrency):
+                for name, deliver in (('sequential', sequential), ('routed', routed)):
+                    start = time.perf_counter()
+                    sent = deliver(reminders)
+                    seconds = time.perf_counter() - start
+
+                    assert all(count == len(reminders) for count in sent.values()), sent
+                    rows.append({
+                        'channels': name,
+                        'webhook_threads': concurrency,
+                        'deliveries': sum(sent.values()),
+                        'seconds': f"{seconds:.2f}",
+                        'reminders_per_s': f"{len(reminders) / seconds:.0f}",
+                    })
+                    Notification.objects.all().delete()
+
+    report(f"Multi-channel delivery ({args.latency * 1000:.0f} ms sink latency)", rows,
+           list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
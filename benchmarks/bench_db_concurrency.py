@@ -0,0 +1,94 @@
+"""
+Measure BreakLog write throughput when several processes record reminder
+batches at once, as concurrent Celery workers do, on the configured
+database backend (DB_ENGINE).
+
+    python -m benchmarks.bench_db_concurrency --processes 1 4 8
+    DB_ENGINE=postgres DB_POOL_MAX_SIZE=4 python -m benchmarks.bench_db_concurrency
+
+On SQLite the test database is a file next to db.sqlite3 so every process
+shares it; --journal-mode delete compares against SQLite's default journal.
+"""
+
+import argparse
+import multiprocessing
+import time
+
+from benchmarks.common import create_users, report, test_database
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections
+
+from breaks.tasks import record_reminders
+
+
+def write_batches(users, batches, results):
+    failures = 0
+    for _ in range(batches):
+        try:
+            record_reminders(users)
+        except OperationalError:
+            failures += 1
+    connections.close_all()
+    results.put(failures)
+
+
+def run(processes, users_per_process, batches):
+    users = create_users(processes * users_per_process)
+    # Children must open their own connections rather than share the parent's.
+    connections.close_all()
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [
+        context.Process(target=write_batches, args=(
+            users[i * users_per_process:(i + 1) * users_per_process], batches, results,
+        ))
+        for i in range(processes)
+    ]
+
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    failures = sum(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    written = (processes * batches - failures) * users_per_process
+    return {
+        'backend': connection.vendor,
+        'processes': processes,
+        'logs': written,
+        'failed_batches': failures,
+        'seconds': f"{elapsed:.2f}",
+        'logs_per_s': f"{written / elapsed:.0f}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--users-per-process', type=int, default=100)
+    parser.add_argument('--batches', type=int, default=50)
+    parser.add_argument('--journal-mode', choices=['wal', 'delete'], default='wal')
+    args = parser.parse_args()
+
+    if connection.vendor == 'sqlite':
+        test_file = settings.BASE_DIR / 'bench_concurrency.sqlite3'
+        connection.settings_dict['TEST']['NAME'] = str(test_file)
+        if args.journal_mode == 'delete':
+            connection.settings_dict['OPTIONS'] = {
+                'init_command': "PRAGMA journal_mode=DELETE;", 'timeout': 20,
+            }
+
+    rows = []
+    with test_database():
+        for processes in args.processes:
+            rows.append(run(processes, args.users_per_process, args.batches))
+
+    report("Concurrent reminder batch writes", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare emails/sec of the synchronous pooled backend (one message in flight
+per worker process) with AsyncDelivery at several concurrency levels,
+against a local SMTP sink that adds a fixed per-message latency.
+
+Messages are sent in slices, as the email rate limit hands them out, and
+the SMTP connections the sink saw are counted: pooled connections carry
+many slices each.
+
+    python -m benchmarks.bench_delivery --messages 500 --latency 0.01 --slice 50
+"""
+
+import argparse
+import time
+
+from benchmarks.common import local_smtp_server, report
+
+from django.core.mail import EmailMessage, get_connection
+
+from breaks.mail import AsyncDelivery
+
+
+def build_messages(count):
+    return [
+        EmailMessage("Time for a break!", "Take a few minutes to rest.", "from@example.com",
+                     [f"user{i}@example.com"])
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--slice', type=int, default=50,
+                        help="Messages per send, as EMAIL_RATE_LIMIT_BURST slices a batch.")
+    args = parser.parse_args()
+
+    runs = [('sync_pooled', 1, lambda messages: get_connection().send_messages(messages))]
+    for concurrency in args.concurrency:
+        delivery = AsyncDelivery(concurrency)
+        runs.append(('async', concurrency, delivery.send_messages))
+
+    rows = []
+    with local_smtp_server(latency=args.latency) as sink:
+        for name, concurrency, send in runs:
+            messages = build_messages(args.messages)
+            received = sink.received
+            peers = set(sink.peers)
+
+            start = time.perf_counter()
+            sent = sum(
+                send(messages[position:position + args.slice])
+                for position in range(0, len(messages), args.slice)
+            )
+            seconds = time.perf_counter() - start
+
+            assert sent == sink.received - received == args.messages
+            rows.append({
+                'mode': name,
+                'in_flight': concurrency,
+                'emails': sent,
+                'connections': len(sink.peers - peers),
+                'seconds': f"{seconds:.2f}",
+                'emails_per_s': f"{sent / seconds:.0f}",
+            })
+
+    report(f"Reminder delivery ({args.latency * 1000:.0f} ms server latency)", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
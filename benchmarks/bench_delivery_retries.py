@@ -0,0 +1,104 @@
+"""
+Measure how reminder batches behave through an SMTP outage: how long a
+failing batch holds its worker slot, and how its retries spread out.
+
+The outage runs real batches against a closed SMTP port and records the
+retries they schedule instead of sending them. The spread then replays
+the same number of failed batches through every retry attempt, with the
+jittered backoff vs. a fixed one, and reports the most retries due in any
+one second: the burst the SMTP server faces as it comes back.
+
+    python -m benchmarks.bench_delivery_retries --outage-batches 20 --batches 200
+"""
+
+import argparse
+import bisect
+import time
+from unittest.mock import patch
+
+from benchmarks.common import create_users, free_port, report, test_database
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from breaks.mail import close_pool
+from breaks.models import BreakLog
+from breaks.tasks import retry_delay, send_break_reminders_batch
+
+
+def outage(users, batches):
+    scheduled = []
+    with override_settings(
+        EMAIL_BACKEND='breaks.mail.PooledEmailBackend',
+        EMAIL_POOL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='127.0.0.1',
+        EMAIL_PORT=free_port(),
+        EMAIL_USE_TLS=False,
+        EMAIL_HOST_USER='',
+        EMAIL_HOST_PASSWORD='',
+    ), patch('breaks.tasks.retry_reminder_delivery.apply_async',
+             side_effect=lambda args, countdown: scheduled.append(len(args[0]))):
+        close_pool()
+        start = time.perf_counter()
+        for _ in range(batches):
+            send_break_reminders_batch([user.id for user in users])
+        seconds = time.perf_counter() - start
+
+    return {
+        'batches': batches,
+        'users_per_batch': len(users),
+        'ms_per_batch': f"{seconds / batches * 1000:.1f}",
+        'retries_queued': len(scheduled),
+        'reminders_queued': sum(scheduled),
+        'pending_logs': BreakLog.objects.filter(status='pending').count(),
+    }
+
+
+def max_window(moments, window=1.0):
+    moments = sorted(moments)
+    return max(
+        (bisect.bisect_left(moments, moment + window) - i for i, moment in enumerate(moments)),
+        default=0,
+    )
+
+
+def spread(batches, jitter):
+    rows = []
+    # Every batch failed at moment 0 and keeps failing until its last retry.
+    due = [0.0] * batches
+    for attempt in range(settings.BREAK_DELIVERY_MAX_RETRIES):
+        if jitter:
+            due = [moment + retry_delay(attempt) for moment in due]
+        else:
+            delay = min(settings.BREAK_DELIVERY_RETRY_BASE_SECONDS * 2 ** attempt,
+                        settings.BREAK_DELIVERY_RETRY_MAX_SECONDS)
+            due = [moment + delay for moment in due]
+        rows.append({
+            'backoff': 'jittered' if jitter else 'fixed',
+            'retry': attempt + 1,
+            'first_s': f"{min(due):.0f}",
+            'last_s': f"{max(due):.0f}",
+            'max_in_1s': max_window(due),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--outage-batches', type=int, default=20)
+    parser.add_argument('--users', type=int, default=100, help="Users per outage batch.")
+    parser.add_argument('--batches', type=int, default=200,
+                        help="Failed batches whose retries are spread.")
+    args = parser.parse_args()
+
+    with test_database():
+        users = create_users(args.users)
+        row = outage(users, args.outage_batches)
+
+    report("Batches failing during an SMTP outage", [row], list(row))
+    rows = spread(args.batches, jitter=False) + spread(args.batches, jitter=True)
+    report(f"Retries of {args.batches} batches failed together", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Load-test the live reminder stream: hold many idle SSE connections open
+against the ASGI app served by uvicorn, then publish reminder batches
+through Redis and measure connect rate, memory per connection and the
+publish-to-client latency of every event.
+
+The server runs in a thread of this process, so memory per connection
+includes the client side of each socket. Needs the Redis at REDIS_URL.
+
+    python -m benchmarks.bench_event_stream --connections 5000 --events 2000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import statistics
+import threading
+import time
+
+from benchmarks.common import create_users, free_port, report, test_database
+
+import uvicorn
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from breaks.authentication import issue_token
+from breaks.events import hub, publish_reminders
+from breaks.notifications import Reminder
+
+CONNECT_CONCURRENCY = 200
+
+
+def rss_kb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def start_server(port):
+    config = uvicorn.Config(
+        'config.asgi:application', host='127.0.0.1', port=port, lifespan='off',
+        log_level='warning', backlog=4096, timeout_keep_alive=3600,
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def open_stream(port, token, semaphore):
+    async with semaphore:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(
+            f"GET /api/events/ HTTP/1.1\r\nHost: testserver\r\n"
+            f"Authorization: Bearer {token}\r\nAccept: text/event-stream\r\n\r\n".encode()
+        )
+        await writer.drain()
+        status = await reader.readline()
+        assert status.startswith(b"HTTP/1.1 200"), status
+        await reader.readuntil(b": connected\n\n")
+    return reader, writer
+
+
+async def read_events(reader, latencies):
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        if line.startswith(b'data: '):
+            sent_at = parse_datetime(json.loads(line[6:])['triggered_at'])
+            latencies.append((timezone.now() - sent_at).total_seconds())
+
+
+async def run(args, port, tokens, users):
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    rss_before = rss_kb()
+    start = time.perf_counter()
+    streams = await asyncio.gather(*(open_stream(port, token, semaphore) for token in tokens))
+    connect_seconds = time.perf_counter() - start
+    rss_per_connection = (rss_kb() - rss_before) / len(streams)
+
+    latencies = []
+    readers = [asyncio.create_task(read_events(reader, latencies)) for reader, _ in streams]
+
+    # Publish from a thread, as the reminder tasks do from their workers.
+    def publish():
+        for start in range(0, args.events, args.batch_size):
+            batch = random.sample(users, min(args.batch_size, args.events - start))
+            publish_reminders([Reminder(user, "Break", "Stretch") for user in batch],
+                              timezone.now())
+
+    await asyncio.to_thread(publish)
+    deadline = time.monotonic() + 30
+    while len(latencies) < args.events and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+    for task in readers:
+        task.cancel()
+    for _, writer in streams:
+        writer.close()
+    # Wait for the server to notice the disconnects and drop the streams.
+    start = time.perf_counter()
+    while hub.connections and time.perf_counter() - start < 30:
+        await asyncio.sleep(0.1)
+    drain_seconds = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'connections': len(streams),
+        'connect_per_s': f"{len(streams) / connect_seconds:.0f}",
+        'kb_per_conn': f"{rss_per_connection:.1f}",
+        'events': len(latencies),
+        'p50_ms': f"{statistics.median(latencies) * 1000:.1f}",
+        'p99_ms': f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}",
+        'max_ms': f"{latencies[-1] * 1000:.1f}",
+        'drain_s': f"{drain_seconds:.1f}",
+        'streams_left': hub.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=5000)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    # Both ends of every connection live in this process.
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    with test_database():
+        users = create_users(args.connections)
+        tokens = [issue_token(user) for user in users]
+        port = free_port()
+        server, thread = start_server(port)
+        try:
+            row = asyncio.run(run(args, port, tokens, users))
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    report("Live reminder stream (SSE over uvicorn)", [row], list(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Compare reminder fan-out with one Celery task per user against chunked
+send_break_reminders_batch tasks, delivering to a local SMTP sink with
+and without the pooled email backend.
+
+    python -m benchmarks.bench_fanout --users 1000 --chunk-sizes 50 100 500
+"""
+
+import argparse
+from unittest.mock import patch
+
+from benchmarks.common import create_users, local_smtp_server, measure, report, test_database
+
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from breaks import tasks
+from breaks.models import BreakInterval
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+POOLED_BACKEND = 'breaks.mail.PooledEmailBackend'
+QUOTES = ['"Rest is not idleness." - John Lubbock']
+
+
+def per_user_fanout(user_ids):
+    for user_id in user_ids:
+        tasks.send_break_reminder(user_id)
+    return len(user_ids)
+
+
+def batched_fanout():
+    with patch.object(tasks.send_break_reminders_batch, 'delay') as delay:
+        tasks.check_and_schedule_breaks()
+    for call in delay.call_args_list:
+        tasks.send_break_reminders_batch(*call.args)
+    return delay.call_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[50, 100, 500])
+    args = parser.parse_args()
+
+    rows = []
+    with (
+        test_database(),
+        local_smtp_server() as sink,
+        patch.object(tasks, 'get_pooled_quotes', side_effect=lambda count: QUOTES * count),
+    ):
+        users = create_users(args.users)
+        BreakInterval.objects.bulk_create(BreakInterval(user=user) for user in users)
+        user_ids = [user.id for user in users]
+
+        runs = [
+            ('per_user_unpooled', None, SMTP_BACKEND),
+            ('per_user', None, POOLED_BACKEND),
+        ] + [('batch', size, POOLED_BACKEND) for size in args.chunk_sizes]
+        for name, chunk_size, backend in runs:
+            BreakInterval.objects.update(next_due_at=timezone.now())
+            received = sink.received
+
+            with override_settings(
+                BREAK_REMINDER_CHUNK_SIZE=chunk_size or 1, EMAIL_BACKEND=backend
+            ):
+                with measure() as stats:
+                    if chunk_size is None:
+                        messages = per_user_fanout(user_ids)
+                    else:
+                        messages = batched_fanout()
+
+            delivered = sink.received - received
+            rows.append({
+                'path': name,
+                'chunk_size': chunk_size or 1,
+                'broker_msgs': messages,
+                'emails': delivered,
+                'queries': stats['queries'],
+                'seconds': f"{stats['seconds']:.2f}",
+                'emails_per_s': f"{delivered / stats['seconds']:.0f}",
+            })
+
+    report("Reminder fan-out", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare the break-logs list endpoint returning a user's whole history
+(the original unpaginated view) against keyset-paginated pages, as the
+user's log count grows.
+
+    python -m benchmarks.bench_logs_api --sizes 1000 10000 50000
+"""
+
+import argparse
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.common import create_users, measure, report, test_database
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from breaks.models import BreakLog
+from breaks.views import BreakLoglViewSet
+
+
+class UnpaginatedBreakLogViewSet(BreakLoglViewSet):
+    pagination_class = None
+    filter_backends = []
+
+    def get_queryset(self):
+        return BreakLog.objects.filter(user=self.request.user).order_by('-triggered_at')
+
+
+def populate(user, count):
+    BreakLog.objects.bulk_create((BreakLog(user=user) for _ in range(count)), batch_size=5000)
+
+
+def call(view, user, params=None):
+    request = APIRequestFactory().get('/api/break-logs/', params or {})
+    force_authenticate(request, user=user)
+    response = view(request)
+    response.render()
+    return response
+
+
+def deep_page(view, user, pages):
+    """Follow ``next`` ``pages`` times and time only the last request."""
+    params = {}
+    for _ in range(pages):
+        response = call(view, user, params)
+        next_url = response.data['next']
+        if not next_url:
+            break
+        params = {'cursor': parse_qs(urlsplit(next_url).query)['cursor'][0]}
+    with measure() as stats:
+        call(view, user, params)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--deep-pages', type=int, default=20)
+    args = parser.parse_args()
+
+    unpaginated = UnpaginatedBreakLogViewSet.as_view({'get': 'list'})
+    paginated = BreakLoglViewSet.as_view({'get': 'list'})
+
+    rows = []
+    with test_database():
+        user = create_users(1)[0]
+        populated = 0
+        for size in sorted(args.sizes):
+            populate(user, size - populated)
+            populated = size
+
+            row = {'logs': size}
+            with measure() as stats:
+                call(unpaginated, user)
+            row['all_queries'] = stats['queries']
+            row['all_s'] = f"{stats['seconds']:.3f}"
+
+            with measure() as stats:
+                call(paginated, user)
+            row['first_page_s'] = f"{stats['seconds']:.4f}"
+
+            stats = deep_page(paginated, user, args.deep_pages)
+            row['deep_page_s'] = f"{stats['seconds']:.4f}"
+            row['page_queries'] = stats['queries']
+            rows.append(row)
+
+    report("GET /api/break-logs/ response time", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Measure the shared outbound-mail token bucket: several processes, standing
+in for delivery workers, take tokens from one bucket in Redis as fast as
+they can. Reports the aggregate rate achieved against the configured one,
+the largest number of sends in any one-second window (the burst an SMTP
+provider would see) and how many WATCH transactions had to be retried.
+
+Needs the Redis at REDIS_URL.
+
+    python -m benchmarks.bench_rate_limit --processes 1 4 8 --rate 200 --burst 50
+"""
+
+import argparse
+import bisect
+import multiprocessing
+import time
+from unittest.mock import patch
+
+from benchmarks.common import report
+
+import redis
+
+from breaks.ratelimit import TokenBucket
+from breaks.utils import get_redis
+
+BENCH_BUCKET_KEY = "breaks:ratelimit:bench"
+
+
+def take_tokens(rate, burst, chunk, deadline, results):
+    bucket = TokenBucket(BENCH_BUCKET_KEY, rate, burst)
+    retries = 0
+    original_execute = redis.client.Pipeline.execute
+
+    def counting_execute(pipeline, *args, **kwargs):
+        nonlocal retries
+        try:
+            return original_execute(pipeline, *args, **kwargs)
+        except redis.WatchError:
+            retries += 1
+            raise
+
+    sent_at = []
+    with patch.object(redis.client.Pipeline, 'execute', counting_execute):
+        while time.time() < deadline:
+            bucket.take(chunk)
+            sent_at.extend([time.time()] * chunk)
+    results.put((sent_at, retries))
+
+
+def max_window(sent_at, window=1.0):
+    return max(
+        (bisect.bisect_left(sent_at, moment + window) - i for i, moment in enumerate(sent_at)),
+        default=0,
+    )
+
+
+def run(processes, rate, burst, chunk, seconds):
+    get_redis().delete(BENCH_BUCKET_KEY)
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    started = time.time()
+    deadline = started + seconds
+    workers = [
+        context.Process(target=take_tokens, args=(rate, burst, chunk, deadline, results))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    sent_at, retries = [], 0
+    for _ in workers:
+        times, worker_retries = results.get()
+        sent_at.extend(times)
+        retries += worker_retries
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - started
+    sent_at.sort()
+
+    # The bucket starts full: the first second may carry an extra burst.
+    steady = [moment for moment in sent_at if moment >= started + 1]
+    return {
+        'processes': processes,
+        'configured_per_s': rate,
+        'burst': burst,
+        'sent': len(sent_at),
+        'achieved_per_s': f"{len(sent_at) / elapsed:.1f}",
+        'steady_per_s': f"{len(steady) / max(elapsed - 1, 1e-9):.1f}",
+        'max_in_1s': max_window(sent_at),
+        'watch_retries': retries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--rate', type=float, default=200)
+    parser.add_argument('--burst', type=int, default=50)
+    parser.add_argument('--chunk', type=int, default=1,
+                        help="Tokens per take, as a delivery batch slice would.")
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    rows = [run(processes, args.rate, args.burst, args.chunk, args.seconds)
+            for processes in args.processes]
+    get_redis().delete(BENCH_BUCKET_KEY)
+
+    report("Shared email token bucket", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
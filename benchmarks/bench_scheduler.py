@@ -0,0 +1,104 @@
+"""
+Compare the ways check_and_schedule_breaks has found due users: the
+original per-user loop, a set-based "latest break + interval" query and
+the indexed next_due_at due-queue scan.
+
+    python -m benchmarks.bench_scheduler --sizes 100 1000 10000
+"""
+
+import argparse
+from datetime import timedelta
+
+from benchmarks.common import create_users, measure, report, test_database
+
+from django.db.models import DateTimeField, ExpressionWrapper, F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from breaks.models import BreakInterval, BreakLog, interval_duration
+
+
+def legacy_due_user_ids(now):
+    due = []
+    for interval in BreakInterval.objects.all():
+        user = interval.user
+        last_break = BreakLog.objects.filter(user=user).order_by('-triggered_at').first()
+        interval_time = timedelta(minutes=interval.interval_minutes)
+        if not last_break or now - last_break.triggered_at >= interval_time:
+            due.append(user.id)
+    return due
+
+
+def set_based_due_user_ids(now):
+    last_break = (
+        BreakLog.objects.filter(user=OuterRef('user'))
+        .order_by('-triggered_at')
+        .values('triggered_at')[:1]
+    )
+    due_at = ExpressionWrapper(F('last_break') + interval_duration(), output_field=DateTimeField())
+    return list(
+        BreakInterval.objects.annotate(last_break=Subquery(last_break))
+        .annotate(due_at=due_at)
+        .filter(Q(last_break__isnull=True) | Q(due_at__lte=now))
+        .values_list('user_id', flat=True)
+    )
+
+
+def due_queue_user_ids(now):
+    return list(BreakInterval.objects.due(now).values_list('user_id', flat=True))
+
+
+def populate(count, logs_per_user, due_every):
+    users = create_users(count)
+    now = timezone.now()
+    BreakLog.objects.bulk_create(
+        BreakLog(user=user) for user in users for _ in range(logs_per_user)
+    )
+    intervals = []
+    for i, user in enumerate(users):
+        # Every ``due_every``-th user had their last break more than an interval ago.
+        minutes_ago = 61 if i % due_every == 0 else 1
+        last_break = now - timedelta(minutes=minutes_ago)
+        BreakLog.objects.filter(user=user).update(triggered_at=last_break)
+        intervals.append(BreakInterval(
+            user=user, interval_minutes=60, next_due_at=last_break + timedelta(minutes=60)
+        ))
+    BreakInterval.objects.bulk_create(intervals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--logs-per-user', type=int, default=5)
+    parser.add_argument('--due-every', type=int, default=10)
+    args = parser.parse_args()
+
+    strategies = {
+        'legacy': legacy_due_user_ids,
+        'set_based': set_based_due_user_ids,
+        'due_queue': due_queue_user_ids,
+    }
+
+    rows = []
+    with test_database():
+        populated = 0
+        for size in sorted(args.sizes):
+            populate(size - populated, args.logs_per_user, args.due_every)
+            populated = size
+            now = timezone.now()
+
+            row = {'users': size}
+            results = {}
+            for name, strategy in strategies.items():
+                with measure() as stats:
+                    results[name] = sorted(strategy(now))
+                row[f'{name}_queries'] = stats['queries']
+                row[f'{name}_s'] = f"{stats['seconds']:.3f}"
+            assert results['legacy'] == results['set_based'] == results['due_queue']
+            row['due'] = len(results['due_queue'])
+            rows.append(row)
+
+    report("check_and_schedule_breaks due computation", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
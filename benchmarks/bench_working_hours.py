@@ -0,0 +1,84 @@
+"""
+Compare a scheduler tick that filters out-of-hours users in Python with the
+indexed due query over next_due_at values already moved into each user's
+working hours, for users spread across timezones with 09:00-17:00 Mon-Fri
+hours who are all overdue by their interval.
+
+    python -m benchmarks.bench_working_hours --sizes 1000 10000
+"""
+
+import argparse
+from datetime import time, timedelta
+
+from benchmarks.common import create_users, measure, report, test_database
+
+from django.utils import timezone
+
+from breaks.models import BreakInterval
+from breaks.workhours import WEEKDAYS
+
+TIMEZONES = [
+    'America/Los_Angeles', 'America/New_York', 'America/Sao_Paulo', 'Europe/London',
+    'Europe/Kyiv', 'Asia/Kolkata', 'Asia/Tokyo', 'Australia/Sydney',
+]
+
+
+def midweek_noon():
+    """The coming Wednesday at 12:00 UTC, when some but not all timezones are at work."""
+    today = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    return today + timedelta(days=(2 - today.weekday()) % 7)
+
+
+def populate(count, now):
+    users = create_users(count)
+    BreakInterval.objects.bulk_create(
+        BreakInterval(
+            user=user, timezone=TIMEZONES[i % len(TIMEZONES)], work_start=time(9),
+            work_end=time(17), work_days=WEEKDAYS, next_due_at=now - timedelta(minutes=1),
+        )
+        for i, user in enumerate(users)
+    )
+
+
+def python_filtered(now):
+    intervals = list(BreakInterval.objects.due(now))
+    due = [interval.user_id for interval in intervals if interval.next_working_time(now) == now]
+    return len(intervals), due
+
+
+def indexed(now):
+    due = list(BreakInterval.objects.due(now).values_list('user_id', flat=True))
+    return len(due), due
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    args = parser.parse_args()
+
+    rows = []
+    with test_database():
+        for size in args.sizes:
+            now = midweek_noon()
+            populate(size, now)
+
+            row = {'users': size}
+            with measure() as stats:
+                read, python_due = python_filtered(now)
+            row.update(python_rows=read, python_s=f"{stats['seconds']:.3f}")
+
+            BreakInterval.objects.all().fit_to_working_hours()
+            with measure() as stats:
+                read, indexed_due = indexed(now)
+            row.update(indexed_rows=read, indexed_s=f"{stats['seconds']:.3f}")
+
+            assert sorted(python_due) == sorted(indexed_due)
+            row['working'] = len(indexed_due)
+            rows.append(row)
+            BreakInterval.objects.all().delete()
+
+    report("Scheduler tick with working hours", rows, list(rows[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway test database, so they never touch
+db.sqlite3. Run them from the project root, e.g.:
+
+    python -m benchmarks.bench_scheduler
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+# Per-message INFO logging from the tasks and the SMTP sink drowns the results.
+logging.disable(logging.INFO)
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+
+
+@contextmanager
+def test_database():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextmanager
+def measure():
+    """Collect wall time and query count of the block into the yielded dict."""
+    result = {'queries': 0}
+
+    def count_queries(execute, sql, params, many, context):
+        result['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_queries):
+        start = time.perf_counter()
+        yield result
+        result['seconds'] = time.perf_counter() - start
+
+
+class SinkHandler:
+    """aiosmtpd handler that accepts and counts every message after ``latency`` seconds."""
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.received = 0
+        # Client address of every connection a message arrived on.
+        self.peers = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.received += 1
+        self.peers.add(session.peer)
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_smtp_server(latency=0):
+    """Run a local SMTP sink and point the pooled email backend at it."""
+    from aiosmtpd.controller import Controller
+
+    from breaks.mail import close_pool
+
+    handler = SinkHandler(latency)
+    controller = Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    try:
+        with override_settings(
+            EMAIL_BACKEND='breaks.mail.PooledEmailBackend',
+            EMAIL_POOL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST=controller.hostname,
+            EMAIL_PORT=controller.port,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+        ):
+            yield handler
+            close_pool()
+    finally:
+        controller.stop()
+
+
+class WebhookSinkHandler(BaseHTTPRequestHandler):
+    """Accepts every POST after the server's ``latency`` seconds."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(self.server.latency)
+        self.server.received += 1
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def local_webhook_server(latency=0):
+    """Run a local HTTP sink for webhook deliveries; yields the server (``url``, ``received``)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookSinkHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.received = 0
+    server.url = f"http://127.0.0.1:{server.server_port}/hook"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def create_users(count, prefix='bench'):
+    offset = User.objects.count()
+    User.objects.bulk_create(
+        User(username=f"{prefix}_{offset + i}", email=f"{prefix}_{offset + i}@example.com")
+        for i in range(count)
+    )
+    return list(User.objects.order_by('-id')[:count])
+
+
+def report(title, rows, columns):
+    print(f"\n{title}")
+    print("  ".join(f"{column:>14}" for column in columns))
+    for row in rows:
+        print("  ".join(f"{row[column]:>14}" for column in columns))
@@ -1,6 +1,34 @@
 from django.contrib import admin
 
-from .models import BreakInterval, BreakLog
+from .models import (
+    BreakDailyRollup,
+    BreakHourlyBucket,
+    BreakInterval,
+    BreakLog,
+    BreakStats,
+    DeadLetter,
+    Notification,
+)
+from .utils import invalidate_user_caches
+
+
+@admin.register(BreakLog)
+class BreakLogAdmin(admin.ModelAdmin):
+    """Invalidates cached user data on delete, as BreakLog deletes send no signal for it."""
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_user_caches([obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        invalidate_user_caches(user_ids)
+
 
 admin.site.register(BreakInterval)
-admin.site.register(BreakLog)
+admin.site.register(BreakStats)
+admin.site.register(BreakDailyRollup)
+admin.site.register(BreakHourlyBucket)
+admin.site.register(Notification)
+admin.site.register(DeadLetter)
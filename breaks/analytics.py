@@ -0,0 +1,137 @@
+"""
+Break analytics computed from pre-aggregated data only.
+
+Hourly counts come from BreakHourlyBucket, and daily and weekly counts
+from BreakDailyRollup. Both hold at most one row per user per bucket and
+are incremented as breaks are logged; hourly buckets are pruned with raw
+logs after BREAK_LOG_RETENTION_DAYS. Streaks come from BreakStats.
+Nothing is derived from BreakLog at request time, so response time depends
+on the requested range, not on how many logs exist.
+"""
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import BreakDailyRollup, BreakHourlyBucket, BreakInterval
+from .workhours import working_time
+
+BUCKETS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+
+# Range covered when the request gives no ``since``.
+DEFAULT_RANGES = {
+    'hour': timedelta(days=1),
+    'day': timedelta(days=30),
+    'week': timedelta(weeks=12),
+}
+
+# Longest series a single request may ask for.
+MAX_BUCKETS = 1000
+
+
+def bucket_start(moment, bucket):
+    """Start of the UTC hour, day or (Monday-based) week containing ``moment``."""
+    moment = moment.astimezone(dt_timezone.utc)
+    if bucket == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.date()
+    if bucket == 'week':
+        day -= timedelta(days=day.weekday())
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def bucket_count(since, until, bucket):
+    return max(0, -(-(until - bucket_start(since, bucket)) // BUCKETS[bucket]))
+
+
+def bucketed_breaks(since, until, bucket, user=None):
+    """Breaks per bucket from ``since`` up to ``until``, zero-filled, oldest first.
+
+    ``since`` is rounded down to the start of its bucket; day and week
+    buckets always count whole days. Without ``user``, counts cover every user.
+    """
+    start = bucket_start(since, bucket)
+
+    if bucket == 'hour':
+        rows = BreakHourlyBucket.objects.filter(hour__gte=start, hour__lt=until)
+        key = F('hour')
+    else:
+        last_day = (until - timedelta(microseconds=1)).astimezone(dt_timezone.utc).date()
+        rows = BreakDailyRollup.objects.filter(day__gte=start.date(), day__lte=last_day)
+        key = F('day') if bucket == 'day' else TruncWeek('day')
+    if user is not None:
+        rows = rows.filter(user=user)
+    counts = dict(
+        rows.annotate(start=key)
+        .values('start')
+        .annotate(total=Sum('breaks'))
+        .order_by()
+        .values_list('start', 'total')
+    )
+
+    series = []
+    while start < until:
+        counted = counts.get(start if bucket == 'hour' else start.date(), 0)
+        series.append({'start': start, 'breaks': counted})
+        start += BUCKETS[bucket]
+    return series
+
+
+def expected_breaks(since, until, user=None):
+    """Reminders the configured intervals call for between ``since`` and ``until``.
+
+    Each interval counts from its creation, at one break per interval_minutes
+    of the user's working hours. Paused users expect none. Past pauses and
+    snoozes are not recorded, so a user who was paused or snoozed for part of
+    the range still expects breaks for that part.
+    """
+    intervals = BreakInterval.objects.filter(paused=False)
+    if user is not None:
+        intervals = intervals.filter(user=user)
+
+    # Users mostly share a few schedules: compute each one's working time once.
+    working = {}
+    expected = 0.0
+    rows = intervals.values_list(
+        'interval_minutes', 'created_at', 'timezone', 'work_start', 'work_end', 'work_days'
+    ).iterator(chunk_size=2000)
+    for interval_minutes, created_at, *schedule in rows:
+        start = max(since, created_at)
+        key = (start, *schedule)
+        if key not in working:
+            working[key] = working_time(start, until, *schedule)
+        expected += working[key] / timedelta(minutes=interval_minutes)
+    return expected
+
+
+def break_analytics(since, until, bucket, user=None):
+    since = bucket_start(since, bucket)
+    series = bucketed_breaks(since, until, bucket, user)
+    total = sum(point['breaks'] for point in series)
+    expected = expected_breaks(since, until, user)
+
+    analytics = {
+        'bucket': bucket,
+        'since': since,
+        'until': until,
+        'total_breaks': total,
+        'buckets': series,
+        'adherence': {
+            'expected_breaks': round(expected, 1),
+            'ratio': round(total / expected, 3) if expected else None,
+        },
+    }
+
+    if user is not None:
+        stats = getattr(user, 'break_stats', None)
+        analytics['streak'] = {
+            'current': stats.streak_on(timezone.localdate()) if stats else 0,
+            'longest': stats.longest_streak if stats else 0,
+        }
+    return analytics
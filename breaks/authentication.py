@@ -0,0 +1,79 @@
+"""
+Stateless API tokens signed with SECRET_KEY.
+
+A token carries the user id and a hash of the user's password, signed and
+timestamped by django.core.signing. Verifying one is an in-process HMAC
+check followed by a user lookup, which the token -> user cache (when
+API_TOKEN_CACHE_SECONDS > 0) removes as well. There is no token table, no
+session read and no CSRF check. Changing the password revokes all of the
+user's tokens. Expiry and revocation apply to a cached token only once its
+cache entry expires.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+TOKEN_SALT = "breaks.api-token"
+TOKEN_USER_CACHE_KEY = "breaks:token-user:{digest}"
+
+
+def issue_token(user):
+    return signing.dumps(
+        {'uid': user.pk, 'pwd': user.get_session_auth_hash()}, salt=TOKEN_SALT, compress=True
+    )
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticate ``Authorization: Bearer <token>`` headers carrying an issue_token token."""
+
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed("Invalid token header.")
+
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed("Invalid token header.")
+        return self.authenticate_token(token), token
+
+    def authenticate_token(self, token):
+        cache_key = TOKEN_USER_CACHE_KEY.format(digest=hashlib.sha256(token.encode()).hexdigest())
+        if settings.API_TOKEN_CACHE_SECONDS:
+            user = cache.get(cache_key)
+            if user is not None:
+                return user
+
+        try:
+            payload = signing.loads(
+                token, salt=TOKEN_SALT, max_age=settings.API_TOKEN_MAX_AGE_SECONDS
+            )
+        except signing.SignatureExpired:
+            raise AuthenticationFailed("Token has expired.")
+        except signing.BadSignature:
+            raise AuthenticationFailed("Invalid token.")
+
+        try:
+            user = User.objects.get(pk=payload['uid'], is_active=True)
+        except User.DoesNotExist:
+            raise AuthenticationFailed("Invalid token.")
+        if not constant_time_compare(payload['pwd'], user.get_session_auth_hash()):
+            raise AuthenticationFailed("Invalid token.")
+
+        if settings.API_TOKEN_CACHE_SECONDS:
+            cache.set(cache_key, user, settings.API_TOKEN_CACHE_SECONDS)
+        return user
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,127 @@
+"""
+Bulk creation and update of break intervals, for rolling reminders out to a
+whole organisation through the API or from a CSV file.
+
+Rows are validated one by one with BreakIntervalImportSerializer (the same
+interval_minutes rules as the single-object API) and written in chunks of
+BREAK_INTERVAL_IMPORT_CHUNK_SIZE: each chunk resolves its usernames, existing
+intervals and latest breaks in three queries and saves with one bulk_create
+and one bulk_update in its own transaction. Invalid rows are reported and
+skipped without failing the rest of the import.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BreakInterval, BreakStats
+from .scheduling import due_queue_enabled, schedule_users
+from .serializers import BreakIntervalImportSerializer
+from .utils import invalidate_user_caches
+
+logger = logging.getLogger(__name__)
+
+
+def import_intervals(rows, chunk_size=None, first_row=0):
+    """Create or update the interval of each ``{'username', 'interval_minutes'}`` row.
+
+    Rows are numbered from ``first_row`` in the reported errors. Returns
+    ``{'created': n, 'updated': n, 'errors': [{'row': number, 'errors': {...}}]}``.
+    """
+    chunk_size = chunk_size or settings.BREAK_INTERVAL_IMPORT_CHUNK_SIZE
+    result = {'created': 0, 'updated': 0, 'errors': []}
+    seen = set()
+
+    chunk = []
+    for number, data in enumerate(rows, first_row):
+        chunk.append((number, data))
+        if len(chunk) >= chunk_size:
+            import_chunk(chunk, seen, result)
+            chunk = []
+    if chunk:
+        import_chunk(chunk, seen, result)
+    result['errors'].sort(key=lambda error: error['row'])
+
+    logger.info(
+        f"Imported break intervals: {result['created']} created, {result['updated']} updated, "
+        f"{len(result['errors'])} rows rejected"
+    )
+    return result
+
+
+def import_chunk(chunk, seen, result):
+    rows = {}
+    for number, data in chunk:
+        serializer = BreakIntervalImportSerializer(data=data)
+        if not serializer.is_valid():
+            reject(result, number, serializer.errors)
+            continue
+        username = serializer.validated_data['username']
+        if username in seen:
+            reject(result, number, {'username': ["Duplicate username; its first row is used."]})
+            continue
+        seen.add(username)
+        rows[username] = (number, serializer.validated_data['interval_minutes'])
+
+    user_ids = dict(User.objects.filter(username__in=rows).values_list('username', 'id'))
+    for username, (number, _) in list(rows.items()):
+        if username not in user_ids:
+            reject(result, number, {'username': [f"User {username} does not exist."]})
+            del rows[username]
+    if not rows:
+        return
+
+    now = timezone.now()
+    due_times = {}
+    created, updated = [], []
+    with transaction.atomic():
+        existing = BreakInterval.objects.select_for_update().in_bulk(
+            user_ids.values(), field_name='user_id'
+        )
+        last_breaks = dict(
+            BreakStats.objects.filter(user_id__in=user_ids.values())
+            .values_list('user_id', 'last_break_at')
+        )
+
+        for username, (_, interval_minutes) in rows.items():
+            user_id = user_ids[username]
+            interval = existing.get(user_id)
+            if interval is None:
+                interval = BreakInterval(user_id=user_id)
+                created.append(interval)
+            else:
+                interval.updated_at = now
+                updated.append(interval)
+
+            # As BreakInterval.reschedule().
+            last_break = last_breaks.get(user_id)
+            interval.interval_minutes = interval_minutes
+            interval.next_due_at = interval.next_working_time(
+                last_break + timedelta(minutes=interval_minutes) if last_break else now
+            )
+            due_times[user_id] = interval.next_due_at
+
+        BreakInterval.objects.bulk_create(created)
+        BreakInterval.objects.bulk_update(
+            updated, ['interval_minutes', 'next_due_at', 'updated_at']
+        )
+
+    # Bulk writes send no signals, so the due queue and caches are updated here.
+    if due_queue_enabled():
+        schedule_users(due_times)
+    invalidate_user_caches(list(due_times))
+
+    result['created'] += len(created)
+    result['updated'] += len(updated)
+
+
+def reject(result, number, errors):
+    result['errors'].append({
+        'row': number,
+        'errors': {field: [str(message) for message in messages]
+                   for field, messages in errors.items()},
+    })
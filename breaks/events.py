@@ -0,0 +1,125 @@
+"""
+Live reminder events, streamed to connected clients as server-sent events.
+
+The reminder tasks publish one message per batch to the EVENTS_CHANNEL Redis
+pub/sub channel. Each ASGI process keeps a single subscription, opened by its
+first client, and fans the events out to the in-memory queues of the users'
+open streams. An idle client thus costs a small queue and a suspended
+coroutine: no Redis or database connection. Events are not stored; a
+reconnecting client catches up from /api/break-logs/?since=<last event>.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+
+from .utils import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "breaks:events"
+
+# Delay before resubscribing after the Redis connection is lost.
+RECONNECT_SECONDS = 1
+
+
+def publish_reminders(reminders, triggered_at):
+    """Announce a batch of reminders to the users' open streams, if any (best effort)."""
+    if not reminders:
+        return
+    events = [
+        {
+            'user_id': reminder.user.id,
+            'subject': reminder.subject,
+            'body': reminder.body,
+            'triggered_at': triggered_at.isoformat(),
+        }
+        for reminder in reminders
+    ]
+    try:
+        get_redis().publish(EVENTS_CHANNEL, json.dumps(events))
+    except redis.RedisError as e:
+        logger.error(f"Failed to publish reminder events: {e}")
+
+
+class EventHub:
+    """Per-process relay from EVENTS_CHANNEL to the queues of local streams."""
+
+    def __init__(self):
+        self.streams = defaultdict(set)
+        self.subscribed = None
+        self._listener = None
+
+    @property
+    def connections(self):
+        return sum(len(queues) for queues in self.streams.values())
+
+    def subscribe(self, user_id):
+        """Open a stream for ``user_id``; returns the queue its events arrive on."""
+        loop = asyncio.get_running_loop()
+        listener = self._listener
+        if listener is None or listener.done() or listener.get_loop() is not loop:
+            self.subscribed = asyncio.Event()
+            self._listener = loop.create_task(self.listen())
+
+        queue = asyncio.Queue(maxsize=settings.EVENT_STREAM_QUEUE_SIZE)
+        self.streams[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.streams.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.streams[user_id]
+
+    async def listen(self):
+        while True:
+            client = get_async_redis()
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(EVENTS_CHANNEL)
+                    self.subscribed.set()
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            self.dispatch(json.loads(message['data']))
+            except (redis.RedisError, OSError) as e:
+                self.subscribed.clear()
+                logger.warning(f"Reminder event subscription lost, reconnecting: {e}")
+                await asyncio.sleep(RECONNECT_SECONDS)
+            finally:
+                await client.aclose()
+
+    def dispatch(self, events):
+        for event in events:
+            for queue in self.streams.get(event['user_id'], ()):
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    logger.warning(f"Dropped a reminder event for user {event['user_id']}: "
+                                   f"stream is not reading")
+
+
+hub = EventHub()
+
+
+async def stream_events(user_id):
+    """Yield the SSE stream of ``user_id``'s reminders, with keep-alive comments between them."""
+    queue = hub.subscribe(user_id)
+    try:
+        yield f"retry: {settings.EVENT_STREAM_RETRY_MS}\n: connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), timeout=settings.EVENT_STREAM_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: reminder\nid: {event['triggered_at']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        hub.unsubscribe(user_id, queue)
@@ -0,0 +1,64 @@
+"""
+Streaming export of break history.
+
+Rows are read with ``QuerySet.iterator`` and written out one at a time, so
+an export holds only one database chunk in memory no matter how many logs
+it covers. The API and the ``export_break_logs`` command share these
+generators.
+"""
+
+import csv
+import json
+
+from django.conf import settings
+
+from .models import BreakLog
+
+EXPORT_COLUMNS = ('id', 'user_id', 'username', 'triggered_at')
+
+
+def export_queryset(queryset=None, user=None):
+    """Break logs to export, oldest first; limited to ``user`` when given."""
+    if queryset is None:
+        queryset = BreakLog.objects.all()
+    if user is not None:
+        # Walks the (user, -triggered_at, -id) index backwards.
+        queryset = queryset.filter(user=user).order_by('triggered_at', 'id')
+    else:
+        queryset = queryset.order_by('id')
+    return queryset.values_list('id', 'user_id', 'user__username', 'triggered_at')
+
+
+def iter_rows(queryset, chunk_size=None):
+    return queryset.iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object whose write() returns the data, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for log_id, user_id, username, triggered_at in rows:
+        yield writer.writerow((log_id, user_id, username, triggered_at.isoformat()))
+
+
+def stream_ndjson(rows):
+    for log_id, user_id, username, triggered_at in rows:
+        yield json.dumps({
+            'id': log_id,
+            'user_id': user_id,
+            'username': username,
+            'triggered_at': triggered_at.isoformat(),
+        }) + "\n"
+
+
+# Output name (also the file extension) -> (generator, content type).
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
@@ -0,0 +1,40 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def parse_moment(value):
+    """Parse an ISO 8601 date or datetime into an aware datetime, or None if invalid."""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is not None:
+                moment = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class DateRangeFilter(BaseFilterBackend):
+    """Filter on ``?since=`` (inclusive) and ``?until=`` (exclusive) ISO 8601 dates or datetimes."""
+
+    def __init__(self, field='triggered_at'):
+        self.field = field
+
+    def filter_queryset(self, request, queryset, view):
+        bounds = {'since': 'gte', 'until': 'lt'}
+        for param, lookup in bounds.items():
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            moment = parse_moment(value)
+            if moment is None:
+                raise ValidationError({param: 'Enter a valid ISO 8601 date or datetime.'})
+            queryset = queryset.filter(**{f'{self.field}__{lookup}': moment})
+        return queryset
@@ -0,0 +1,145 @@
+"""
+Write-behind buffer for BreakLog inserts.
+
+With BREAK_LOG_WRITE_MODE=buffered, reminder tasks push one JSON event per
+break onto a Redis list instead of inserting BreakLog rows. A flusher
+(the run_break_log_flusher command, with a periodic task as fallback) then
+persists them with bulk_create, up to BREAK_LOG_FLUSH_BATCH_SIZE rows at a
+time.
+
+Delivery is at-least-once. A flush first moves events atomically onto a
+processing list, and clears that list only after their rows are
+committed. A flusher that dies in between leaves the events there for the
+next flush to persist again. Every event carries a unique event_id, so
+re-persisting an event never creates a second row.
+
+Delivery status changes of buffered logs are queued on the same list, after
+the events they apply to, and applied once those rows are persisted.
+"""
+
+import json
+import logging
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.dateparse import parse_datetime
+
+from .models import BreakLog, DeliveryStatus
+from .utils import get_redis, invalidate_user_caches, redis_lock
+
+logger = logging.getLogger(__name__)
+
+LOG_BUFFER_KEY = "breaks:logs:buffer"
+LOG_PROCESSING_KEY = "breaks:logs:processing"
+LOG_FLUSH_LOCK_KEY = "breaks:logs:flush-lock"
+
+# A flusher that dies holding the lock blocks others for at most this long.
+FLUSH_LOCK_SECONDS = 60
+
+
+def buffering_enabled():
+    return settings.BREAK_LOG_WRITE_MODE == "buffered"
+
+
+def buffer_break_logs(user_ids, triggered_at):
+    """Queue one break log event per user, all at ``triggered_at``."""
+    events = [
+        json.dumps({
+            'event_id': uuid4().hex,
+            'user_id': user_id,
+            'triggered_at': triggered_at.isoformat(),
+        })
+        for user_id in user_ids
+    ]
+    if events:
+        get_redis().rpush(LOG_BUFFER_KEY, *events)
+
+
+def buffer_delivery_status(user_ids, triggered_at, status):
+    """Queue a delivery status for the logs of ``user_ids`` at ``triggered_at``."""
+    get_redis().rpush(LOG_BUFFER_KEY, json.dumps({
+        'user_ids': list(user_ids),
+        'triggered_at': triggered_at.isoformat(),
+        'status': status,
+    }))
+
+
+def update_delivery_status(user_ids, triggered_at, status):
+    """Set the status of the logs of ``user_ids`` at ``triggered_at``.
+
+    A log stays failed while one of its channels is dead-lettered, however
+    the others fare; replaying the dead letters resets it to pending.
+    """
+    logs = BreakLog.objects.filter(user_id__in=user_ids, triggered_at=triggered_at)
+    if status == DeliveryStatus.SENT:
+        logs = logs.exclude(status=DeliveryStatus.FAILED)
+    logs.update(status=status)
+
+
+def buffered_count():
+    client = get_redis()
+    return client.llen(LOG_BUFFER_KEY) + client.llen(LOG_PROCESSING_KEY)
+
+
+def flush_break_logs(batch_size=None):
+    """Persist one batch of buffered events; returns how many events were handled.
+
+    Returns 0 without flushing if another flusher is running.
+    """
+    batch_size = batch_size or settings.BREAK_LOG_FLUSH_BATCH_SIZE
+    client = get_redis()
+
+    with redis_lock(LOG_FLUSH_LOCK_KEY, FLUSH_LOCK_SECONDS) as acquired:
+        if not acquired:
+            return 0
+
+        # Events left by a flusher that stopped before clearing them.
+        events = client.lrange(LOG_PROCESSING_KEY, 0, -1)
+        if events:
+            logger.warning(f"Re-flushing {len(events)} break log events from an interrupted flush")
+        else:
+            pipeline = client.pipeline()
+            for _ in range(batch_size):
+                pipeline.lmove(LOG_BUFFER_KEY, LOG_PROCESSING_KEY, "LEFT", "RIGHT")
+            events = [event for event in pipeline.execute() if event is not None]
+            if not events:
+                return 0
+
+        persist_events(events)
+        client.delete(LOG_PROCESSING_KEY)
+
+    return len(events)
+
+
+def persist_events(events):
+    events = [json.loads(event) for event in events]
+    statuses = [event for event in events if 'status' in event]
+    events = [event for event in events if 'status' not in event]
+    existing = set(
+        User.objects.filter(id__in={event['user_id'] for event in events})
+        .values_list('id', flat=True)
+    )
+    dropped = len([event for event in events if event['user_id'] not in existing])
+    if dropped:
+        logger.warning(f"Dropped {dropped} buffered break logs of deleted users")
+
+    BreakLog.objects.bulk_create(
+        (
+            BreakLog(
+                user_id=event['user_id'],
+                triggered_at=parse_datetime(event['triggered_at']),
+                event_id=event['event_id'],
+            )
+            for event in events
+            if event['user_id'] in existing
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    # In queue order, so the latest status of a log wins.
+    for event in statuses:
+        update_delivery_status(
+            event['user_ids'], parse_datetime(event['triggered_at']), event['status']
+        )
+    invalidate_user_caches(existing)
@@ -0,0 +1,357 @@
+import asyncio
+import logging
+import os
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import aiosmtplib
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import sanitize_address
+
+logger = logging.getLogger(__name__)
+
+# Errors after which a connection is dropped and the send retried on a fresh one.
+RECONNECT_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    ConnectionError,
+    TimeoutError,
+)
+
+# Idle connections older than this are probed with NOOP before being reused.
+NOOP_AFTER_SECONDS = 5
+
+
+def permanent_smtp_error(error):
+    """Whether the server rejected a message for good (5xx), so resending cannot help.
+
+    Takes smtplib and aiosmtplib errors alike; anything else is temporary.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+    elif isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        codes = [recipient.code for recipient in error.recipients]
+    elif isinstance(error, smtplib.SMTPResponseException):
+        codes = [error.smtp_code]
+    elif isinstance(error, aiosmtplib.SMTPResponseException):
+        codes = [error.code]
+    else:
+        return False
+    return bool(codes) and all(500 <= code < 600 for code in codes)
+
+
+class ConnectionPool:
+    """Per-process pool of open email backend connections, reused across sends."""
+
+    def __init__(self, backend, max_connections=2, max_idle_seconds=300, batch_size=100):
+        self.backend = backend
+        self.max_idle_seconds = max_idle_seconds
+        self.batch_size = batch_size
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """Borrow an open connection; it is returned to the pool unless the block raises."""
+        with self._slots:
+            connection = self._checkout()
+            try:
+                yield connection
+            except BaseException:
+                self._discard(connection)
+                raise
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+
+    def send_messages(self, email_messages, fail_silently=False):
+        sent = 0
+        for start in range(0, len(email_messages), self.batch_size):
+            batch = email_messages[start:start + self.batch_size]
+            sent += self._send_batch(batch, fail_silently)
+        return sent
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def _send_batch(self, batch, fail_silently):
+        sent = position = 0
+        reconnected = False
+
+        while position < len(batch):
+            try:
+                with self.connection() as connection:
+                    for message in batch[position:]:
+                        try:
+                            sent += connection.send_messages([message]) or 0
+                        except RECONNECT_ERRORS:
+                            raise
+                        except Exception as e:
+                            if not fail_silently:
+                                raise
+                            logger.error(f"Failed to send email to {message.to}: {e}")
+                        position += 1
+            except RECONNECT_ERRORS as e:
+                if reconnected:
+                    if not fail_silently:
+                        raise
+                    logger.error(f"Email connection lost again, giving up on batch: {e}")
+                    return sent
+                reconnected = True
+                logger.warning(f"Email connection lost, reconnecting: {e}")
+
+        return sent
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, released_at = self._idle.pop()
+
+            idle_for = time.monotonic() - released_at
+            if idle_for <= self.max_idle_seconds and (
+                idle_for <= NOOP_AFTER_SECONDS or self._is_alive(connection)
+            ):
+                return connection
+            self._discard(connection)
+
+        connection = get_connection(self.backend)
+        connection.open()
+        return connection
+
+    @staticmethod
+    def _is_alive(connection):
+        if not hasattr(connection, 'connection'):
+            return True
+        try:
+            return connection.connection.noop()[0] == 250
+        except (AttributeError, smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return this process's pool, creating a fresh one after a fork."""
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                backend=settings.EMAIL_POOL_BACKEND,
+                max_connections=settings.EMAIL_POOL_MAX_CONNECTIONS,
+                max_idle_seconds=settings.EMAIL_POOL_MAX_IDLE_SECONDS,
+                batch_size=settings.EMAIL_POOL_BATCH_SIZE,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def close_pool():
+    """Close this process's sync and async connection pools."""
+    global _pool, _async_pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+        async_pool, _async_pool = _async_pool, None
+    if pool is not None:
+        pool.close()
+    if async_pool is not None and _async_pool_pid == os.getpid():
+        async_pool.close()
+
+
+@worker_process_shutdown.connect
+def close_pool_on_shutdown(**kwargs):
+    close_pool()
+
+
+class PooledEmailBackend(BaseEmailBackend):
+    """Email backend that sends through the process-wide ConnectionPool."""
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        return get_pool().send_messages(list(email_messages), fail_silently=self.fail_silently)
+
+
+class AsyncConnectionPool:
+    """Per-process pool of open aiosmtplib connections, reused across sends.
+
+    aiosmtplib connections belong to the event loop they were opened on, so
+    the pool runs one loop in a daemon thread for the life of the process and
+    every send is driven on it: a loop per send would close them at its end.
+    """
+
+    def __init__(self, max_idle_seconds=300):
+        self.max_idle_seconds = max_idle_seconds
+        # Only touched from the loop's thread.
+        self._idle = deque()
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._run_loop, name='async-smtp-pool', daemon=True).start()
+
+    def run(self, coroutine):
+        """Run ``coroutine`` on the pool's loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def checkout(self):
+        """An open connection: the most recently used idle one, or a new one."""
+        while self._idle:
+            smtp, released_at = self._idle.pop()
+            idle_for = time.monotonic() - released_at
+            if idle_for <= self.max_idle_seconds and smtp.is_connected and (
+                idle_for <= NOOP_AFTER_SECONDS or await self._is_alive(smtp)
+            ):
+                return smtp
+            smtp.close()
+        return await self._connect()
+
+    def checkin(self, smtp):
+        self._idle.append((smtp, time.monotonic()))
+
+    def close(self):
+        self.run(self._quit_idle())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _quit_idle(self):
+        idle, self._idle = self._idle, deque()
+        for smtp, _ in idle:
+            try:
+                await smtp.quit()
+            except (aiosmtplib.SMTPException, OSError):
+                smtp.close()
+
+    @staticmethod
+    async def _is_alive(smtp):
+        try:
+            return (await smtp.noop()).code == 250
+        except (aiosmtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    async def _connect():
+        login = settings.EMAIL_HOST_USER and settings.EMAIL_HOST_PASSWORD
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.EMAIL_HOST,
+            port=settings.EMAIL_PORT,
+            username=settings.EMAIL_HOST_USER if login else None,
+            password=settings.EMAIL_HOST_PASSWORD if login else None,
+            use_tls=settings.EMAIL_USE_SSL,
+            start_tls=settings.EMAIL_USE_TLS,
+            timeout=settings.EMAIL_TIMEOUT,
+        )
+        await smtp.connect()
+        return smtp
+
+
+_async_pool = None
+_async_pool_pid = None
+
+
+def get_async_pool():
+    """Return this process's async pool, creating a fresh one after a fork."""
+    global _async_pool, _async_pool_pid
+
+    with _pool_lock:
+        if _async_pool is None or _async_pool_pid != os.getpid():
+            # A forked child has no copy of the parent's loop thread.
+            _async_pool = AsyncConnectionPool(
+                max_idle_seconds=settings.EMAIL_POOL_MAX_IDLE_SECONDS,
+            )
+            _async_pool_pid = os.getpid()
+        return _async_pool
+
+
+class AsyncDelivery:
+    """Deliver messages over up to ``concurrency`` SMTP connections driven by one asyncio loop.
+
+    Each connection is a coroutine pulling from a shared queue, so a single
+    worker process keeps up to ``concurrency`` messages in flight at once.
+    Connections come from the process's AsyncConnectionPool and go back to
+    it, so later sends skip the connect, TLS and login handshakes.
+    """
+
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        # (message, error, retryable) for each message of the last send that was not delivered.
+        self.failures = []
+
+    def send_messages(self, email_messages):
+        self.failures = []
+        if not email_messages:
+            return 0
+        pool = get_async_pool()
+        return pool.run(self._deliver(pool, email_messages))
+
+    async def _deliver(self, pool, email_messages):
+        queue = asyncio.Queue()
+        for message in email_messages:
+            queue.put_nowait(message)
+
+        workers = min(self.concurrency, len(email_messages))
+        sent = await asyncio.gather(*(self._worker(pool, queue) for _ in range(workers)))
+        return sum(sent)
+
+    async def _worker(self, pool, queue):
+        sent = 0
+        smtp = None
+        try:
+            while not queue.empty():
+                message = queue.get_nowait()
+                for attempt in range(2):
+                    try:
+                        if smtp is None:
+                            smtp = await pool.checkout()
+                        await self._send(smtp, message)
+                        sent += 1
+                        break
+                    except (ConnectionError, TimeoutError) as e:
+                        if smtp is not None:
+                            smtp.close()
+                            smtp = None
+                        if attempt:
+                            logger.error(f"Failed to send email to {message.to}: {e}")
+                            self.failures.append((message, str(e), True))
+                        else:
+                            logger.warning(f"Email connection lost, reconnecting: {e}")
+                    except aiosmtplib.SMTPException as e:
+                        logger.error(f"Failed to send email to {message.to}: {e}")
+                        self.failures.append((message, str(e), not permanent_smtp_error(e)))
+                        break
+        finally:
+            if smtp is not None:
+                pool.checkin(smtp)
+        return sent
+
+    @staticmethod
+    async def _send(smtp, message):
+        encoding = message.encoding or settings.DEFAULT_CHARSET
+        await smtp.sendmail(
+            sanitize_address(message.from_email, encoding),
+            [sanitize_address(address, encoding) for address in message.recipients()],
+            message.message().as_bytes(linesep="\r\n"),
+        )
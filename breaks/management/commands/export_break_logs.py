@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from breaks.export import EXPORT_FORMATS, export_queryset, iter_rows
+from breaks.filters import parse_moment
+
+
+class Command(BaseCommand):
+    help = "Stream break logs as CSV or NDJSON to stdout or a file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument(
+            '--user', help="Username to export; every user's logs are exported when omitted.",
+        )
+        parser.add_argument('--since', help="Only logs at or after this ISO 8601 date/datetime.")
+        parser.add_argument('--until', help="Only logs before this ISO 8601 date/datetime.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+            help="Rows fetched per database round trip.",
+        )
+        parser.add_argument('--file', help="Write to this path instead of stdout.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist.")
+
+        queryset = export_queryset(user=user)
+        for option, lookup in (('since', 'gte'), ('until', 'lt')):
+            if options[option]:
+                moment = parse_moment(options[option])
+                if moment is None:
+                    raise CommandError(f"--{option} must be an ISO 8601 date or datetime.")
+                queryset = queryset.filter(**{f'triggered_at__{lookup}': moment})
+
+        stream, _ = EXPORT_FORMATS[options['output_format']]
+        chunks = stream(iter_rows(queryset, options['chunk_size']))
+
+        if options['file']:
+            with open(options['file'], 'w', newline='') as file:
+                file.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
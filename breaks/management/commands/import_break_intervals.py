@@ -0,0 +1,48 @@
+import csv
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from breaks.bulk import import_intervals
+
+COLUMNS = ('username', 'interval_minutes')
+
+
+class Command(BaseCommand):
+    help = "Create or update break intervals from a CSV with username,interval_minutes columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help="Path of the CSV file, or - for stdin.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.BREAK_INTERVAL_IMPORT_CHUNK_SIZE,
+            help="Rows written per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        if options['file'] == '-':
+            result = self.import_file(sys.stdin, options['chunk_size'])
+        else:
+            try:
+                with open(options['file'], newline='') as file:
+                    result = self.import_file(file, options['chunk_size'])
+            except OSError as e:
+                raise CommandError(f"Cannot read {options['file']}: {e}")
+
+        for error in result['errors']:
+            for field, messages in error['errors'].items():
+                for message in messages:
+                    self.stderr.write(f"Line {error['row']}: {field}: {message}")
+
+        self.stdout.write(
+            f"Created {result['created']} and updated {result['updated']} break intervals; "
+            f"skipped {len(result['errors'])} invalid rows."
+        )
+
+    def import_file(self, file, chunk_size):
+        reader = csv.DictReader(file)
+        missing = set(COLUMNS) - set(reader.fieldnames or ())
+        if missing:
+            raise CommandError(f"Missing CSV columns: {', '.join(sorted(missing))}.")
+        # Line 1 is the header.
+        return import_intervals(reader, chunk_size, first_row=2)
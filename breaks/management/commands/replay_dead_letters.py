@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from breaks.filters import parse_moment
+from breaks.models import DeadLetter
+from breaks.tasks import delivery_queue_room, replay_dead_letters
+
+
+class Command(BaseCommand):
+    help = "Queue dead-lettered reminders for delivery again."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--channel', help="Only reminders that failed on this channel.")
+        parser.add_argument('--user', help="Only reminders of this username.")
+        parser.add_argument(
+            '--since', help="Only reminders that failed at or after this ISO 8601 date/datetime.",
+        )
+        parser.add_argument('--limit', type=int, help="Replay at most this many reminders.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.BREAK_REMINDER_CHUNK_SIZE,
+            help="Reminders per retry task.",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only count the reminders that would be replayed.",
+        )
+
+    def handle(self, *args, **options):
+        queryset = DeadLetter.objects.order_by('id')
+        if options['channel']:
+            queryset = queryset.filter(channel=options['channel'])
+        if options['user']:
+            queryset = queryset.filter(user__username=options['user'])
+        if options['since']:
+            moment = parse_moment(options['since'])
+            if moment is None:
+                raise CommandError("--since must be an ISO 8601 date or datetime.")
+            queryset = queryset.filter(failed_at__gte=moment)
+
+        remaining = queryset.count()
+        if options['limit'] is not None:
+            remaining = min(remaining, options['limit'])
+        if options['dry_run']:
+            self.stdout.write(f"{remaining} dead letters would be replayed")
+            return
+
+        replayed = 0
+        last_id = 0
+        while replayed < remaining:
+            # Replayed reminders join the delivery queue: wait while it is full.
+            while delivery_queue_room() == 0:
+                time.sleep(1)
+
+            size = min(options['chunk_size'], remaining - replayed)
+            chunk = list(queryset.filter(id__gt=last_id)[:size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            replayed += replay_dead_letters(chunk)
+
+        self.stdout.write(f"Replayed {replayed} dead letters")
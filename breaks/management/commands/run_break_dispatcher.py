@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from breaks.scheduling import due_queue_enabled, seconds_until_next_due, sync_due_queue
+from breaks.tasks import dispatch_due_breaks
+
+
+class Command(BaseCommand):
+    help = "Dispatch reminders from the Redis due queue as soon as they expire."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-sleep', type=float, default=1.0,
+            help="Longest pause between polls of the due queue, in seconds.",
+        )
+        parser.add_argument(
+            '--no-sync', action='store_true',
+            help="Skip syncing the due queue with the intervals' due times on startup.",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Dispatch the currently due users and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if not due_queue_enabled():
+            raise CommandError("Set BREAK_SCHEDULER_MODE=queue to use the due-queue dispatcher.")
+
+        if not options['no_sync']:
+            sync_due_queue()
+
+        while True:
+            dispatched = dispatch_due_breaks()
+            if dispatched:
+                self.stdout.write(f"Dispatched reminders for {dispatched} users")
+            if options['once']:
+                return
+            if dispatched >= settings.BREAK_SCHEDULE_BATCH_SIZE:
+                continue
+
+            wait = seconds_until_next_due(timezone.now())
+            if not dispatched and wait == 0:
+                # Users are due but were deferred while the delivery queue is full.
+                wait = None
+            time.sleep(options['max_sleep'] if wait is None else min(wait, options['max_sleep']))
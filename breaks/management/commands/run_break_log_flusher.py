@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from breaks.logbuffer import buffering_enabled, flush_break_logs
+
+
+class Command(BaseCommand):
+    help = "Persist buffered break logs in batches as they arrive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval-ms', type=int, default=settings.BREAK_LOG_FLUSH_INTERVAL_MS,
+            help="Longest time an event waits in the buffer while the buffer is not full.",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Flush everything currently buffered and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if not buffering_enabled():
+            raise CommandError("Set BREAK_LOG_WRITE_MODE=buffered to use the break log flusher.")
+
+        batch_size = settings.BREAK_LOG_FLUSH_BATCH_SIZE
+        while True:
+            flushed = flush_break_logs(batch_size)
+            if flushed:
+                self.stdout.write(f"Flushed {flushed} break logs")
+            if flushed >= batch_size or (options['once'] and flushed):
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval_ms'] / 1000)
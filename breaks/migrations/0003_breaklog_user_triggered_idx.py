@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breaks', '0002_breaklog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='breaklog',
+            index=models.Index(fields=['user', '-triggered_at'], name='breaklog_user_triggered_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:31
+
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, IntegerField
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce, Now
+
+
+def backfill_next_due_at(apps, schema_editor):
+    BreakInterval = apps.get_model('breaks', 'BreakInterval')
+    BreakLog = apps.get_model('breaks', 'BreakLog')
+
+    last_break = (
+        BreakLog.objects.filter(user=OuterRef('user'))
+        .order_by('-triggered_at')
+        .values('triggered_at')[:1]
+    )
+    interval = ExpressionWrapper(
+        ExpressionWrapper(F('interval_minutes'), output_field=IntegerField())
+        * timedelta(minutes=1),
+        output_field=DurationField(),
+    )
+    BreakInterval.objects.update(next_due_at=ExpressionWrapper(
+        Coalesce(Subquery(last_break) + interval, Now()),
+        output_field=DateTimeField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breaks', '0003_breaklog_user_triggered_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='breakinterval',
+            name='next_due_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, null=True),
+        ),
+        migrations.RunPython(backfill_next_due_at, migrations.RunPython.noop),
+    ]
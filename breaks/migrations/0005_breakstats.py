@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_break_stats(apps, schema_editor):
+    BreakLog = apps.get_model('breaks', 'BreakLog')
+    BreakStats = apps.get_model('breaks', 'BreakStats')
+
+    totals = BreakLog.objects.values('user').annotate(
+        total=Count('id'), last=Max('triggered_at')
+    ).order_by()
+    BreakStats.objects.bulk_create(
+        (BreakStats(user_id=row['user'], total_breaks=row['total'], last_break_at=row['last'])
+         for row in totals.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breaks', '0004_breakinterval_next_due_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BreakStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_breaks', models.PositiveIntegerField(default=0)),
+                ('last_break_at', models.DateTimeField(null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='break_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_break_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breaks', '0005_breakstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='breaklog',
+            index=models.Index(fields=['user', '-triggered_at', '-id'], name='breaklog_user_triggered_id_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='breaklog',
+            name='breaklog_user_triggered_idx',
+        ),
+    ]
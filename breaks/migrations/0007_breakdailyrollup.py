@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breaks', '0006_breaklog_user_triggered_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BreakDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('breaks', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='breaklog',
+            index=models.Index(fields=['triggered_at'], name='breaklog_triggered_idx'),
+        ),
+        migrations.AddField(
+            model_name='breakdailyrollup',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='breakdailyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='breakdailyrollup_user_day_uniq'),
+        ),
+    ]
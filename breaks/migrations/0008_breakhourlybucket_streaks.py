@@ -0,0 +1,84 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:03
+
+import django.db.models.deletion
+from django.conf import settings
+from datetime import timedelta, timezone
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate, TruncHour
+
+
+def backfill_hourly_buckets(apps, schema_editor):
+    BreakLog = apps.get_model('breaks', 'BreakLog')
+    BreakHourlyBucket = apps.get_model('breaks', 'BreakHourlyBucket')
+
+    counts = (
+        BreakLog.objects.annotate(hour=TruncHour('triggered_at', tzinfo=timezone.utc))
+        .values('user_id', 'hour')
+        .annotate(breaks=Count('id'))
+        .order_by()
+    )
+    BreakHourlyBucket.objects.bulk_create(
+        (BreakHourlyBucket(**row) for row in counts.iterator()), batch_size=1000
+    )
+
+
+def backfill_streaks(apps, schema_editor):
+    BreakLog = apps.get_model('breaks', 'BreakLog')
+    BreakStats = apps.get_model('breaks', 'BreakStats')
+
+    days = (
+        BreakLog.objects.annotate(day=TruncDate('triggered_at', tzinfo=timezone.utc))
+        .values_list('user_id', 'day')
+        .distinct()
+        .order_by('user_id', 'day')
+    )
+    streaks = {}
+    previous = (None, None)
+    for user_id, day in days.iterator():
+        current, longest = streaks.get(user_id, (0, 0))
+        current = current + 1 if previous == (user_id, day - timedelta(days=1)) else 1
+        streaks[user_id] = (current, max(longest, current))
+        previous = (user_id, day)
+
+    stats = list(BreakStats.objects.filter(user_id__in=streaks))
+    for row in stats:
+        row.current_streak, row.longest_streak = streaks[row.user_id]
+    BreakStats.objects.bulk_update(stats, ['current_streak', 'longest_streak'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breaks', '0007_breakdailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='breakstats',
+            name='current_streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='breakstats',
+            name='longest_streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BreakHourlyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('breaks', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_buckets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='breakhourlybucket_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'hour'), name='breakhourlybucket_user_hour_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_hourly_buckets, migrations.RunPython.noop),
+        migrations.RunPython(backfill_streaks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breaks', '0008_breakhourlybucket_streaks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='breaklog',
+            name='event_id',
+            field=models.UUIDField(editable=False, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='breaklog',
+            name='triggered_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
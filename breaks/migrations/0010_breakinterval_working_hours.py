@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:28
+
+import breaks.workhours
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breaks', '0009_breaklog_event_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='breakinterval',
+            name='paused',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='breakinterval',
+            name='snoozed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='breakinterval',
+            name='timezone',
+            field=models.CharField(default='UTC', max_length=64, validators=[breaks.workhours.validate_timezone]),
+        ),
+        migrations.AddField(
+            model_name='breakinterval',
+            name='work_days',
+            field=models.PositiveSmallIntegerField(default=127),
+        ),
+        migrations.AddField(
+            model_name='breakinterval',
+            name='work_end',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='breakinterval',
+            name='work_start',
+            field=models.TimeField(blank=True, null=True),
+        ),
+    ]
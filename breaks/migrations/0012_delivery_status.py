@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breaks', '0011_notification_channels'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Logs written before delivery was tracked count as sent; new ones start pending.
+        migrations.AddField(
+            model_name='breaklog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='sent', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='breaklog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='DeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(max_length=50)),
+                ('subject', models.CharField(max_length=200)),
+                ('body', models.TextField()),
+                ('triggered_at', models.DateTimeField()),
+                ('attempts', models.PositiveSmallIntegerField()),
+                ('error', models.TextField(blank=True)),
+                ('failed_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dead_letters', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
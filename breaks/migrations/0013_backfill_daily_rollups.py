@@ -0,0 +1,39 @@
+from datetime import timezone
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_rollups(apps, schema_editor):
+    """Roll up the days of history that live reminder counts never saw.
+
+    Since the reminder tasks increment today's rollup, rollup_daily_breaks
+    only recounts from the newest rollup on. Existing rows are kept: they are
+    complete, or recent enough to be recounted.
+    """
+    BreakLog = apps.get_model('breaks', 'BreakLog')
+    BreakDailyRollup = apps.get_model('breaks', 'BreakDailyRollup')
+
+    counts = (
+        BreakLog.objects.annotate(day=TruncDate('triggered_at', tzinfo=timezone.utc))
+        .values('user_id', 'day')
+        .annotate(breaks=Count('id'))
+        .order_by()
+    )
+    BreakDailyRollup.objects.bulk_create(
+        (BreakDailyRollup(**row) for row in counts.iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breaks', '0012_delivery_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_rollups, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,79 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, IntegerField
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Greatest, Mod
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from .scheduling import due_queue_enabled, schedule_users
+from .workhours import ALL_DAYS, next_working_time, validate_timezone
+
+
+# Notification channels (keys of NOTIFICATION_TRANSPORTS) for users who have not chosen any.
+DEFAULT_CHANNELS = ['email']
+
+
+def default_channels():
+    return list(DEFAULT_CHANNELS)
+
+
+class DeliveryStatus(models.TextChoices):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+
+def interval_duration():
+    """SQL expression for a row's ``interval_minutes`` as a duration."""
+    return ExpressionWrapper(
+        ExpressionWrapper(F('interval_minutes'), output_field=IntegerField())
+        * timedelta(minutes=1),
+        output_field=DurationField(),
+    )
+
+
+class BreakIntervalQuerySet(models.QuerySet):
+
+    def due(self, now):
+        """Intervals whose next reminder is due, oldest first (backed by the next_due_at index)."""
+        return self.filter(next_due_at__lte=now).order_by('next_due_at')
+
+    def in_shard(self, shard, shard_count):
+        """Restrict to the users whose id falls into ``shard`` of ``shard_count``."""
+        if shard_count == 1:
+            return self
+        return self.alias(shard=Mod('user_id', shard_count)).filter(shard=shard)
+
+    def reschedule_from(self, triggered_at):
+        """Set next_due_at to ``triggered_at`` plus each row's own interval in one UPDATE."""
+        next_due_at = ExpressionWrapper(
+            Value(triggered_at, output_field=DateTimeField()) + interval_duration(),
+            output_field=DateTimeField(),
+        )
+        updated = self.update(next_due_at=next_due_at)
+        self.restricted(triggered_at).fit_to_working_hours()
+
+        if due_queue_enabled():
+            schedule_users(dict(self.values_list('user_id', 'next_due_at')))
+        return updated
+
+    def restricted(self, now):
+        """Intervals whose due time may be moved by working hours, a pause or a snooze."""
+        return self.filter(
+            Q(work_start__isnull=False) | ~Q(work_days=ALL_DAYS) | Q(paused=True)
+            | Q(snoozed_until__gt=now)
+        )
+
+    def fit_to_working_hours(self):
+        """Move each row's stored next_due_at to the user's next working moment."""
+        intervals = list(self.exclude(next_due_at=None))
+        for interval in intervals:
+            interval.next_due_at = interval.next_working_time(interval.next_due_at)
+        BreakInterval.objects.bulk_update(intervals, ['next_due_at'])
 
 
 class BreakInterval(models.Model):
@@ -9,16 +82,233 @@ class BreakInterval(models.Model):
         default=60,
         validators=[MinValueValidator(5), MaxValueValidator(480)]
     )
+    # Always the first moment the user is at work, unpaused and not snoozed
+    # (None while paused), so the due query needs no other conditions.
+    next_due_at = models.DateTimeField(default=timezone.now, null=True, db_index=True)
+    timezone = models.CharField(max_length=64, default='UTC', validators=[validate_timezone])
+    # Local working hours; both empty means around the clock on working days.
+    work_start = models.TimeField(null=True, blank=True)
+    work_end = models.TimeField(null=True, blank=True)
+    # Bit 0 is Monday.
+    work_days = models.PositiveSmallIntegerField(default=ALL_DAYS)
+    paused = models.BooleanField(default=False)
+    snoozed_until = models.DateTimeField(null=True, blank=True)
+    # Names of the channels reminders are delivered on.
+    channels = models.JSONField(default=default_channels)
+    webhook_url = models.URLField(max_length=500, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BreakIntervalQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.username} - every {self.interval_minutes} min"
 
+    def clean(self):
+        if (self.work_start is None) != (self.work_end is None):
+            raise ValidationError("Set both work_start and work_end, or neither.")
+        if not 0 < self.work_days <= ALL_DAYS:
+            raise ValidationError({'work_days': "Choose at least one working day."})
+
+    def next_working_time(self, moment):
+        """The first moment at or after ``moment`` a reminder may be sent; None while paused."""
+        if self.paused:
+            return None
+        if self.snoozed_until and self.snoozed_until > moment:
+            moment = self.snoozed_until
+        return next_working_time(
+            moment, self.timezone, self.work_start, self.work_end, self.work_days
+        )
+
+    def reschedule(self):
+        """Recompute next_due_at from the user's latest break; due now if there is none.
+
+        The latest break comes from BreakStats, which is updated as soon as a
+        break is recorded, even while its BreakLog is still in the write buffer.
+        """
+        last_break = (
+            BreakStats.objects.filter(user_id=self.user_id)
+            .values_list('last_break_at', flat=True)
+            .first()
+        )
+        if last_break:
+            next_due_at = last_break + timedelta(minutes=self.interval_minutes)
+        else:
+            next_due_at = timezone.now()
+        self.next_due_at = self.next_working_time(next_due_at)
+        self.save(update_fields=['next_due_at'])
+
 
 class BreakLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    triggered_at = models.DateTimeField(auto_now_add=True)
+    # Defaults to now but can be given explicitly, as buffered logs keep the
+    # time the reminder was sent rather than the time they were flushed.
+    triggered_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Set for logs written through the write-behind buffer, where it makes
+    # redelivered events idempotent.
+    event_id = models.UUIDField(null=True, unique=True, editable=False)
+    # Pending until the reminder is delivered on every channel of the user, or
+    # failed once its retries run out and it is moved to the DeadLetter table.
+    status = models.CharField(
+        max_length=10, choices=DeliveryStatus.choices, default=DeliveryStatus.PENDING
+    )
+
+    class Meta:
+        indexes = [
+            # Serves per-user history pages and date ranges in (triggered_at, id) key order.
+            models.Index(
+                fields=['user', '-triggered_at', '-id'], name='breaklog_user_triggered_id_idx'
+            ),
+            # Serves the cross-user time-range scans of the daily rollup and retention pruning.
+            models.Index(fields=['triggered_at'], name='breaklog_triggered_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - break at {self.triggered_at}"
+
+
+class BreakStatsQuerySet(models.QuerySet):
+
+    def record_breaks(self, user_ids, triggered_at):
+        """Count one more break for each user, creating missing stats rows first."""
+        self.bulk_create(
+            (BreakStats(user_id=user_id) for user_id in user_ids), ignore_conflicts=True
+        )
+        day = timezone.localdate(triggered_at)
+        streak = Case(
+            When(last_break_at__date=day, then=F('current_streak')),
+            When(last_break_at__date=day - timedelta(days=1), then=F('current_streak') + 1),
+            default=Value(1),
+        )
+        return self.filter(user_id__in=user_ids).update(
+            total_breaks=F('total_breaks') + 1,
+            last_break_at=triggered_at,
+            current_streak=streak,
+            longest_streak=Greatest(F('longest_streak'), streak),
+        )
+
+
+class BreakStats(models.Model):
+    """Per-user break totals, maintained as breaks are logged so reads never scan BreakLog."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='break_stats')
+    total_breaks = models.PositiveIntegerField(default=0)
+    last_break_at = models.DateTimeField(null=True)
+    # Consecutive days with at least one break, up to the day of last_break_at.
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+
+    objects = BreakStatsQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.user.username} - {self.total_breaks} breaks"
+
+    def streak_on(self, day):
+        """The current streak as seen on ``day``: broken once a full day passes without breaks."""
+        if self.last_break_at is None:
+            return 0
+        if timezone.localdate(self.last_break_at) >= day - timedelta(days=1):
+            return self.current_streak
+        return 0
+
+
+class BreakDailyRollupQuerySet(models.QuerySet):
+
+    def record_breaks(self, user_ids, triggered_at):
+        """Count one more break for each user on the (UTC) day of ``triggered_at``."""
+        day = timezone.localdate(triggered_at)
+        self.bulk_create(
+            (BreakDailyRollup(user_id=user_id, day=day) for user_id in user_ids),
+            ignore_conflicts=True,
+        )
+        return self.filter(user_id__in=user_ids, day=day).update(breaks=F('breaks') + 1)
+
+
+class BreakDailyRollup(models.Model):
+    """Breaks per user per (UTC) day, kept after raw BreakLog rows are pruned."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    breaks = models.PositiveIntegerField(default=0)
+
+    objects = BreakDailyRollupQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='breakdailyrollup_user_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.breaks} breaks on {self.day}"
+
+
+class BreakHourlyBucketQuerySet(models.QuerySet):
+
+    def record_breaks(self, user_ids, triggered_at):
+        """Count one more break for each user in the hour of ``triggered_at``."""
+        hour = triggered_at.replace(minute=0, second=0, microsecond=0)
+        self.bulk_create(
+            (BreakHourlyBucket(user_id=user_id, hour=hour) for user_id in user_ids),
+            ignore_conflicts=True,
+        )
+        return self.filter(user_id__in=user_ids, hour=hour).update(breaks=F('breaks') + 1)
+
+
+class BreakHourlyBucket(models.Model):
+    """Breaks per user per (UTC) hour, maintained as breaks are logged."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hourly_buckets')
+    hour = models.DateTimeField()
+    breaks = models.PositiveIntegerField(default=0)
+
+    objects = BreakHourlyBucketQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'hour'], name='breakhourlybucket_user_hour_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['hour'], name='breakhourlybucket_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.breaks} breaks at {self.hour}"
+
+
+class Notification(models.Model):
+    """A reminder delivered on the in-app channel."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-id'], name='notification_user_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.subject} at {self.created_at}"
+
+
+class DeadLetter(models.Model):
+    """A reminder that could not be delivered on one channel after all its retries."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='dead_letters')
+    channel = models.CharField(max_length=50)
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    # The time of the BreakLog the reminder belongs to.
+    triggered_at = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField()
+    error = models.TextField(blank=True)
+    failed_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.channel} reminder of {self.triggered_at}"
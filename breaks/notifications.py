@@ -0,0 +1,229 @@
+"""
+Multi-channel delivery of break reminders.
+
+Each channel is a Transport that sends a whole batch of reminders at once,
+over its own pooled connections and within its own concurrency limit:
+
+- ``email``: the pooled SMTP backend, or asyncio SMTP in "async" delivery mode,
+  paced by the EMAIL_RATE_LIMIT_PER_SECOND token bucket shared by all workers.
+- ``webhook``: a JSON ``{"text": ...}`` POST (Slack/Teams incoming-webhook
+  style) to the user's webhook_url, from WEBHOOK_CONCURRENCY threads sharing
+  one keep-alive HTTP session per process.
+- ``in_app``: a Notification row, served by /api/notifications/.
+
+route_reminders splits a batch by each user's channels and sends the remote
+channels from parallel threads, so a batch takes as long as its slowest
+channel rather than the sum of all of them. NOTIFICATION_TRANSPORTS maps
+channel names to transport classes, so channels can be added in settings.
+
+Transports report the reminders they could not deliver rather than raising,
+so a batch's failures can be retried on their channel alone. Each failure
+says whether it is worth retrying: a rejection that resending cannot fix
+(no webhook URL, a 4xx reply, an SMTP 5xx) is not.
+"""
+
+import logging
+import os
+import threading
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+from .mail import RECONNECT_ERRORS, AsyncDelivery, permanent_smtp_error
+from .models import DEFAULT_CHANNELS, Notification
+from .ratelimit import email_bucket, rate_limited
+
+logger = logging.getLogger(__name__)
+
+# ``triggered_at`` is the time of the BreakLog the reminder is delivered for.
+Reminder = namedtuple('Reminder', ['user', 'subject', 'body', 'triggered_at'], defaults=[None])
+Failure = namedtuple('Failure', ['channel', 'reminder', 'error', 'retryable'], defaults=[True])
+# Reminders delivered per channel, and a Failure for each one that was not.
+Delivery = namedtuple('Delivery', ['sent', 'failures'])
+
+
+class Transport:
+    """Delivers batches of reminders on one channel."""
+
+    # Remote transports wait on the network and run in their own thread;
+    # local ones run in the calling thread, on its database connection.
+    remote = True
+
+    def send(self, reminders):
+        """Deliver ``reminders``.
+
+        Returns ``(reminder, error, retryable)`` for each one that was not delivered.
+        """
+        raise NotImplementedError
+
+
+class EmailTransport(Transport):
+
+    def send(self, reminders):
+        emails = [
+            (reminder, EmailMessage(
+                subject=reminder.subject,
+                body=reminder.body,
+                from_email=settings.EMAIL_HOST_USER,
+                to=[reminder.user.email],
+            ))
+            for reminder in reminders
+        ]
+        bucket = email_bucket()
+        chunks = [emails] if bucket is None else rate_limited(emails, bucket)
+        return [failure for chunk in chunks for failure in self.deliver(chunk)]
+
+    @staticmethod
+    def deliver(emails):
+        if settings.BREAK_DELIVERY_MODE == 'async':
+            delivery = AsyncDelivery(settings.BREAK_ASYNC_CONCURRENCY)
+            delivery.send_messages([message for _, message in emails])
+            reminders = {id(message): reminder for reminder, message in emails}
+            return [
+                (reminders[id(message)], error, retryable)
+                for message, error, retryable in delivery.failures
+            ]
+
+        failed = []
+        connection = get_connection()
+        for position, (reminder, message) in enumerate(emails):
+            try:
+                connection.send_messages([message])
+            except RECONNECT_ERRORS as e:
+                # The server is unreachable: fail the rest now rather than time out on each.
+                failed.extend((reminder, str(e), True) for reminder, _ in emails[position:])
+                break
+            except Exception as e:
+                logger.error(f"Failed to send email to {message.to}: {e}")
+                failed.append((reminder, str(e), not permanent_smtp_error(e)))
+        return failed
+
+
+class WebhookTransport(Transport):
+
+    def send(self, reminders):
+        session = get_http_session()
+        workers = min(settings.WEBHOOK_CONCURRENCY, len(reminders))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda reminder: self.post(session, reminder), reminders)
+            return [(reminder, *result) for reminder, result in zip(reminders, results) if result]
+
+    @staticmethod
+    def post(session, reminder):
+        """POST one reminder; returns ``(error, retryable)``, or None once delivered."""
+        url = webhook_url_for(reminder.user)
+        if not url:
+            logger.error(f"No webhook URL for {reminder.user.username}, skipping")
+            return "No webhook URL", False
+        try:
+            response = session.post(
+                url,
+                json={'text': f"*{reminder.subject}*\n{reminder.body}"},
+                timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.error(f"Failed to post webhook for {reminder.user.username}: {e}")
+            status = e.response.status_code if e.response is not None else None
+            # A 4xx will be refused again, except a timeout or rate limit.
+            return str(e), not (status and 400 <= status < 500 and status not in (408, 429))
+        return None
+
+
+class InAppTransport(Transport):
+    remote = False
+
+    def send(self, reminders):
+        Notification.objects.bulk_create(
+            Notification(user=reminder.user, subject=reminder.subject, body=reminder.body)
+            for reminder in reminders
+        )
+        return []
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Return this process's webhook session, creating a fresh one after a fork."""
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=settings.WEBHOOK_CONCURRENCY)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _session_pid = os.getpid()
+        return _session
+
+
+def get_transports():
+    return {
+        channel: import_string(path)()
+        for channel, path in settings.NOTIFICATION_TRANSPORTS.items()
+    }
+
+
+def channels_for(user):
+    try:
+        return user.breakinterval.channels
+    except ObjectDoesNotExist:
+        return DEFAULT_CHANNELS
+
+
+def webhook_url_for(user):
+    try:
+        return user.breakinterval.webhook_url
+    except ObjectDoesNotExist:
+        return ''
+
+
+def route_reminders(reminders):
+    """Send each reminder on its user's channels, all channels at once.
+
+    Users should come with ``select_related('breakinterval')``. Returns a
+    Delivery; a failing channel does not stop the others.
+    """
+    batches = defaultdict(list)
+    for reminder in reminders:
+        for channel in channels_for(reminder.user):
+            batches[channel].append(reminder)
+    return send_batches(batches)
+
+
+def send_batches(batches):
+    """Send ``{channel: reminders}``, remote channels in parallel; returns a Delivery."""
+    transports = get_transports()
+    for channel in [channel for channel in batches if channel not in transports]:
+        logger.warning(f"Unknown channel {channel} for {len(batches.pop(channel))} users")
+
+    sent, failures = {}, []
+
+    def send(channel):
+        batch = batches[channel]
+        try:
+            failed = transports[channel].send(batch)
+        except Exception as e:
+            logger.error(f"Delivery on {channel} failed for {len(batch)} users: {e}")
+            failed = [(reminder, str(e), True) for reminder in batch]
+        sent[channel] = len(batch) - len(failed)
+        failures.extend(Failure(channel, *failure) for failure in failed)
+
+    remote = [channel for channel in batches if transports[channel].remote]
+    with ThreadPoolExecutor(max_workers=max(len(remote), 1)) as executor:
+        for channel in remote:
+            executor.submit(send, channel)
+        for channel in batches:
+            if not transports[channel].remote:
+                send(channel)
+
+    return Delivery(sent, failures)
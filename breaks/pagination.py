@@ -0,0 +1,95 @@
+"""
+Keyset pagination for append-mostly tables such as BreakLog.
+
+Pages are ordered newest first by (timestamp, id). The cursor holds the key
+of the last row served, and the next page is a range scan strictly after it.
+Deep pages therefore cost the same as the first one. Rows inserted while a
+client is paging never shift later pages.
+"""
+
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    ordering_field = 'triggered_at'
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        field = self.ordering_field
+        queryset = queryset.order_by(f'-{field}', '-id')
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            position, last_id = self.decode_cursor(encoded)
+            # The leading <= bound keeps this a single range scan of the index.
+            queryset = queryset.filter(
+                Q(**{f'{field}__lte': position}),
+                Q(**{f'{field}__lt': position}) | Q(id__lt=last_id),
+            )
+
+        rows = list(queryset[:page_size + 1])
+        self.page = rows[:page_size]
+        self.has_next = len(rows) > page_size
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = self.encode_cursor(getattr(last, self.ordering_field), last.id)
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    @staticmethod
+    def encode_cursor(position, last_id):
+        return base64.urlsafe_b64encode(f"{position.isoformat()}|{last_id}".encode()).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode()).decode()
+            position, last_id = raw.rsplit('|', 1)
+            position, last_id = parse_datetime(position), int(last_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position, last_id
+
+
+class NotificationPagination(KeysetPagination):
+    ordering_field = 'created_at'
@@ -0,0 +1,82 @@
+"""
+Send-rate limits shared by every worker.
+
+A TokenBucket lives in one Redis hash: the tokens left and when they were
+last counted. Tokens refill continuously at ``rate`` per second up to
+``capacity``, which is also the largest burst. Each take is a WATCH /
+MULTI transaction, so concurrent workers never spend the same token: a
+worker whose read was overtaken simply retries.
+"""
+
+import time
+
+import redis
+from django.conf import settings
+
+from .utils import get_redis
+
+EMAIL_BUCKET_KEY = "breaks:ratelimit:email"
+
+
+class TokenBucket:
+
+    def __init__(self, key, rate, capacity):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+
+    def try_take(self, tokens=1, now=None):
+        """Take ``tokens`` if available; returns 0, or the seconds until they will be."""
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot take {tokens} tokens from a bucket of {self.capacity}")
+
+        with get_redis().pipeline() as pipeline:
+            while True:
+                try:
+                    pipeline.watch(self.key)
+                    moment = time.time() if now is None else now
+                    level, updated = pipeline.hmget(self.key, 'tokens', 'updated')
+                    if level is None:
+                        available = self.capacity
+                    else:
+                        elapsed = max(moment - float(updated), 0)
+                        available = min(self.capacity, float(level) + elapsed * self.rate)
+
+                    if available < tokens:
+                        pipeline.unwatch()
+                        return (tokens - available) / self.rate
+
+                    pipeline.multi()
+                    pipeline.hset(
+                        self.key, mapping={'tokens': available - tokens, 'updated': moment}
+                    )
+                    # An idle bucket is full again after capacity / rate seconds.
+                    pipeline.expire(self.key, int(self.capacity / self.rate) + 1)
+                    pipeline.execute()
+                    return 0
+                except redis.WatchError:
+                    continue
+
+    def take(self, tokens=1):
+        """Block until ``tokens`` have been taken."""
+        while True:
+            wait = self.try_take(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+def email_bucket():
+    """The bucket of outbound email, or None when EMAIL_RATE_LIMIT_PER_SECOND is 0."""
+    rate = settings.EMAIL_RATE_LIMIT_PER_SECOND
+    if not rate:
+        return None
+    return TokenBucket(EMAIL_BUCKET_KEY, rate, settings.EMAIL_RATE_LIMIT_BURST)
+
+
+def rate_limited(items, bucket):
+    """Yield ``items`` in slices of at most the bucket's capacity, each once it may be sent."""
+    for start in range(0, len(items), bucket.capacity):
+        chunk = items[start:start + bucket.capacity]
+        bucket.take(len(chunk))
+        yield chunk
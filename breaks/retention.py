@@ -0,0 +1,174 @@
+"""
+Tiered retention of break history.
+
+Raw BreakLog rows are summarised into BreakDailyRollup (breaks per user per
+UTC day). The reminder tasks increment the rollups as they log breaks, and
+rollup_daily_breaks periodically recounts recent days from the raw rows,
+which also fills in logs written by any other path (older history is
+rolled up once by migration 0013). Rows older than
+BREAK_LOG_RETENTION_DAYS are then deleted in batches of
+BREAK_LOG_PRUNE_BATCH_SIZE. When BREAK_LOG_ARCHIVE_DIR is set, each batch
+is first appended to a gzipped NDJSON file in that directory. Hourly
+buckets are kept for the same window; older hours are only served by day.
+Totals never depend on raw rows: per-user totals live in BreakStats and
+per-day counts in the rollups.
+"""
+
+import gzip
+import logging
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count, Exists, Max, OuterRef
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .export import stream_ndjson
+from .models import BreakDailyRollup, BreakHourlyBucket, BreakLog
+from .utils import invalidate_user_caches
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_BATCH_SIZE = 1000
+
+# Days before the newest rollup that are recounted too, to pick up logs that
+# arrived around midnight.
+RECOUNT_DAYS = 1
+
+
+def start_of_day(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def recount_start():
+    """Start of the oldest day the next rollup recounts, or None before the first rollup."""
+    last_day = BreakDailyRollup.objects.aggregate(day=Max('day'))['day']
+    if last_day is None:
+        return None
+    return start_of_day(last_day - timedelta(days=RECOUNT_DAYS))
+
+
+def rollup_daily_breaks():
+    """Recount breaks per user per day from just before the newest rollup onwards.
+
+    Older days are complete, so each run only re-reads the raw rows of the
+    last couple of days. The first run rolls up the whole history.
+    """
+    logs = BreakLog.objects.all()
+    start = recount_start()
+    if start is not None:
+        logs = logs.filter(triggered_at__gte=start)
+
+    counts = (
+        logs.annotate(day=TruncDate('triggered_at', tzinfo=dt_timezone.utc))
+        .values('user_id', 'day')
+        .annotate(breaks=Count('id'))
+        .order_by()
+    )
+
+    rolled_up = 0
+    batch = []
+    for row in counts.iterator(chunk_size=ROLLUP_BATCH_SIZE):
+        batch.append(BreakDailyRollup(**row))
+        if len(batch) >= ROLLUP_BATCH_SIZE:
+            rolled_up += save_rollups(batch)
+            batch = []
+    if batch:
+        rolled_up += save_rollups(batch)
+
+    logger.info(f"Rolled up {rolled_up} user-days of breaks")
+    return rolled_up
+
+
+def save_rollups(rollups):
+    BreakDailyRollup.objects.bulk_create(
+        rollups, update_conflicts=True, unique_fields=['user', 'day'], update_fields=['breaks'],
+    )
+    return len(rollups)
+
+
+def prune_break_logs(now=None):
+    """Delete (after archiving, if configured) raw logs older than the retention window.
+
+    Rows the rollup could still recount, or whose day has no rollup yet, are
+    never pruned, so the rollups stay complete. Returns the number of rows
+    removed.
+    """
+    retention_days = settings.BREAK_LOG_RETENTION_DAYS
+    start = recount_start()
+    if not retention_days or start is None:
+        return 0
+
+    now = now or timezone.now()
+    cutoff = min(now - timedelta(days=retention_days), start)
+    batch_size = settings.BREAK_LOG_PRUNE_BATCH_SIZE
+    rolled_up = BreakDailyRollup.objects.filter(user=OuterRef('user'), day=OuterRef('day'))
+    expired = (
+        BreakLog.objects.filter(triggered_at__lt=cutoff)
+        .annotate(day=TruncDate('triggered_at', tzinfo=dt_timezone.utc))
+        .filter(Exists(rolled_up))
+        .order_by('triggered_at', 'id')
+        .values_list('id', 'user_id', 'user__username', 'triggered_at')
+    )
+
+    pruned = 0
+    archive = None
+    try:
+        while True:
+            rows = list(expired[:batch_size])
+            if not rows:
+                break
+            if settings.BREAK_LOG_ARCHIVE_DIR:
+                if archive is None:
+                    archive = open_archive(now)
+                archive.writelines(stream_ndjson(rows))
+                archive.flush()
+            BreakLog.objects.filter(id__in=[row[0] for row in rows]).delete()
+            invalidate_user_caches({row[1] for row in rows})
+            pruned += len(rows)
+            if len(rows) < batch_size:
+                break
+    finally:
+        if archive is not None:
+            archive.close()
+
+    logger.info(f"Pruned {pruned} break logs older than {cutoff.isoformat()}")
+    return pruned
+
+
+def prune_hourly_buckets(now=None):
+    """Delete hourly buckets older than the retention window; returns how many."""
+    retention_days = settings.BREAK_LOG_RETENTION_DAYS
+    if not retention_days:
+        return 0
+
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=retention_days)
+    batch_size = settings.BREAK_LOG_PRUNE_BATCH_SIZE
+    expired = (
+        BreakHourlyBucket.objects.filter(hour__lt=cutoff)
+        .order_by('hour', 'id')
+        .values_list('id', flat=True)
+    )
+
+    pruned = 0
+    while True:
+        ids = list(expired[:batch_size])
+        if not ids:
+            break
+        BreakHourlyBucket.objects.filter(id__in=ids).delete()
+        pruned += len(ids)
+        if len(ids) < batch_size:
+            break
+
+    logger.info(f"Pruned {pruned} hourly break buckets older than {cutoff.isoformat()}")
+    return pruned
+
+
+def open_archive(now):
+    directory = Path(settings.BREAK_LOG_ARCHIVE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"break-logs-{now:%Y%m%dT%H%M%S}.ndjson.gz"
+    logger.info(f"Archiving pruned break logs to {path}")
+    return gzip.open(path, 'at', encoding='utf-8')
@@ -0,0 +1,135 @@
+"""
+Dispatch-side scheduling state kept in Redis.
+
+In the "queue" scheduler mode every user with a BreakInterval is a member of
+one sorted set scored by the Unix time of their next reminder. Dispatchers
+claim only expired members, so scheduling a user is O(log n) and a dispatch
+costs O(due users) regardless of how many users exist.
+
+In the "sweep" mode each due slot (a user's current next_due_at) is claimed
+with SET NX before its reminder is enqueued, so overlapping ticks cannot
+enqueue the same slot twice.
+"""
+
+import logging
+
+from django.conf import settings
+
+from .utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+DUE_QUEUE_KEY = "breaks:due"
+SLOT_CLAIM_KEY = "breaks:claim:{user_id}:{slot}"
+
+
+def due_queue_enabled():
+    return settings.BREAK_SCHEDULER_MODE == "queue"
+
+
+def schedule_users(due_times):
+    """Place users in the due queue; ``due_times`` maps user id to next due datetime.
+
+    Users whose due time is None (not scheduled) are removed from the queue.
+    """
+    scheduled = {user_id: due.timestamp() for user_id, due in due_times.items() if due}
+    unscheduled = [user_id for user_id, due in due_times.items() if not due]
+
+    pipeline = get_redis().pipeline()
+    if scheduled:
+        pipeline.zadd(DUE_QUEUE_KEY, scheduled)
+    if unscheduled:
+        pipeline.zrem(DUE_QUEUE_KEY, *unscheduled)
+    pipeline.execute()
+
+
+def unschedule_users(user_ids):
+    if user_ids:
+        get_redis().zrem(DUE_QUEUE_KEY, *user_ids)
+
+
+def claim_due_users(now, limit):
+    """Atomically claim up to ``limit`` users due at ``now``, oldest first.
+
+    A member is claimed by whichever dispatcher's ZREM removes it, so
+    concurrent dispatchers never claim the same user. Claimed users are
+    re-added with a lease of BREAK_DISPATCH_LEASE_SECONDS: the reminder task
+    replaces it with the real next due time (also for users it finds no
+    longer due), and if that task is lost the user simply becomes due again
+    when the lease expires.
+    """
+    client = get_redis()
+    candidates = client.zrangebyscore(DUE_QUEUE_KEY, "-inf", now.timestamp(), start=0, num=limit)
+    if not candidates:
+        return []
+
+    pipeline = client.pipeline()
+    for member in candidates:
+        pipeline.zrem(DUE_QUEUE_KEY, member)
+    removed = pipeline.execute()
+
+    claimed = [int(member) for member, was_removed in zip(candidates, removed) if was_removed]
+    if claimed:
+        lease_until = now.timestamp() + settings.BREAK_DISPATCH_LEASE_SECONDS
+        client.zadd(DUE_QUEUE_KEY, {user_id: lease_until for user_id in claimed}, nx=True)
+
+    return claimed
+
+
+def claim_due_slots(due_slots):
+    """Claim due slots (user id -> next_due_at) and return the user ids that won theirs.
+
+    A slot can be claimed once until its lease of BREAK_DISPATCH_LEASE_SECONDS
+    expires; after a reminder is sent the user's next_due_at, and so the
+    slot, changes.
+    """
+    if not due_slots:
+        return []
+
+    pipeline = get_redis().pipeline()
+    for user_id, next_due_at in due_slots.items():
+        key = SLOT_CLAIM_KEY.format(user_id=user_id, slot=int(next_due_at.timestamp() * 1000))
+        pipeline.set(key, 1, nx=True, ex=settings.BREAK_DISPATCH_LEASE_SECONDS)
+    claimed = pipeline.execute()
+
+    return [user_id for user_id, won in zip(due_slots, claimed) if won]
+
+
+def seconds_until_next_due(now):
+    """Seconds until the earliest queued reminder (0 if one is due, None if the queue is empty)."""
+    earliest = get_redis().zrange(DUE_QUEUE_KEY, 0, 0, withscores=True)
+    if not earliest:
+        return None
+
+    _, score = earliest[0]
+    return max(score - now.timestamp(), 0)
+
+
+def sync_due_queue(chunk_size=5000):
+    """Set every scheduled interval's due time in the due queue from the database.
+
+    Entries already queued are overwritten, so due times left stale by a
+    missed update or a stretch in sweep mode are corrected. Overwriting a
+    lease is harmless: the reminder task re-checks each user in the database.
+    """
+    from .models import BreakInterval
+
+    client = get_redis()
+    intervals = (
+        BreakInterval.objects.filter(next_due_at__isnull=False)
+        .values_list('user_id', 'next_due_at')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    changed = 0
+    batch = {}
+    for user_id, next_due_at in intervals:
+        batch[user_id] = next_due_at.timestamp()
+        if len(batch) >= chunk_size:
+            changed += client.zadd(DUE_QUEUE_KEY, batch, ch=True)
+            batch = {}
+    if batch:
+        changed += client.zadd(DUE_QUEUE_KEY, batch, ch=True)
+
+    logger.info(f"Due queue synced, {changed} users added or updated")
+    return changed
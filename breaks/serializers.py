@@ -1,21 +1,115 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import BreakInterval, BreakLog
+from .models import BreakDailyRollup, BreakInterval, BreakLog, Notification
+from .workhours import days_to_mask, mask_to_days
+
+
+class SparseFieldsMixin:
+    """Limit output to the comma-separated ``fields`` query parameter, when given."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request else None
+        if requested:
+            keep = {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+
+class WorkDaysField(serializers.ListField):
+    """The work_days bitmask as a list of ISO weekday numbers (0 is Monday)."""
+    child = serializers.IntegerField(min_value=0, max_value=6)
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('allow_empty', False)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return mask_to_days(value)
+
+    def to_internal_value(self, data):
+        return days_to_mask(super().to_internal_value(data))
+
+
+class ChannelsField(serializers.ListField):
+    """Names of notification channels, each one of NOTIFICATION_TRANSPORTS."""
+    child = serializers.CharField()
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('allow_empty', False)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        channels = list(dict.fromkeys(super().to_internal_value(data)))
+        known = settings.NOTIFICATION_TRANSPORTS
+        unknown = [channel for channel in channels if channel not in known]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown channels: {', '.join(unknown)}. Choose from: {', '.join(known)}."
+            )
+        return channels
 
 
 class BreakIntervalSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
     updated_at = serializers.DateTimeField(read_only=True)
+    next_due_at = serializers.DateTimeField(read_only=True)
+    work_days = WorkDaysField(required=False)
+    channels = ChannelsField(required=False)
 
     class Meta:
         model = BreakInterval
-        fields = ['id', 'user', 'interval_minutes', 'created_at', 'updated_at']
+        fields = [
+            'id', 'user', 'interval_minutes', 'timezone', 'work_start', 'work_end', 'work_days',
+            'paused', 'snoozed_until', 'channels', 'webhook_url', 'next_due_at', 'created_at',
+            'updated_at',
+        ]
+
+    def validate(self, attrs):
+        work_start = attrs.get('work_start', getattr(self.instance, 'work_start', None))
+        work_end = attrs.get('work_end', getattr(self.instance, 'work_end', None))
+        if (work_start is None) != (work_end is None):
+            raise serializers.ValidationError("Set both work_start and work_end, or neither.")
+
+        channels = attrs.get('channels', getattr(self.instance, 'channels', None)) or []
+        webhook_url = attrs.get('webhook_url', getattr(self.instance, 'webhook_url', ''))
+        if 'webhook' in channels and not webhook_url:
+            raise serializers.ValidationError({'webhook_url': "Required for the webhook channel."})
+        return attrs
 
 
-class BreakLogSerializer(serializers.ModelSerializer):
+class BreakIntervalImportSerializer(serializers.ModelSerializer):
+    """One row of a bulk interval import, with the model's interval_minutes rules."""
+    username = serializers.CharField(max_length=150)
+
+    class Meta:
+        model = BreakInterval
+        fields = ['username', 'interval_minutes']
+        extra_kwargs = {'interval_minutes': {'required': True}}
+
+
+class BreakLogSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     triggered_at = serializers.DateTimeField(read_only=True)
+    status = serializers.CharField(read_only=True)
 
     class Meta:
         model = BreakLog
-        fields = ['id', 'user', 'triggered_at']
+        fields = ['id', 'user', 'triggered_at', 'status']
+
+
+class BreakDailyRollupSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = BreakDailyRollup
+        fields = ['day', 'breaks']
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'subject', 'body', 'created_at', 'read_at']
+        read_only_fields = fields
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import BreakInterval, BreakLog
+from .scheduling import due_queue_enabled, schedule_users, unschedule_users
+from .utils import invalidate_user_caches
+
+
+@receiver(post_save, sender=BreakInterval)
+def queue_saved_interval(sender, instance, **kwargs):
+    if due_queue_enabled():
+        schedule_users({instance.user_id: instance.next_due_at})
+
+
+@receiver(post_delete, sender=BreakInterval)
+def unqueue_deleted_interval(sender, instance, **kwargs):
+    if due_queue_enabled():
+        unschedule_users([instance.user_id])
+
+
+# Bulk writes (reminder batches, the log buffer) send no signals and
+# invalidate explicitly. So do log deletes: a post_delete receiver on
+# BreakLog would turn off fast deletes and load every pruned row.
+@receiver(post_save, sender=BreakInterval)
+@receiver(post_delete, sender=BreakInterval)
+@receiver(post_save, sender=BreakLog)
+def invalidate_cached_user_data(sender, instance, **kwargs):
+    invalidate_user_caches([instance.user_id])
@@ -1,62 +1,446 @@
+import json
 import logging
-from datetime import timedelta
+import random
+import time
+from collections import defaultdict
+
+import redis
 from celery import shared_task
+from celery.signals import worker_init, worker_process_shutdown
 
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
+from django.db import connections, transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from .models import BreakInterval, BreakLog
-from .utils import get_reminder_content, fetch_inspirational_quote
+from .logbuffer import (
+    buffer_break_logs,
+    buffer_delivery_status,
+    buffering_enabled,
+    flush_break_logs,
+    update_delivery_status,
+)
+from .events import publish_reminders
+from .models import (
+    BreakDailyRollup,
+    BreakHourlyBucket,
+    BreakInterval,
+    BreakLog,
+    BreakStats,
+    DeadLetter,
+    DeliveryStatus,
+)
+from .notifications import Reminder, route_reminders, send_batches
+from .retention import prune_break_logs, prune_hourly_buckets, rollup_daily_breaks
+from .scheduling import claim_due_slots, claim_due_users, due_queue_enabled, schedule_users
+from .utils import (
+    get_reminder_content,
+    get_reminder_variants,
+    get_pooled_quotes,
+    get_redis,
+    invalidate_user_caches,
+    redis_lock,
+    refill_quote_pool,
+)
 
 
 logger = logging.getLogger(__name__)
 
+SHARD_LOCK_KEY = "breaks:scheduler:lock:{shard_count}:{shard}"
+SHARD_METRICS_KEY = "breaks:scheduler:metrics"
+
+
+def load_reminder_content(user_id=None):
+    try:
+        return get_reminder_content(user_id)
+    except Exception as e:
+        logger.error(f"Failed to load reminder content, using fallback: {e}")
+        return "Time for a break!", "Hey! Take a few minutes to stretch or rest."
+
+
+@worker_init.connect
+def validate_reminder_content(**kwargs):
+    """Refuse to start a worker whose messages.yaml cannot be loaded."""
+    variants = get_reminder_variants()
+    logger.info(f"Loaded {len(variants)} reminder variants")
+
+
+@worker_process_shutdown.connect
+def close_database_pools(**kwargs):
+    """Hand pooled PostgreSQL connections back to the server when a worker process exits."""
+    for connection in connections.all(initialized_only=True):
+        close_pool = getattr(connection, 'close_pool', None)
+        if close_pool is not None:
+            close_pool()
+
+
+def with_quote(message, quote):
+    return f"{message}\n\n{quote}" if quote else message
+
+
+def record_reminders(users):
+    """Log a break for each user, update their aggregates and schedule their next reminder.
+
+    Users whose interval is no longer due are skipped: another batch already
+    reminded them for this slot (the Redis claim only lasts
+    BREAK_DISPATCH_LEASE_SECONDS, a queued batch may wait longer). Returns
+    the time the breaks were logged at and the users they were logged for.
+    """
+    triggered_at = timezone.now()
+
+    with transaction.atomic():
+        # Locks the intervals until they are rescheduled below, so of two
+        # batches holding the same slot only the first sees it still due.
+        slots = dict(
+            BreakInterval.objects.select_for_update()
+            .filter(user_id__in=[user.id for user in users])
+            .values_list('user_id', 'next_due_at')
+        )
+        skipped = {
+            user_id for user_id, next_due_at in slots.items()
+            if next_due_at is None or next_due_at > triggered_at
+        }
+        if skipped:
+            logger.info(f"Skipped {len(skipped)} users no longer due for their reminder")
+            users = [user for user in users if user.id not in skipped]
+            if due_queue_enabled():
+                # Their claim left a lease in the due queue: put back their real due time.
+                schedule_users({user_id: slots[user_id] for user_id in skipped})
+        user_ids = [user.id for user in users]
+        if not user_ids:
+            return triggered_at, users
+
+        buffered = buffering_enabled()
+        if buffered:
+            # Queued first: should the transaction fail, the logs are still written.
+            buffer_break_logs(user_ids, triggered_at)
+        else:
+            BreakLog.objects.bulk_create(
+                BreakLog(user_id=user_id, triggered_at=triggered_at) for user_id in user_ids
+            )
+        BreakStats.objects.record_breaks(user_ids, triggered_at)
+        BreakHourlyBucket.objects.record_breaks(user_ids, triggered_at)
+        BreakDailyRollup.objects.record_breaks(user_ids, triggered_at)
+        BreakInterval.objects.filter(user_id__in=user_ids).reschedule_from(triggered_at)
+    invalidate_user_caches(user_ids)
+    return triggered_at, users
+
+
+def set_delivery_status(user_ids, triggered_at, status):
+    """Set the delivery status of the users' break logs of ``triggered_at``."""
+    if buffering_enabled():
+        # The logs may still be in the buffer: the flusher applies this after inserting them.
+        buffer_delivery_status(user_ids, triggered_at, status)
+    else:
+        update_delivery_status(user_ids, triggered_at, status)
+
 
 @shared_task
 def send_break_reminder(user_id):
     try:
-        user = User.objects.get(id=user_id)
-        BreakLog.objects.create(user=user)
-        logger.info(f"Break reminder logged for {user.username}")
+        user = User.objects.select_related('breakinterval').get(id=user_id)
+        triggered_at, recorded = record_reminders([user])
     except User.DoesNotExist:
         logger.error(f"User with ID {user_id} does not exist.")
         return
+    if not recorded:
+        return
+    logger.info(f"Break reminder logged for {user.username}")
 
-    try:
-        subject, message = get_reminder_content()
-    except Exception as e:
-        logger.error(f"Failed to load reminder content, using fallback: {e}")
-        subject = "Time for a break!"
-        message = "Hey! Take a few minutes to stretch or rest."
-
-    quote = fetch_inspirational_quote()
-    if quote:
-        message += f"\n\n{quote}"
-
-    send_mail(
-        subject=subject,
-        message=message,
-        from_email=settings.EMAIL_HOST_USER,
-        recipient_list=[user.email]
+    sent = deliver_reminders([user], triggered_at)
+    logger.info(f"Break reminder for {user.username} delivered: {sent}")
+
+
+@shared_task
+def send_break_reminders_batch(user_ids):
+    users = list(User.objects.filter(id__in=user_ids).select_related('breakinterval'))
+
+    missing = set(user_ids) - {user.id for user in users}
+    if missing:
+        logger.error(f"Users with IDs {sorted(missing)} do not exist.")
+    if not users:
+        return
+
+    triggered_at, users = record_reminders(users)
+    if not users:
+        return
+    logger.info(f"Break reminders logged for {len(users)} users")
+
+    sent = deliver_reminders(users, triggered_at)
+    logger.info(f"Break reminders for {len(users)} users delivered: {sent}")
+
+
+def deliver_reminders(users, triggered_at):
+    """Build each user's reminder and send it on their channels; returns sent per channel.
+
+    Open live streams get the reminder first, whatever the channels' fate.
+    Failed channels are retried in the background (see settle_delivery).
+    """
+    quotes = get_pooled_quotes(len(users))
+
+    reminders = []
+    for i, user in enumerate(users):
+        quote = quotes[i % len(quotes)] if quotes else None
+        subject, message = load_reminder_content(user.id)
+        reminders.append(Reminder(user, subject, with_quote(message, quote), triggered_at))
+
+    publish_reminders(reminders, triggered_at)
+    delivery = route_reminders(reminders)
+    settle_delivery(reminders, delivery.failures, attempt=0)
+    return delivery.sent
+
+
+@shared_task
+def retry_reminder_delivery(failed, attempt):
+    """Send reminders again on the channels they failed on.
+
+    ``failed`` holds a ``[user_id, channel, subject, body, triggered_at]``
+    entry per failed delivery, so the retry sends the same message.
+    """
+    users = User.objects.select_related('breakinterval').in_bulk(
+        {user_id for user_id, *_ in failed}
+    )
+    batches = defaultdict(list)
+    reminders = []
+    for user_id, channel, subject, body, triggered_at in failed:
+        user = users.get(user_id)
+        if user is None:
+            # Deleted since, together with their break logs.
+            continue
+        reminder = Reminder(user, subject, body, parse_datetime(triggered_at))
+        batches[channel].append(reminder)
+        reminders.append(reminder)
+
+    delivery = send_batches(batches)
+    logger.info(f"Retry {attempt} of {len(reminders)} reminders delivered: {delivery.sent}")
+    settle_delivery(reminders, delivery.failures, attempt)
+
+
+def settle_delivery(reminders, failures, attempt):
+    """Record the outcome of one delivery attempt of ``reminders``.
+
+    Logs whose reminder reached every channel are marked sent. Retryable
+    failures are retried after a backoff, off the worker, until
+    BREAK_DELIVERY_MAX_RETRIES retries have failed; they then go to the
+    DeadLetter table and their logs are marked failed. Permanent failures go
+    there at once.
+    """
+    failed = {(failure.reminder.user.id, failure.reminder.triggered_at) for failure in failures}
+    delivered = defaultdict(set)
+    for reminder in reminders:
+        if (reminder.user.id, reminder.triggered_at) not in failed:
+            delivered[reminder.triggered_at].add(reminder.user.id)
+    for triggered_at, user_ids in delivered.items():
+        set_delivery_status(sorted(user_ids), triggered_at, DeliveryStatus.SENT)
+
+    retries, dead = [], []
+    for failure in failures:
+        if failure.retryable and attempt < settings.BREAK_DELIVERY_MAX_RETRIES:
+            retries.append(failure)
+        else:
+            dead.append(failure)
+
+    if retries:
+        delay = retry_delay(attempt)
+        logger.warning(
+            f"Delivery of {len(retries)} reminders failed, retry {attempt + 1} in {delay:.0f} s"
+        )
+        retry_reminder_delivery.apply_async((
+            [
+                [failure.reminder.user.id, failure.channel, failure.reminder.subject,
+                 failure.reminder.body, failure.reminder.triggered_at.isoformat()]
+                for failure in retries
+            ],
+            attempt + 1,
+        ), countdown=delay)
+    if not dead:
+        return
+
+    logger.error(f"Delivery of {len(dead)} reminders failed after {attempt + 1} attempts")
+    DeadLetter.objects.bulk_create(
+        DeadLetter(
+            user=failure.reminder.user,
+            channel=failure.channel,
+            subject=failure.reminder.subject,
+            body=failure.reminder.body,
+            triggered_at=failure.reminder.triggered_at,
+            attempts=attempt + 1,
+            error=failure.error,
+        )
+        for failure in dead
     )
+    undelivered = defaultdict(set)
+    for failure in dead:
+        undelivered[failure.reminder.triggered_at].add(failure.reminder.user.id)
+    for triggered_at, user_ids in undelivered.items():
+        set_delivery_status(sorted(user_ids), triggered_at, DeliveryStatus.FAILED)
+
+
+def retry_delay(attempt):
+    """Seconds before retry ``attempt + 1``: exponential backoff with jitter.
+
+    Half the delay is fixed and half random, so the retries of batches that
+    failed together (say, during an SMTP outage) do not all return at once.
+    """
+    delay = min(
+        settings.BREAK_DELIVERY_RETRY_BASE_SECONDS * 2 ** attempt,
+        settings.BREAK_DELIVERY_RETRY_MAX_SECONDS,
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def replay_dead_letters(dead_letters):
+    """Queue ``dead_letters`` for delivery again, with a fresh series of retries."""
+    failed = [
+        [letter.user_id, letter.channel, letter.subject, letter.body,
+         letter.triggered_at.isoformat()]
+        for letter in dead_letters
+    ]
+    pending = defaultdict(set)
+    for letter in dead_letters:
+        pending[letter.triggered_at].add(letter.user_id)
 
-    logger.info(f"Email reminder sent to {user.email}")
+    with transaction.atomic():
+        DeadLetter.objects.filter(id__in=[letter.id for letter in dead_letters]).delete()
+        for triggered_at, user_ids in pending.items():
+            set_delivery_status(sorted(user_ids), triggered_at, DeliveryStatus.PENDING)
+        transaction.on_commit(lambda: retry_reminder_delivery.delay(failed, 0))
+    return len(failed)
 
 
 @shared_task
 def check_and_schedule_breaks():
-    now = timezone.now()
+    if due_queue_enabled():
+        dispatch_due_breaks()
+        return
+
+    shard_count = settings.BREAK_SCHEDULER_SHARDS
+    if shard_count == 1:
+        schedule_due_breaks(0, 1)
+        return
+
+    for shard in range(shard_count):
+        schedule_breaks_shard.delay(shard, shard_count)
+
+
+@shared_task
+def schedule_breaks_shard(shard, shard_count):
+    schedule_due_breaks(shard, shard_count)
+
+
+def schedule_due_breaks(shard, shard_count):
+    """Dispatch reminders for the due users of one shard, unless that shard is already running."""
+    lock_key = SHARD_LOCK_KEY.format(shard=shard, shard_count=shard_count)
+    with redis_lock(lock_key, settings.BREAK_SCHEDULER_LOCK_SECONDS) as acquired:
+        if not acquired:
+            logger.warning(f"Scheduler shard {shard}/{shard_count} is still running, skipping")
+            return
 
-    for interval in BreakInterval.objects.all():
-        user = interval.user
-        last_break = (
-            BreakLog.objects.filter(user=user).order_by('-triggered_at').first()
+        limit = dispatch_limit(shard_count)
+        if not limit:
+            logger.warning(
+                f"Delivery queue is full, deferring scheduler shard {shard}/{shard_count}"
+            )
+            return
+
+        started = time.monotonic()
+        now = timezone.now()
+        due_slots = dict(
+            BreakInterval.objects.due(now)
+            .in_shard(shard, shard_count)
+            .values_list('user_id', 'next_due_at')[:limit]
         )
+        due_user_ids = claim_due_slots(due_slots)
+        if len(due_user_ids) < len(due_slots):
+            logger.info(
+                f"Skipped {len(due_slots) - len(due_user_ids)} users already dispatched "
+                f"for their current due slot"
+            )
+        enqueue_reminder_batches(due_user_ids)
+
+        record_shard_metrics(shard, shard_count, len(due_user_ids), time.monotonic() - started)
+
 
-        interval_time = timedelta(minutes=interval.interval_minutes)
-        time_since_last = now - last_break.triggered_at if last_break else None
+def dispatch_due_breaks():
+    """Claim users whose Redis due-queue entry has expired and enqueue their reminders."""
+    limit = dispatch_limit()
+    if not limit:
+        logger.warning("Delivery queue is full, deferring due reminders")
+        return 0
+    user_ids = claim_due_users(timezone.now(), limit)
+    enqueue_reminder_batches(user_ids)
+    return len(user_ids)
 
-        if not last_break or time_since_last >= interval_time:
-            send_break_reminder.delay(user.id)
+
+def dispatch_limit(shard_count=1):
+    """How many due users one shard may enqueue without overfilling the delivery queue.
+
+    Users left over stay due and are picked up by a later tick.
+    """
+    limit = settings.BREAK_SCHEDULE_BATCH_SIZE
+    room = delivery_queue_room()
+    if room is not None:
+        # Shards run in parallel, so each gets its share of the room.
+        limit = min(limit, -(-room // shard_count))
+    return limit
+
+
+def delivery_queue_room():
+    """Users that still fit in the delivery queue, or None when its depth is not limited."""
+    max_depth = settings.BREAK_DELIVERY_MAX_QUEUE_DEPTH
+    if not max_depth:
+        return None
+    try:
+        # The broker is the Redis at REDIS_URL, which keeps each queue in a list of that name.
+        depth = get_redis().llen(settings.BREAK_DELIVERY_QUEUE)
+    except redis.RedisError as e:
+        logger.error(f"Failed to read the delivery queue depth: {e}")
+        return None
+    return max(max_depth - depth, 0) * settings.BREAK_REMINDER_CHUNK_SIZE
+
+
+def enqueue_reminder_batches(user_ids):
+    chunk_size = settings.BREAK_REMINDER_CHUNK_SIZE
+    for start in range(0, len(user_ids), chunk_size):
+        send_break_reminders_batch.delay(user_ids[start:start + chunk_size])
+
+
+def record_shard_metrics(shard, shard_count, due, duration):
+    logger.info(
+        f"Scheduler shard {shard}/{shard_count} dispatched {due} users in {duration * 1000:.1f} ms"
+    )
+    try:
+        get_redis().hset(SHARD_METRICS_KEY, f"{shard_count}:{shard}", json.dumps({
+            'due': due,
+            'duration_ms': round(duration * 1000, 1),
+            'finished_at': timezone.now().isoformat(),
+        }))
+    except redis.RedisError as e:
+        logger.error(f"Failed to record scheduler metrics: {e}")
+
+
+@shared_task
+def refill_quotes():
+    fetched = refill_quote_pool()
+    logger.info(f"Quote pool refilled with {fetched} quotes")
+
+
+@shared_task
+def flush_break_log_buffer():
+    """Fallback flush for when no run_break_log_flusher process is running."""
+    while flush_break_logs() >= settings.BREAK_LOG_FLUSH_BATCH_SIZE:
+        pass
+
+
+@shared_task
+def rollup_break_logs():
+    rollup_daily_breaks()
+
+
+@shared_task
+def prune_old_break_logs():
+    # Roll up first so the newest complete day is eligible for pruning.
+    rollup_daily_breaks()
+    prune_break_logs()
+    prune_hourly_buckets()
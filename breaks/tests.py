@@ -1,13 +1,86 @@
+import aiosmtplib
+import asyncio
+import fakeredis
+import gzip
+import importlib
+import json
+from io import StringIO
+import os
 import pytest
+import smtplib
+import socket
+import threading
+import time
+import yaml
+from aiosmtpd.controller import Controller
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.apps import apps as django_apps
 from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage
 from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
 from django.db import IntegrityError
+from django.db.models import Sum
 from django.urls import reverse
+from django.utils import timezone
+from django.test import AsyncClient
 from rest_framework.test import APIClient
 from unittest.mock import patch
-from .models import BreakInterval, BreakLog
-from breaks.tasks import send_break_reminder, check_and_schedule_breaks
-from breaks.utils import get_reminder_content, fetch_inspirational_quote
+from .authentication import issue_token
+from .events import EVENTS_CHANNEL, hub, publish_reminders, stream_events
+from .logbuffer import LOG_PROCESSING_KEY, buffer_break_logs, buffered_count, flush_break_logs
+from .mail import AsyncDelivery, ConnectionPool, close_pool, permanent_smtp_error
+from .models import (
+    BreakDailyRollup,
+    BreakHourlyBucket,
+    BreakInterval,
+    BreakLog,
+    BreakStats,
+    DeadLetter,
+    Notification,
+)
+from .notifications import Reminder, route_reminders
+from .ratelimit import EMAIL_BUCKET_KEY, TokenBucket, rate_limited
+from .retention import prune_break_logs, prune_hourly_buckets, rollup_daily_breaks
+from .scheduling import DUE_QUEUE_KEY, claim_due_slots, claim_due_users, sync_due_queue
+from .workhours import WEEKDAYS, days_to_mask, next_working_time, working_time
+from breaks.tasks import (
+    send_break_reminder,
+    send_break_reminders_batch,
+    SHARD_LOCK_KEY,
+    SHARD_METRICS_KEY,
+    check_and_schedule_breaks,
+    dispatch_due_breaks,
+    record_reminders,
+    retry_delay,
+    retry_reminder_delivery,
+    schedule_due_breaks,
+    validate_reminder_content,
+)
+from breaks.utils import (
+    QUOTE_POOL_KEY,
+    get_pooled_quote,
+    get_reminder_content,
+    fetch_inspirational_quote,
+    invalidate_user_caches,
+    user_cache_key,
+    refill_quote_pool,
+)
+
+
+@pytest.fixture(autouse=True)
+def redis_client(monkeypatch):
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    monkeypatch.setattr("breaks.utils._redis_client", client)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
 
 
 @pytest.fixture
@@ -61,6 +134,104 @@ class TestBreakIntervalModel:
         assert not BreakInterval.objects.filter(user_id=user.id).exists()
 
 
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class TestWorkingHours:
+    # 2026-10-14 is a Wednesday.
+
+    def test_inside_window_is_unchanged(self):
+        moment = utc(2026, 10, 14, 12)
+        assert next_working_time(moment, "UTC", dt_time(9), dt_time(17), WEEKDAYS) == moment
+
+    def test_moves_to_next_local_window(self):
+        # 18:00 in Kyiv (UTC+3) is after hours; 09:00 the next morning is 06:00 UTC.
+        moment = utc(2026, 10, 14, 15)
+        assert next_working_time(
+            moment, "Europe/Kyiv", dt_time(9), dt_time(17), WEEKDAYS
+        ) == utc(2026, 10, 15, 6)
+
+    def test_skips_weekend(self):
+        friday_evening = utc(2026, 10, 16, 18)
+        assert next_working_time(
+            friday_evening, "UTC", dt_time(9), dt_time(17), WEEKDAYS
+        ) == utc(2026, 10, 19, 9)
+
+    def test_overnight_window(self):
+        after_midnight = utc(2026, 10, 15, 2)
+        assert next_working_time(
+            after_midnight, "UTC", dt_time(22), dt_time(6), WEEKDAYS
+        ) == after_midnight
+
+    def test_no_working_days(self):
+        assert next_working_time(utc(2026, 10, 14), "UTC", None, None, 0) is None
+
+    def test_working_time_of_a_week(self):
+        assert working_time(
+            utc(2026, 10, 12), utc(2026, 10, 19), "Europe/Kyiv", dt_time(9), dt_time(17), WEEKDAYS
+        ) == timedelta(hours=40)
+
+    def test_working_time_of_overnight_window(self):
+        # Tuesday's window runs until 06:00 Wednesday; Wednesday's starts at 22:00.
+        assert working_time(
+            utc(2026, 10, 14), utc(2026, 10, 15), "UTC", dt_time(22), dt_time(6), WEEKDAYS
+        ) == timedelta(hours=8)
+
+    def test_working_time_across_dst_change(self):
+        # Kyiv's clocks go back an hour early on Sunday 2026-10-25: the weekend lasts 49 hours.
+        weekend = days_to_mask([5, 6])
+        assert working_time(
+            utc(2026, 10, 23), utc(2026, 10, 27), "Europe/Kyiv", None, None, weekend
+        ) == timedelta(hours=49)
+
+
+@pytest.mark.django_db
+class TestBreakIntervalSchedule:
+
+    def test_reschedule_respects_working_hours(self, user):
+        interval = BreakInterval.objects.create(
+            user=user, work_start=dt_time(9), work_end=dt_time(17), work_days=WEEKDAYS
+        )
+        BreakStats.objects.record_breaks([user.id], utc(2026, 10, 16, 16, 30))
+
+        interval.reschedule()
+
+        assert interval.next_due_at == utc(2026, 10, 19, 9)
+
+    def test_paused_interval_is_never_due(self, due_queue, redis_client, user):
+        interval = BreakInterval.objects.create(user=user)
+        interval.paused = True
+        interval.reschedule()
+
+        assert interval.next_due_at is None
+        assert not BreakInterval.objects.due(timezone.now()).exists()
+        assert redis_client.zscore(DUE_QUEUE_KEY, user.id) is None
+
+    def test_snooze_delays_next_reminder(self, user):
+        snoozed_until = timezone.now() + timedelta(hours=2)
+        interval = BreakInterval.objects.create(user=user, snoozed_until=snoozed_until)
+
+        interval.reschedule()
+
+        assert interval.next_due_at == snoozed_until
+
+    def test_batch_reschedule_fits_restricted_users(self, user):
+        night_owl = User.objects.create_user(username="night_owl", password="pass123")
+        BreakInterval.objects.create(user=user)
+        BreakInterval.objects.create(
+            user=night_owl, timezone="Asia/Tokyo", work_start=dt_time(9), work_end=dt_time(17),
+        )
+        # 09:00 UTC is 18:00 in Tokyo, so the next reminder waits for 09:00 there.
+        triggered_at = utc(2026, 10, 14, 9)
+
+        BreakInterval.objects.all().reschedule_from(triggered_at)
+
+        due = dict(BreakInterval.objects.values_list('user_id', 'next_due_at'))
+        assert due[user.id] == triggered_at + timedelta(minutes=60)
+        assert due[night_owl.id] == utc(2026, 10, 15, 0)
+
+
 @pytest.mark.django_db
 class TestAuth:
 
@@ -91,6 +262,54 @@ class TestAuth:
         assert b"Logout successful!" in response.content
 
 
+@pytest.mark.django_db
+class TestTokenAuth:
+
+    endpoint = reverse('break-interval-list')
+
+    def token_client(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+    def test_obtain_token(self, client, user):
+        credentials = {"username": "test_user", "password": "pass123"}
+        response = client.post(reverse('api-token'), credentials)
+
+        assert response.status_code == 200
+        assert self.token_client(response.data['token']).get(self.endpoint).status_code == 200
+
+    def test_obtain_token_bad_credentials(self, client, user):
+        response = client.post(reverse('api-token'), {"username": "test_user", "password": "nope"})
+        assert response.status_code == 400
+
+    def test_invalid_token(self, user):
+        token = issue_token(user)
+        assert self.token_client(token + "x").get(self.endpoint).status_code == 403
+
+    def test_expired_token(self, user, settings):
+        settings.API_TOKEN_MAX_AGE_SECONDS = -1
+        assert self.token_client(issue_token(user)).get(self.endpoint).status_code == 403
+
+    def test_password_change_revokes_token(self, user, settings):
+        settings.API_TOKEN_CACHE_SECONDS = 0
+        token = issue_token(user)
+
+        user.set_password("new-pass123")
+        user.save()
+
+        assert self.token_client(token).get(self.endpoint).status_code == 403
+
+    def test_cached_token_skips_user_lookup(self, user, create_interval, django_assert_num_queries):
+        client = self.token_client(issue_token(user))
+        client.get(self.endpoint)
+
+        # Only the interval list itself.
+        with django_assert_num_queries(1):
+            response = client.get(self.endpoint)
+        assert response.data[0]['interval_minutes'] == 60
+
+
 @pytest.mark.django_db
 class TestBreakIntervalAPI:
 
@@ -124,6 +343,46 @@ class TestBreakIntervalAPI:
         user.breakinterval.refresh_from_db()
         assert user.breakinterval.interval_minutes == 75
 
+    def test_update_interval_reschedules(self, authenticated_client, user, create_interval):
+        last_break_at = timezone.now() - timedelta(minutes=5)
+        BreakStats.objects.record_breaks([user.id], last_break_at)
+
+        authenticated_client.patch(
+            reverse("break-interval-detail", kwargs={"pk": user.breakinterval.pk}),
+            {"interval_minutes": 15},
+        )
+
+        user.breakinterval.refresh_from_db()
+        assert user.breakinterval.next_due_at == last_break_at + timedelta(minutes=15)
+
+    def test_working_hours_fields(self, authenticated_client, user):
+        response = authenticated_client.post(reverse("break-interval-list"), {
+            "timezone": "Europe/Kyiv", "work_start": "09:00", "work_end": "17:00",
+            "work_days": [0, 1, 2, 3, 4],
+        }, format="json")
+
+        assert response.status_code == 201
+        assert response.data["work_days"] == [0, 1, 2, 3, 4]
+        assert user.breakinterval.work_days == WEEKDAYS
+
+    @pytest.mark.parametrize("data", [
+        {"timezone": "Mars/Olympus"},
+        {"work_start": "09:00"},
+        {"work_days": []},
+        {"work_days": [7]},
+    ])
+    def test_invalid_working_hours(self, authenticated_client, data):
+        response = authenticated_client.post(reverse("break-interval-list"), data, format="json")
+        assert response.status_code == 400
+
+    def test_pause_clears_next_due(self, authenticated_client, user, create_interval):
+        authenticated_client.patch(
+            reverse("break-interval-detail", kwargs={"pk": create_interval.pk}), {"paused": True}
+        )
+
+        create_interval.refresh_from_db()
+        assert create_interval.next_due_at is None
+
     def test_delete_interval(self, authenticated_client, user, create_interval):
         response = authenticated_client.delete(
             reverse("break-interval-detail", kwargs={"pk": user.breakinterval.pk})
@@ -133,26 +392,342 @@ class TestBreakIntervalAPI:
         assert BreakInterval.objects.count() == 0
 
 
+@pytest.mark.django_db
+class TestBulkIntervalImport:
+
+    endpoint = reverse("break-interval-bulk")
+
+    @pytest.fixture
+    def staff_client(self, authenticated_client, user):
+        user.is_staff = True
+        user.save()
+        return authenticated_client
+
+    @pytest.fixture
+    def team(self, db):
+        return [
+            User.objects.create_user(username=f"member_{i}", password="pass123") for i in range(3)
+        ]
+
+    def test_requires_staff(self, authenticated_client, team):
+        response = authenticated_client.post(
+            self.endpoint, [{"username": "member_0", "interval_minutes": 30}], format="json"
+        )
+
+        assert response.status_code == 403
+        assert not BreakInterval.objects.exists()
+
+    def test_creates_and_updates(self, staff_client, team):
+        BreakInterval.objects.create(user=team[0], interval_minutes=60)
+        BreakStats.objects.create(user=team[1], last_break_at=timezone.now())
+
+        response = staff_client.post(self.endpoint, [
+            {"username": "member_0", "interval_minutes": 30},
+            {"username": "member_1", "interval_minutes": 45},
+        ], format="json")
+
+        assert response.status_code == 200
+        assert response.data == {"created": 1, "updated": 1, "errors": []}
+        intervals = {i.user_id: i for i in BreakInterval.objects.all()}
+        assert intervals[team[0].id].interval_minutes == 30
+        assert intervals[team[1].id].next_due_at == (
+            team[1].break_stats.last_break_at + timedelta(minutes=45)
+        )
+
+    def test_reports_row_errors(self, staff_client, team):
+        response = staff_client.post(self.endpoint, [
+            {"username": "member_0", "interval_minutes": 2},
+            {"username": "nobody", "interval_minutes": 30},
+            {"username": "member_1", "interval_minutes": 30},
+            {"username": "member_1", "interval_minutes": 40},
+            {"username": "member_2"},
+        ], format="json")
+
+        assert response.data["created"] == 1
+        assert [(e["row"], list(e["errors"])) for e in response.data["errors"]] == [
+            (0, ["interval_minutes"]), (1, ["username"]), (3, ["username"]),
+            (4, ["interval_minutes"]),
+        ]
+        assert BreakInterval.objects.get().interval_minutes == 30
+
+    def test_rejects_non_list(self, staff_client):
+        response = staff_client.post(
+            self.endpoint, {"username": "member_0", "interval_minutes": 30}, format="json"
+        )
+        assert response.status_code == 400
+
+    def test_schedules_and_invalidates(self, due_queue, redis_client, staff_client, team):
+        key = user_cache_key(team[0].id, "dashboard")
+        cache.set(key, "stale")
+
+        staff_client.post(
+            self.endpoint, [{"username": "member_0", "interval_minutes": 30}], format="json"
+        )
+
+        interval = BreakInterval.objects.get(user=team[0])
+        assert redis_client.zscore(DUE_QUEUE_KEY, team[0].id) == interval.next_due_at.timestamp()
+        assert cache.get(user_cache_key(team[0].id, "dashboard")) is None
+
+    def test_import_command(self, tmp_path, team):
+        path = tmp_path / "intervals.csv"
+        path.write_text(
+            "username,interval_minutes\nmember_0,30\nmember_1,abc\nmember_2,90\n"
+        )
+        out, err = StringIO(), StringIO()
+
+        call_command("import_break_intervals", str(path), "--chunk-size", "1",
+                     stdout=out, stderr=err)
+
+        assert "Created 2 and updated 0" in out.getvalue()
+        assert err.getvalue().startswith("Line 3: interval_minutes:")
+        assert BreakInterval.objects.count() == 2
+
+    def test_import_command_missing_columns(self, tmp_path):
+        path = tmp_path / "intervals.csv"
+        path.write_text("user,minutes\nmember_0,30\n")
+
+        with pytest.raises(CommandError):
+            call_command("import_break_intervals", str(path))
+
+
 @pytest.mark.django_db
 class TestBreakReminderTasks:
 
-    @patch("breaks.tasks.send_mail")
-    def test_send_reminder(self, mock_send, user, create_interval):
+    def test_send_reminder(self, user, create_interval):
         send_break_reminder(user.id)
 
         assert BreakLog.objects.filter(user=user).exists()
-        mock_send.assert_called_once()
+        assert [message.to for message in mail.outbox] == [[user.email]]
 
     @patch("breaks.tasks.logger")
     def test_send_reminder_invalid_user(self, mock_logger):
         send_break_reminder(9999)
         mock_logger.error.assert_called_once_with("User with ID 9999 does not exist.")
 
-    @patch("breaks.tasks.send_break_reminder.delay")
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
     def test_check_and_trigger(self, mock_delay, user, create_interval):
         check_and_schedule_breaks()
 
-        mock_delay.assert_called_once_with(user.id)
+        mock_delay.assert_called_once_with([user.id])
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_check_and_trigger_only_due_users(self, mock_delay, user, create_interval):
+        now = timezone.now()
+        recent = User.objects.create_user(username="recent_user", password="pass123")
+        BreakInterval.objects.create(
+            user=recent, interval_minutes=30, next_due_at=now + timedelta(minutes=29)
+        )
+        overdue = User.objects.create_user(username="overdue_user", password="pass123")
+        BreakInterval.objects.create(
+            user=overdue, interval_minutes=30, next_due_at=now - timedelta(minutes=1)
+        )
+
+        check_and_schedule_breaks()
+
+        (scheduled,), _ = mock_delay.call_args
+        assert sorted(scheduled) == sorted([user.id, overdue.id])
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_check_and_trigger_respects_batch_size(self, mock_delay, settings):
+        settings.BREAK_SCHEDULE_BATCH_SIZE = 2
+        now = timezone.now()
+        users = []
+        for i in range(3):
+            other = User.objects.create_user(username=f"user_{i}", password="pass123")
+            BreakInterval.objects.create(user=other, next_due_at=now - timedelta(minutes=i))
+            users.append(other)
+
+        check_and_schedule_breaks()
+
+        mock_delay.assert_called_once_with([users[2].id, users[1].id])
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_check_and_trigger_chunks_due_users(self, mock_delay, settings):
+        settings.BREAK_REMINDER_CHUNK_SIZE = 2
+        for i in range(5):
+            other = User.objects.create_user(username=f"user_{i}", password="pass123")
+            BreakInterval.objects.create(user=other)
+
+        check_and_schedule_breaks()
+
+        chunks = [call.args[0] for call in mock_delay.call_args_list]
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+    def test_send_reminders_batch(self, redis_client, user, create_interval):
+        redis_client.zadd(QUOTE_POOL_KEY, {'"Rest." - Someone': time.time()})
+        other = User.objects.create_user(
+            username="other_user", email="other@example.com", password="pass123"
+        )
+
+        send_break_reminders_batch([user.id, other.id])
+
+        assert BreakLog.objects.filter(user__in=[user, other]).count() == 2
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            "other@example.com", "test@example.com"
+        ]
+        assert all('"Rest." - Someone' in message.body for message in mail.outbox)
+
+        create_interval.refresh_from_db()
+        assert create_interval.next_due_at > timezone.now() + timedelta(minutes=59)
+
+    def test_send_reminders_batch_query_count(self, django_assert_num_queries):
+        user_ids = [
+            User.objects.create_user(username=f"user_{i}", password="pass123").id
+            for i in range(10)
+        ]
+
+        # Fetch users, then inside a savepoint: lock the due intervals, insert logs, insert
+        # missing stats, hourly and daily rows and increment each, reschedule intervals and
+        # fetch those restricted by working hours; after delivery, mark the logs sent.
+        with django_assert_num_queries(14):
+            send_break_reminders_batch(user_ids)
+
+        assert len(mail.outbox) == 10
+
+    @patch("breaks.tasks.logger")
+    def test_send_reminders_batch_missing_users(self, mock_logger):
+        send_break_reminders_batch([9998, 9999])
+
+        mock_logger.error.assert_called_once_with("Users with IDs [9998, 9999] do not exist.")
+        assert len(mail.outbox) == 0
+
+    def test_send_reminder_reschedules_interval(self, user, create_interval):
+        send_break_reminder(user.id)
+
+        create_interval.refresh_from_db()
+        last_break = BreakLog.objects.get(user=user).triggered_at
+        assert create_interval.next_due_at == last_break + timedelta(minutes=60)
+
+    def test_send_reminder_updates_stats(self, user):
+        send_break_reminder(user.id)
+        send_break_reminder(user.id)
+
+        stats = BreakStats.objects.get(user=user)
+        assert stats.total_breaks == 2
+        assert stats.last_break_at == BreakLog.objects.latest('triggered_at').triggered_at
+
+    def test_record_breaks_tracks_streaks(self, user):
+        day = timezone.now().replace(hour=12)
+        for days_ago in (5, 4, 3, 1, 0, 0):
+            BreakStats.objects.record_breaks([user.id], day - timedelta(days=days_ago))
+
+        stats = BreakStats.objects.get(user=user)
+        assert (stats.current_streak, stats.longest_streak) == (2, 3)
+        assert stats.streak_on(day.date()) == 2
+        assert stats.streak_on(day.date() + timedelta(days=2)) == 0
+
+    def test_send_reminders_batch_updates_stats(self, user):
+        other = User.objects.create_user(username="other_user", password="pass123")
+        BreakStats.objects.create(user=other, total_breaks=41)
+
+        send_break_reminders_batch([user.id, other.id])
+
+        totals = dict(BreakStats.objects.values_list('user_id', 'total_breaks'))
+        assert totals == {user.id: 1, other.id: 42}
+
+    @patch("breaks.tasks.schedule_breaks_shard.delay")
+    def test_check_and_trigger_fans_out_shards(self, mock_shard_delay, settings):
+        settings.BREAK_SCHEDULER_SHARDS = 3
+
+        check_and_schedule_breaks()
+
+        assert [call.args for call in mock_shard_delay.call_args_list] == [
+            (0, 3), (1, 3), (2, 3)
+        ]
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_shards_partition_due_users(self, mock_delay, redis_client):
+        user_ids = {
+            User.objects.create_user(username=f"user_{i}", password="pass123").id
+            for i in range(6)
+        }
+        for user_id in user_ids:
+            BreakInterval.objects.create(user_id=user_id)
+
+        shards = []
+        for shard in range(2):
+            mock_delay.reset_mock()
+            schedule_due_breaks(shard, 2)
+            (scheduled,), _ = mock_delay.call_args
+            shards.append(set(scheduled))
+
+        assert shards[0] | shards[1] == user_ids
+        assert not shards[0] & shards[1]
+        assert all(user_id % 2 == 0 for user_id in shards[0])
+        assert set(json.loads(redis_client.hget(SHARD_METRICS_KEY, "2:0"))) == {
+            "due", "duration_ms", "finished_at"
+        }
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_running_shard_is_not_scheduled_twice(
+        self, mock_delay, redis_client, user, create_interval
+    ):
+        redis_client.set(SHARD_LOCK_KEY.format(shard=0, shard_count=1), "other-tick")
+
+        check_and_schedule_breaks()
+
+        mock_delay.assert_not_called()
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_overlapping_ticks_dispatch_each_due_slot_once(
+        self, mock_delay, user, create_interval
+    ):
+        check_and_schedule_breaks()
+        check_and_schedule_breaks()
+
+        mock_delay.assert_called_once_with([user.id])
+
+        # Once the reminder has been sent the user is due again in a new slot.
+        send_break_reminders_batch([user.id])
+        BreakInterval.objects.filter(user=user).update(
+            next_due_at=timezone.now() - timedelta(seconds=1)
+        )
+        check_and_schedule_breaks()
+
+        assert mock_delay.call_count == 2
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_batch_queued_past_its_claim_is_not_sent_twice(
+        self, mock_delay, redis_client, user, create_interval
+    ):
+        check_and_schedule_breaks()
+        # The batch waits in the queue until the slot's claim expires.
+        redis_client.flushall()
+        check_and_schedule_breaks()
+        assert mock_delay.call_count == 2
+
+        for call in mock_delay.call_args_list:
+            send_break_reminders_batch(*call.args)
+
+        assert BreakLog.objects.filter(user=user).count() == 1
+        assert len(mail.outbox) == 1
+
+    def test_concurrent_slot_claims_have_one_winner(self):
+        due_slots = {user_id: timezone.now() for user_id in range(1, 51)}
+        results = []
+
+        def tick():
+            results.append(claim_due_slots(due_slots))
+
+        threads = [threading.Thread(target=tick) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        claimed = [user_id for result in results for user_id in result]
+        assert sorted(claimed) == list(range(1, 51))
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_check_and_trigger_query_count_is_constant(
+        self, mock_delay, django_assert_num_queries
+    ):
+        for i in range(10):
+            other = User.objects.create_user(username=f"user_{i}", password="pass123")
+            BreakInterval.objects.create(user=other)
+
+        with django_assert_num_queries(1):
+            check_and_schedule_breaks()
 
     def test_get_reminder_content(self):
         subject, message = get_reminder_content()
@@ -160,6 +735,229 @@ class TestBreakReminderTasks:
         assert isinstance(message, str) and message
 
 
+@pytest.fixture
+def messages_file(tmp_path, monkeypatch):
+    file = tmp_path / "messages.yaml"
+    file.write_text(
+        'break_reminder:\n'
+        '  subject: "Default"\n'
+        '  message: "Default message"\n'
+        '  variants:\n'
+        '    - subject: "Variant"\n'
+        '      message: "Variant message"\n',
+        encoding="utf-8",
+    )
+    monkeypatch.setattr("breaks.utils.MESSAGES_FILE", file)
+    return file
+
+
+class TestReminderContentCache:
+
+    def test_file_parsed_once(self, messages_file):
+        with patch("breaks.utils.yaml.safe_load", wraps=yaml.safe_load) as mock_load:
+            for _ in range(3):
+                get_reminder_content()
+
+        mock_load.assert_called_once()
+
+    def test_reloaded_when_file_changes(self, messages_file):
+        assert get_reminder_content() == ("Default", "Default message")
+
+        messages_file.write_text(
+            'break_reminder:\n  subject: "Changed"\n  message: "Changed message"\n',
+            encoding="utf-8",
+        )
+        stat = messages_file.stat()
+        os.utime(messages_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert get_reminder_content() == ("Changed", "Changed message")
+
+    def test_variant_selected_per_user(self, messages_file):
+        assert get_reminder_content(user_id=2) == ("Default", "Default message")
+        assert get_reminder_content(user_id=3) == ("Variant", "Variant message")
+
+    def test_invalid_file_rejected_at_worker_startup(self, messages_file):
+        messages_file.write_text("break_reminder:\n  subject: only\n", encoding="utf-8")
+
+        with pytest.raises(KeyError):
+            validate_reminder_content()
+
+
+@pytest.fixture
+def due_queue(settings):
+    settings.BREAK_SCHEDULER_MODE = "queue"
+
+
+@pytest.mark.django_db
+class TestDueQueueScheduler:
+
+    def test_interval_changes_keep_queue_in_sync(
+        self, due_queue, redis_client, authenticated_client, user
+    ):
+        interval = BreakInterval.objects.create(user=user)
+        assert redis_client.zscore(DUE_QUEUE_KEY, user.id) == interval.next_due_at.timestamp()
+
+        url = reverse("break-interval-detail", kwargs={"pk": interval.pk})
+        BreakLog.objects.create(user=user)
+        authenticated_client.patch(url, {"interval_minutes": 15})
+        interval.refresh_from_db()
+        assert redis_client.zscore(DUE_QUEUE_KEY, user.id) == interval.next_due_at.timestamp()
+
+        authenticated_client.delete(url)
+        assert redis_client.zscore(DUE_QUEUE_KEY, user.id) is None
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_dispatch_claims_expired_entries_once(self, mock_delay, due_queue, user):
+        BreakInterval.objects.create(user=user, next_due_at=timezone.now() - timedelta(seconds=1))
+        later = User.objects.create_user(username="later_user", password="pass123")
+        BreakInterval.objects.create(user=later, next_due_at=timezone.now() + timedelta(seconds=30))
+
+        check_and_schedule_breaks()
+        check_and_schedule_breaks()
+
+        mock_delay.assert_called_once_with([user.id])
+
+    def test_reminder_replaces_lease_with_next_due(self, due_queue, redis_client, user):
+        BreakInterval.objects.create(user=user)
+        claim_due_users(timezone.now(), limit=10)
+
+        send_break_reminders_batch([user.id])
+
+        user.breakinterval.refresh_from_db()
+        assert redis_client.zscore(DUE_QUEUE_KEY, user.id) == (
+            user.breakinterval.next_due_at.timestamp()
+        )
+
+    def test_user_no_longer_due_is_requeued_at_real_due_time(
+        self, due_queue, redis_client, user
+    ):
+        BreakInterval.objects.create(user=user)
+        claim_due_users(timezone.now(), limit=10)
+        # Rescheduled by another batch after the claim, without touching the queue.
+        next_due_at = timezone.now() + timedelta(minutes=30)
+        BreakInterval.objects.filter(user=user).update(next_due_at=next_due_at)
+
+        send_break_reminders_batch([user.id])
+
+        assert not BreakLog.objects.exists()
+        assert redis_client.zscore(DUE_QUEUE_KEY, user.id) == next_due_at.timestamp()
+
+    def test_sync_overwrites_stale_due_times(self, due_queue, redis_client, user):
+        interval = BreakInterval.objects.create(user=user)
+        redis_client.zadd(DUE_QUEUE_KEY, {user.id: 0})
+
+        assert sync_due_queue() == 1
+        assert redis_client.zscore(DUE_QUEUE_KEY, user.id) == interval.next_due_at.timestamp()
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_dispatcher_syncs_existing_intervals(self, mock_delay, settings, user, create_interval):
+        settings.BREAK_SCHEDULER_MODE = "queue"
+
+        call_command("run_break_dispatcher", "--once", stdout=StringIO())
+
+        mock_delay.assert_called_once_with([user.id])
+
+    def test_dispatcher_requires_queue_mode(self):
+        with pytest.raises(CommandError):
+            call_command("run_break_dispatcher", "--once")
+
+
+@pytest.fixture
+def buffered_logs(settings):
+    settings.BREAK_LOG_WRITE_MODE = "buffered"
+    settings.BREAK_LOG_FLUSH_BATCH_SIZE = 3
+
+
+@pytest.mark.django_db
+class TestBreakLogBuffer:
+
+    @pytest.fixture
+    def users(self, user):
+        others = [
+            User.objects.create_user(username=f"user_{i}", password="pass123") for i in range(4)
+        ]
+        return [user] + others
+
+    def test_interval_update_reschedules_from_buffered_break(
+        self, buffered_logs, authenticated_client, user, create_interval
+    ):
+        send_break_reminders_batch([user.id])
+        last_break_at = BreakStats.objects.get(user=user).last_break_at
+
+        authenticated_client.patch(
+            reverse("break-interval-detail", kwargs={"pk": user.breakinterval.pk}),
+            {"interval_minutes": 90},
+        )
+
+        assert not BreakLog.objects.exists()
+        user.breakinterval.refresh_from_db()
+        assert user.breakinterval.next_due_at == last_break_at + timedelta(minutes=90)
+
+    def test_reminders_buffer_logs_until_flushed(self, buffered_logs, users, create_interval):
+        send_break_reminders_batch([user.id for user in users])
+
+        assert not BreakLog.objects.exists()
+        # Five logs, then their delivery status.
+        assert buffered_count() == 6
+        assert BreakStats.objects.get(user=users[0]).total_breaks == 1
+
+        assert flush_break_logs() == 3
+        assert flush_break_logs() == 3
+        assert flush_break_logs() == 0
+        assert BreakLog.objects.filter(status="sent").count() == 5
+
+        create_interval.refresh_from_db()
+        log = BreakLog.objects.get(user=users[0])
+        assert create_interval.next_due_at == log.triggered_at + timedelta(minutes=60)
+
+    def test_events_survive_flusher_crash_before_insert(self, buffered_logs, redis_client, users):
+        buffer_break_logs([user.id for user in users], timezone.now())
+
+        with patch.object(BreakLog.objects, "bulk_create", side_effect=RuntimeError("killed")):
+            with pytest.raises(RuntimeError):
+                flush_break_logs()
+        assert redis_client.llen(LOG_PROCESSING_KEY) == 3
+
+        call_command("run_break_log_flusher", "--once", stdout=StringIO())
+
+        assert BreakLog.objects.count() == 5
+        assert buffered_count() == 0
+
+    def test_redelivered_events_are_deduplicated(self, buffered_logs, redis_client, users):
+        buffer_break_logs([user.id for user in users], timezone.now())
+
+        # The rows are committed but the flusher dies before clearing the processing list.
+        with patch.object(redis_client, "delete", side_effect=ConnectionError("killed")):
+            with pytest.raises(ConnectionError):
+                flush_break_logs()
+        assert BreakLog.objects.count() == 3
+
+        while flush_break_logs():
+            pass
+
+        assert BreakLog.objects.count() == 5
+        assert BreakLog.objects.values('event_id').distinct().count() == 5
+
+    def test_flush_invalidates_user_caches(self, buffered_logs, users):
+        key = user_cache_key(users[0].id, 'dashboard')
+        buffer_break_logs([users[0].id], timezone.now())
+
+        flush_break_logs()
+
+        assert user_cache_key(users[0].id, 'dashboard') != key
+
+    def test_events_of_deleted_users_are_dropped(self, buffered_logs, users):
+        buffer_break_logs([users[0].id, users[1].id], timezone.now())
+        users[1].delete()
+
+        assert flush_break_logs() == 2
+        assert list(BreakLog.objects.values_list('user_id', flat=True)) == [users[0].id]
+
+    def test_flusher_requires_buffered_mode(self):
+        with pytest.raises(CommandError):
+            call_command("run_break_log_flusher", "--once")
+
+
 @pytest.mark.django_db
 class TestLastBreakLogsAPI:
 
@@ -175,40 +973,1125 @@ class TestLastBreakLogsAPI:
 
         response = authenticated_client.get(self.endpoint)
         assert response.status_code == 200
-        assert len(response.data) == 6
+        assert len(response.data['results']) == 6
+        assert response.data['next'] is None
 
-        times = [log['triggered_at'] for log in response.data]
+        times = [log['triggered_at'] for log in response.data['results']]
         assert times == sorted(times, reverse=True)
 
     def test_no_breaks(self, authenticated_client):
         response = authenticated_client.get(self.endpoint)
         assert response.status_code == 200
-        assert response.data == []
+        assert response.data == {'next': None, 'results': []}
 
+    def test_cursor_pages_cover_every_log_once(self, authenticated_client, user):
+        # Identical timestamps exercise the id tie-breaker in the cursor.
+        triggered_at = timezone.now()
+        BreakLog.objects.bulk_create(BreakLog(user=user) for _ in range(7))
+        BreakLog.objects.update(triggered_at=triggered_at)
 
-class TestQuoteFetching:
+        ids = []
+        url = f"{self.endpoint}?page_size=3"
+        while url:
+            response = authenticated_client.get(url)
+            assert response.status_code == 200
+            ids.extend(log['id'] for log in response.data['results'])
+            url = response.data['next']
 
-    @patch("breaks.utils.requests.get")
-    def test_fetch_quote_success(self, mock_get):
-        mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = [
-            {"q": "Stay hungry, stay foolish.", "a": "Steve Jobs"}
-        ]
+        assert ids == list(BreakLog.objects.order_by('-id').values_list('id', flat=True))
 
-        quote = fetch_inspirational_quote()
-        assert quote == '"Stay hungry, stay foolish." - Steve Jobs'
+    def test_invalid_cursor(self, authenticated_client):
+        response = authenticated_client.get(self.endpoint, {'cursor': 'not-a-cursor'})
+        assert response.status_code == 404
 
-    @patch("breaks.utils.requests.get")
-    def test_fetch_quote_invalid_data(self, mock_get):
-        mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = [{}]
+    def test_page_query_count(self, authenticated_client, user, django_assert_num_queries):
+        BreakLog.objects.bulk_create(BreakLog(user=user) for _ in range(20))
 
-        quote = fetch_inspirational_quote()
-        assert quote is None
+        with django_assert_num_queries(1):
+            response = authenticated_client.get(self.endpoint)
+        assert len(response.data['results']) == 20
 
-    @patch("breaks.utils.requests.get")
-    def test_fetch_quote_failure(self, mock_get):
-        mock_get.side_effect = Exception("API error")
+    def test_sparse_fields(self, authenticated_client, user):
+        BreakLog.objects.create(user=user)
 
-        quote = fetch_inspirational_quote()
+        response = authenticated_client.get(self.endpoint, {'fields': 'id,triggered_at'})
+        assert set(response.data['results'][0]) == {'id', 'triggered_at'}
+
+    def test_date_range_filter(self, authenticated_client, user):
+        now = timezone.now()
+        for days_ago in (0, 2, 5):
+            log = BreakLog.objects.create(user=user)
+            log.triggered_at = now - timedelta(days=days_ago)
+            log.save()
+
+        response = authenticated_client.get(self.endpoint, {
+            'since': (now - timedelta(days=3)).isoformat(),
+            'until': (now - timedelta(days=1)).isoformat(),
+        })
+        assert len(response.data['results']) == 1
+
+        response = authenticated_client.get(self.endpoint, {'since': 'yesterday'})
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestBreakLogExport:
+
+    endpoint = reverse('break-log-export')
+
+    @pytest.fixture
+    def logs(self, user):
+        other = User.objects.create_user(username="other_user", password="pass123")
+        BreakLog.objects.bulk_create(
+            [BreakLog(user=user), BreakLog(user=other), BreakLog(user=user)]
+        )
+        return BreakLog.objects.order_by('id')
+
+    @staticmethod
+    def content(response):
+        assert response.streaming
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export_own_logs(self, authenticated_client, user, logs):
+        response = authenticated_client.get(self.endpoint)
+
+        assert response['Content-Type'] == 'text/csv'
+        lines = self.content(response).splitlines()
+        assert lines[0] == "id,user_id,username,triggered_at"
+        assert [int(line.split(",")[0]) for line in lines[1:]] == [
+            log.id for log in logs if log.user_id == user.id
+        ]
+
+    def test_ndjson_export(self, authenticated_client, user, logs):
+        response = authenticated_client.get(self.endpoint, {'output': 'ndjson'})
+
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        assert {row['username'] for row in rows} == {"test_user"}
+        assert len(rows) == 2
+
+    def test_invalid_output(self, authenticated_client):
+        response = authenticated_client.get(self.endpoint, {'output': 'xml'})
+        assert response.status_code == 400
+
+    def test_all_users_requires_staff(self, authenticated_client, user, logs):
+        response = authenticated_client.get(self.endpoint, {'all_users': 1})
+        assert response.status_code == 403
+
+        user.is_staff = True
+        user.save()
+        response = authenticated_client.get(self.endpoint, {'all_users': 1})
+        assert len(self.content(response).splitlines()) == 4
+
+    def test_export_command(self, logs):
+        out = StringIO()
+        call_command("export_break_logs", "--output-format", "ndjson", "--user", "other_user",
+                     stdout=out)
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [row['username'] for row in rows] == ["other_user"]
+
+    def test_export_command_unknown_user(self):
+        with pytest.raises(CommandError):
+            call_command("export_break_logs", "--user", "nobody")
+
+
+def log_break_at(user, triggered_at):
+    log = BreakLog.objects.create(user=user)
+    BreakLog.objects.filter(id=log.id).update(triggered_at=triggered_at)
+    return log
+
+
+@pytest.mark.django_db
+class TestBreakLogRetention:
+
+    @pytest.fixture
+    def now(self):
+        return timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    def test_rollup_counts_breaks_per_day(self, user, now):
+        for days_ago in (0, 0, 1, 3):
+            log_break_at(user, now - timedelta(days=days_ago))
+
+        rollup_daily_breaks()
+
+        assert dict(BreakDailyRollup.objects.values_list('day', 'breaks')) == {
+            now.date(): 2,
+            (now - timedelta(days=1)).date(): 1,
+            (now - timedelta(days=3)).date(): 1,
+        }
+
+    def test_rollup_recounts_latest_day(self, user, now):
+        log_break_at(user, now - timedelta(days=3))
+        log_break_at(user, now)
+        rollup_daily_breaks()
+
+        log_break_at(user, now)
+        rollup_daily_breaks()
+
+        assert BreakDailyRollup.objects.get(user=user, day=now.date()).breaks == 2
+        assert BreakDailyRollup.objects.count() == 2
+
+    def test_prune_keeps_recent_and_unrolled_logs(self, user, now, settings):
+        settings.BREAK_LOG_RETENTION_DAYS = 30
+        settings.BREAK_LOG_PRUNE_BATCH_SIZE = 2
+        old = [log_break_at(user, now - timedelta(days=40 + i)) for i in range(5)]
+        recent = log_break_at(user, now - timedelta(days=1))
+
+        assert prune_break_logs(now) == 0  # Nothing rolled up yet.
+
+        rollup_daily_breaks()
+        assert prune_break_logs(now) == len(old)
+        assert list(BreakLog.objects.values_list('id', flat=True)) == [recent.id]
+        assert BreakDailyRollup.objects.aggregate(total=Sum('breaks'))['total'] == 6
+
+    def test_prune_invalidates_caches_once_per_batch(self, user, now, settings):
+        settings.BREAK_LOG_RETENTION_DAYS = 30
+        settings.BREAK_LOG_PRUNE_BATCH_SIZE = 2
+        for i in range(5):
+            log_break_at(user, now - timedelta(days=40 + i))
+        log_break_at(user, now)
+        rollup_daily_breaks()
+
+        with patch("breaks.retention.invalidate_user_caches") as mock_invalidate:
+            prune_break_logs(now)
+
+        assert [call.args[0] for call in mock_invalidate.call_args_list] == [{user.id}] * 3
+
+    def test_deleting_a_log_invalidates_caches(self, authenticated_client, user, now):
+        log = log_break_at(user, now)
+        key = user_cache_key(user.id, 'dashboard')
+
+        response = authenticated_client.delete(reverse("break-log-detail", kwargs={"pk": log.pk}))
+
+        assert response.status_code == 204
+        assert user_cache_key(user.id, 'dashboard') != key
+
+    def test_history_before_live_rollups_is_backfilled_before_pruning(self, user, now, settings):
+        settings.BREAK_LOG_RETENTION_DAYS = 30
+        for days_ago in (400, 100, 10):
+            log_break_at(user, now - timedelta(days=days_ago))
+        record_reminders([user])
+        rollup_daily_breaks()
+
+        # Live counts started today, so the older days have no rollup to prune into.
+        assert prune_break_logs(now) == 0
+        assert BreakLog.objects.count() == 4
+
+        migration = importlib.import_module("breaks.migrations.0013_backfill_daily_rollups")
+        migration.backfill_daily_rollups(django_apps, None)
+
+        assert prune_break_logs(now) == 2
+        assert BreakDailyRollup.objects.aggregate(total=Sum('breaks'))['total'] == 4
+
+    def test_prune_old_hourly_buckets(self, user, now, settings):
+        settings.BREAK_LOG_RETENTION_DAYS = 30
+        settings.BREAK_LOG_PRUNE_BATCH_SIZE = 2
+        for days_ago in (40, 35, 31, 29, 0):
+            BreakHourlyBucket.objects.record_breaks([user.id], now - timedelta(days=days_ago))
+
+        assert prune_hourly_buckets(now) == 3
+        assert BreakHourlyBucket.objects.count() == 2
+
+        settings.BREAK_LOG_RETENTION_DAYS = 0
+        assert prune_hourly_buckets(now - timedelta(days=1000)) == 0
+
+    def test_prune_disabled(self, user, now, settings):
+        settings.BREAK_LOG_RETENTION_DAYS = 0
+        log_break_at(user, now - timedelta(days=1000))
+        rollup_daily_breaks()
+
+        assert prune_break_logs(now) == 0
+        assert BreakLog.objects.count() == 1
+
+    def test_prune_archives_rows(self, user, now, settings, tmp_path):
+        settings.BREAK_LOG_RETENTION_DAYS = 30
+        settings.BREAK_LOG_ARCHIVE_DIR = str(tmp_path)
+        old = log_break_at(user, now - timedelta(days=40))
+        log_break_at(user, now)
+        rollup_daily_breaks()
+
+        prune_break_logs(now)
+
+        (archive,) = tmp_path.glob("break-logs-*.ndjson.gz")
+        with gzip.open(archive, 'rt') as file:
+            rows = [json.loads(line) for line in file]
+        assert [row['id'] for row in rows] == [old.id]
+
+    def test_daily_endpoint(self, authenticated_client, user, now):
+        log_break_at(user, now - timedelta(days=2))
+        log_break_at(user, now)
+        rollup_daily_breaks()
+
+        response = authenticated_client.get(
+            reverse('break-log-daily'), {'since': (now - timedelta(days=1)).date().isoformat()}
+        )
+
+        assert response.status_code == 200
+        assert response.data == [{'day': now.date().isoformat(), 'breaks': 1}]
+
+
+@pytest.mark.django_db
+class TestBreakAnalyticsAPI:
+
+    endpoint = reverse('break-analytics')
+
+    @pytest.fixture
+    def day(self):
+        return timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def record(self, user, *moments):
+        for moment in moments:
+            for model in (BreakHourlyBucket, BreakDailyRollup, BreakStats):
+                model.objects.record_breaks([user.id], moment)
+
+    def test_daily_buckets(self, authenticated_client, user, day):
+        self.record(user, day - timedelta(days=1, hours=-2), day + timedelta(hours=1),
+                    day + timedelta(hours=1, minutes=30))
+
+        response = authenticated_client.get(self.endpoint, {
+            'bucket': 'day',
+            'since': (day - timedelta(days=2)).isoformat(),
+            'until': (day + timedelta(days=1)).isoformat(),
+        })
+
+        assert response.status_code == 200
+        assert [point['breaks'] for point in response.data['buckets']] == [0, 1, 2]
+        assert response.data['total_breaks'] == 3
+        assert response.data['streak'] == {'current': 2, 'longest': 2}
+
+    def test_hourly_buckets(self, authenticated_client, user, day):
+        self.record(user, day + timedelta(minutes=10), day + timedelta(hours=2, minutes=5))
+
+        response = authenticated_client.get(self.endpoint, {
+            'bucket': 'hour',
+            'since': day.isoformat(),
+            'until': (day + timedelta(hours=3)).isoformat(),
+        })
+
+        assert [point['breaks'] for point in response.data['buckets']] == [1, 0, 1]
+
+    def test_adherence(self, authenticated_client, user, day):
+        interval = BreakInterval.objects.create(user=user, interval_minutes=60)
+        BreakInterval.objects.filter(id=interval.id).update(created_at=day - timedelta(days=5))
+        self.record(user, *(day + timedelta(hours=hour) for hour in range(12)))
+
+        response = authenticated_client.get(self.endpoint, {
+            'since': day.isoformat(),
+            'until': (day + timedelta(days=1)).isoformat(),
+        })
+
+        assert response.data['adherence'] == {'expected_breaks': 24.0, 'ratio': 0.5}
+
+    def test_adherence_counts_working_hours_only(self, authenticated_client, user, day):
+        interval = BreakInterval.objects.create(
+            user=user, interval_minutes=60, work_start=dt_time(9), work_end=dt_time(17),
+            work_days=WEEKDAYS,
+        )
+        BreakInterval.objects.filter(id=interval.id).update(created_at=day - timedelta(days=5))
+        self.record(user, *(day + timedelta(days=1, hours=hour) for hour in range(9, 17)))
+
+        response = authenticated_client.get(self.endpoint, {
+            'since': day.isoformat(),
+            'until': (day + timedelta(weeks=1)).isoformat(),
+        })
+
+        assert response.data['adherence'] == {'expected_breaks': 40.0, 'ratio': 0.2}
+
+    def test_paused_users_expect_no_breaks(self, authenticated_client, user, day):
+        interval = BreakInterval.objects.create(user=user, interval_minutes=60, paused=True)
+        BreakInterval.objects.filter(id=interval.id).update(created_at=day - timedelta(days=5))
+
+        response = authenticated_client.get(self.endpoint, {
+            'since': day.isoformat(),
+            'until': (day + timedelta(days=1)).isoformat(),
+        })
+
+        assert response.data['adherence'] == {'expected_breaks': 0, 'ratio': None}
+
+    def test_query_count_independent_of_history(
+        self, authenticated_client, user, day, django_assert_max_num_queries
+    ):
+        self.record(user, *(day - timedelta(hours=hour) for hour in range(500)))
+
+        # Session and user, buckets, intervals, stats.
+        with django_assert_max_num_queries(5):
+            response = authenticated_client.get(self.endpoint)
+        assert response.status_code == 200
+
+    def test_invalid_parameters(self, authenticated_client):
+        assert authenticated_client.get(self.endpoint, {'bucket': 'year'}).status_code == 400
+        assert authenticated_client.get(self.endpoint, {'since': 'soon'}).status_code == 400
+        too_long = {'bucket': 'hour', 'since': '2020-01-01'}
+        assert authenticated_client.get(self.endpoint, too_long).status_code == 400
+
+    def test_cached_until_user_data_changes(self, authenticated_client, user, day):
+        self.record(user, day)
+        assert authenticated_client.get(self.endpoint).data['total_breaks'] == 1
+
+        # Aggregates written without invalidation stay hidden behind the cache...
+        self.record(user, day)
+        assert authenticated_client.get(self.endpoint).data['total_breaks'] == 1
+
+        # ...until the user's breaks change.
+        invalidate_user_caches([user.id])
+        assert authenticated_client.get(self.endpoint).data['total_breaks'] == 2
+
+    def test_all_users_requires_staff(self, authenticated_client, user, day):
+        other = User.objects.create_user(username="other_user", password="pass123")
+        self.record(user, day)
+        self.record(other, day)
+
+        response = authenticated_client.get(self.endpoint, {'all_users': 1})
+        assert response.status_code == 403
+
+        user.is_staff = True
+        user.save()
+        response = authenticated_client.get(self.endpoint, {'all_users': 1})
+        assert response.data['total_breaks'] == 2
+        assert 'streak' not in response.data
+
+
+@pytest.mark.django_db
+class TestDashboard:
+
+    endpoint = reverse('dashboard')
+
+    @pytest.fixture
+    def logged_in_client(self, client, user):
+        client.force_login(user)
+        return client
+
+    def test_shows_stats(self, logged_in_client, user, create_interval):
+        send_break_reminders_batch([user.id])
+
+        response = logged_in_client.get(self.endpoint)
+
+        assert response.status_code == 200
+        assert response.context['total_breaks'] == 1
+        assert len(response.context['break_logs']) == 1
+        create_interval.refresh_from_db()
+        assert response.context['next_break'] == create_interval.next_due_at
+
+    def test_no_breaks(self, logged_in_client):
+        response = logged_in_client.get(self.endpoint)
+
+        assert response.context['total_breaks'] == 0
+        assert response.context['break_logs'] == []
+        assert response.context['next_break'] is None
+
+    def test_query_count_independent_of_history(
+        self, logged_in_client, user, django_assert_max_num_queries
+    ):
+        BreakLog.objects.bulk_create(BreakLog(user=user) for _ in range(50))
+        BreakStats.objects.create(user=user, total_breaks=50)
+
+        # Session and user, then the stats/interval join and the last five logs.
+        with django_assert_max_num_queries(4):
+            response = logged_in_client.get(self.endpoint)
+        assert response.context['total_breaks'] == 50
+        assert len(response.context['break_logs']) == 5
+
+    def test_cached_until_breaks_logged(self, logged_in_client, user):
+        logged_in_client.get(self.endpoint)
+        BreakStats.objects.create(user=user, total_breaks=7)
+
+        response = logged_in_client.get(self.endpoint)
+        assert response.context['total_breaks'] == 0
+
+        send_break_reminders_batch([user.id])
+
+        response = logged_in_client.get(self.endpoint)
+        assert response.context['total_breaks'] == 8
+
+    def test_interval_change_invalidates_cache(self, logged_in_client, user, create_interval):
+        logged_in_client.get(self.endpoint)
+
+        api = APIClient()
+        api.force_authenticate(user=user)
+        BreakLog.objects.create(user=user)
+        url = reverse("break-interval-detail", kwargs={"pk": create_interval.pk})
+        api.patch(url, {"interval_minutes": 15})
+
+        response = logged_in_client.get(self.endpoint)
+        create_interval.refresh_from_db()
+        assert response.context['next_break'] == create_interval.next_due_at
+        assert len(response.context['break_logs']) == 1
+
+
+class RecordingHandler:
+
+    def __init__(self):
+        self.peers = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.peers.append(session.peer)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalSMTPServer:
+
+    def __init__(self):
+        self.handler = RecordingHandler()
+        self.port = free_port()
+        self.controller = None
+
+    def start(self):
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=self.port)
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    @property
+    def peers(self):
+        return self.handler.peers
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = LocalSMTPServer()
+    server.start()
+
+    settings.EMAIL_HOST = "127.0.0.1"
+    settings.EMAIL_PORT = server.port
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_HOST_USER = ""
+    settings.EMAIL_HOST_PASSWORD = ""
+
+    yield server
+
+    close_pool()
+    server.stop()
+
+
+@pytest.fixture
+def smtp_pool(smtp_server):
+    pool = ConnectionPool("django.core.mail.backends.smtp.EmailBackend", batch_size=2)
+    yield pool
+    pool.close()
+
+
+def reminder_emails(count):
+    return [
+        EmailMessage("Break", "Take a break", "from@example.com", [f"user{i}@example.com"])
+        for i in range(count)
+    ]
+
+
+class TestMailConnectionPool:
+
+    def test_reuses_connection_across_sends(self, smtp_server, smtp_pool):
+        assert smtp_pool.send_messages(reminder_emails(5)) == 5
+        assert smtp_pool.send_messages(reminder_emails(3)) == 3
+
+        assert len(smtp_server.peers) == 8
+        assert len(set(smtp_server.peers)) == 1
+
+    def test_reconnects_after_server_restart(self, smtp_server, smtp_pool):
+        smtp_pool.send_messages(reminder_emails(1))
+        smtp_server.restart()
+
+        assert smtp_pool.send_messages(reminder_emails(2)) == 2
+        assert len(smtp_server.peers) == 3
+        assert len(set(smtp_server.peers)) == 2
+
+    def test_limits_open_connections(self, smtp_server):
+        pool = ConnectionPool("django.core.mail.backends.smtp.EmailBackend", max_connections=1)
+        with pool.connection():
+            thread = threading.Thread(target=pool.send_messages, args=(reminder_emails(1),))
+            thread.start()
+            thread.join(timeout=0.2)
+            assert thread.is_alive()
+
+        thread.join()
+        assert len(smtp_server.peers) == 1
+        pool.close()
+
+    def test_pooled_backend_used_by_send_mail(self, smtp_server, settings):
+        settings.EMAIL_BACKEND = "breaks.mail.PooledEmailBackend"
+        close_pool()
+
+        for _ in range(3):
+            mail.send_mail("Break", "Take a break", "from@example.com", ["to@example.com"])
+
+        assert len(smtp_server.peers) == 3
+        assert len(set(smtp_server.peers)) == 1
+        close_pool()
+
+
+@pytest.mark.django_db
+class TestAsyncDelivery:
+
+    def test_bounded_concurrent_connections(self, smtp_server):
+        sent = AsyncDelivery(concurrency=3).send_messages(reminder_emails(10))
+
+        assert sent == 10
+        assert len(smtp_server.peers) == 10
+        assert len(set(smtp_server.peers)) == 3
+
+    def test_reuses_connections_across_sends(self, smtp_server):
+        delivery = AsyncDelivery(concurrency=3)
+        for _ in range(4):
+            delivery.send_messages(reminder_emails(3))
+
+        assert len(smtp_server.peers) == 12
+        assert len(set(smtp_server.peers)) == 3
+
+    def test_reconnects_when_pooled_connection_dropped(self, smtp_server):
+        delivery = AsyncDelivery(concurrency=1)
+        delivery.send_messages(reminder_emails(1))
+        smtp_server.restart()
+
+        assert delivery.send_messages(reminder_emails(2)) == 2
+        assert delivery.failures == []
+        assert len(set(smtp_server.peers)) == 2
+
+    def test_connection_failure_counts_as_unsent(self, smtp_server, settings):
+        settings.EMAIL_PORT = free_port()
+        delivery = AsyncDelivery(concurrency=2)
+
+        assert delivery.send_messages(reminder_emails(2)) == 0
+        assert len(delivery.failures) == 2
+
+    def test_batch_task_in_async_mode(self, smtp_server, settings, user):
+        settings.BREAK_DELIVERY_MODE = "async"
+
+        send_break_reminders_batch([user.id])
+
+        assert len(smtp_server.peers) == 1
+        assert len(mail.outbox) == 0
+
+
+@pytest.mark.django_db
+class TestDeliveryQueues:
+
+    @pytest.fixture
+    def due_users(self):
+        users = [
+            User.objects.create_user(username=f"user_{i}", password="pass123") for i in range(5)
+        ]
+        for other in users:
+            BreakInterval.objects.create(user=other)
+        return users
+
+    def test_scheduling_and_delivery_are_routed_apart(self):
+        from config.celery import app
+
+        def queue(name):
+            return app.amqp.router.route({}, f"breaks.tasks.{name}")["queue"].name
+
+        assert queue("check_and_schedule_breaks") == queue("schedule_breaks_shard") == "scheduling"
+        assert queue("send_break_reminders_batch") == queue("send_break_reminder") == "delivery"
+        assert queue("refill_quotes") == "celery"
+
+    def test_token_bucket_refills_at_rate(self):
+        bucket = TokenBucket("test:bucket", rate=2, capacity=4)
+
+        assert bucket.try_take(3, now=100) == 0
+        assert bucket.try_take(2, now=100) == 0.5
+        assert bucket.try_take(2, now=100.5) == 0
+        assert bucket.try_take(4, now=1000) == 0
+        with pytest.raises(ValueError):
+            bucket.try_take(5)
+
+    def test_rate_limited_slices_by_capacity(self):
+        bucket = TokenBucket("test:bucket", rate=1000, capacity=2)
+
+        assert list(rate_limited([1, 2, 3, 4, 5], bucket)) == [[1, 2], [3, 4], [5]]
+
+    def test_email_shares_rate_limit(self, settings, redis_client, user):
+        settings.EMAIL_RATE_LIMIT_PER_SECOND = 1000
+        settings.EMAIL_RATE_LIMIT_BURST = 2
+
+        delivery = route_reminders([Reminder(user, "Break", "Stretch")] * 5)
+
+        assert delivery.sent == {"email": 5}
+        assert len(mail.outbox) == 5
+        assert redis_client.exists(EMAIL_BUCKET_KEY)
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_scheduler_fills_delivery_queue_to_max_depth(
+        self, mock_delay, settings, redis_client, due_users
+    ):
+        settings.BREAK_DELIVERY_MAX_QUEUE_DEPTH = 2
+        settings.BREAK_REMINDER_CHUNK_SIZE = 2
+        redis_client.rpush("delivery", "queued batch")
+
+        check_and_schedule_breaks()
+
+        mock_delay.assert_called_once()
+        (scheduled,), _ = mock_delay.call_args
+        assert len(scheduled) == 2
+
+    @patch("breaks.tasks.logger")
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_scheduler_defers_while_delivery_queue_is_full(
+        self, mock_delay, mock_logger, settings, redis_client, due_users
+    ):
+        settings.BREAK_DELIVERY_MAX_QUEUE_DEPTH = 2
+        redis_client.rpush("delivery", "queued batch", "queued batch")
+
+        check_and_schedule_breaks()
+
+        mock_delay.assert_not_called()
+        mock_logger.warning.assert_called_once()
+
+        # The deferred users are still due once the workers catch up.
+        redis_client.delete("delivery")
+        check_and_schedule_breaks()
+        (scheduled,), _ = mock_delay.call_args
+        assert sorted(scheduled) == sorted(user.id for user in due_users)
+
+    @patch("breaks.tasks.send_break_reminders_batch.delay")
+    def test_dispatcher_defers_while_delivery_queue_is_full(
+        self, mock_delay, due_queue, settings, redis_client, due_users
+    ):
+        settings.BREAK_DELIVERY_MAX_QUEUE_DEPTH = 1
+        redis_client.rpush("delivery", "queued batch")
+
+        assert dispatch_due_breaks() == 0
+        mock_delay.assert_not_called()
+        assert redis_client.zcard(DUE_QUEUE_KEY) == len(due_users)
+
+
+class TestQuoteFetching:
+
+    @patch("breaks.utils.requests.get")
+    def test_fetch_quote_success(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = [
+            {"q": "Stay hungry, stay foolish.", "a": "Steve Jobs"}
+        ]
+
+        quote = fetch_inspirational_quote()
+        assert quote == '"Stay hungry, stay foolish." - Steve Jobs'
+
+    @patch("breaks.utils.requests.get")
+    def test_fetch_quote_invalid_data(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = [{}]
+
+        quote = fetch_inspirational_quote()
         assert quote is None
+
+    @patch("breaks.utils.requests.get")
+    def test_fetch_quote_failure(self, mock_get):
+        mock_get.side_effect = Exception("API error")
+
+        quote = fetch_inspirational_quote()
+        assert quote is None
+
+
+class QuoteAPIHandler(BaseHTTPRequestHandler):
+    status = 200
+    quotes = [{"q": "Rest is not idleness.", "a": "John Lubbock"}]
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        body = json.dumps(self.quotes).encode()
+        self.send_response(self.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def quote_api(settings):
+    handler = type("Handler", (QuoteAPIHandler,), {})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    settings.ZEN_QUOTES_URL = f"http://127.0.0.1:{server.server_port}/api/quotes"
+    yield handler
+
+    server.shutdown()
+    server.server_close()
+
+
+class TestQuotePool:
+
+    def test_refill_then_draw_without_http(self, quote_api):
+        assert refill_quote_pool() == 1
+        assert quote_api.requests == 1
+
+        assert get_pooled_quote() == '"Rest is not idleness." - John Lubbock'
+        assert quote_api.requests == 1
+
+    def test_empty_pool(self):
+        assert get_pooled_quote() is None
+
+    def test_expired_and_excess_quotes_evicted(self, quote_api, redis_client, settings):
+        settings.QUOTE_POOL_MAX_SIZE = 2
+        now = time.time()
+        redis_client.zadd(QUOTE_POOL_KEY, {
+            "expired": now - settings.QUOTE_POOL_TTL_SECONDS - 1,
+            "older": now - 20,
+            "newer": now - 10,
+        })
+
+        refill_quote_pool()
+
+        assert redis_client.zrange(QUOTE_POOL_KEY, 0, -1) == [
+            b"newer", b'"Rest is not idleness." - John Lubbock'
+        ]
+
+    def test_circuit_opens_after_repeated_failures(self, quote_api, settings):
+        settings.QUOTE_CIRCUIT_FAILURE_THRESHOLD = 2
+        quote_api.status = 500
+
+        for _ in range(4):
+            assert refill_quote_pool() == 0
+
+        assert quote_api.requests == 2
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    status = 200
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).received.append((self.path, json.loads(body)))
+        self.send_response(self.status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def webhook_server():
+    handler = type("Handler", (WebhookHandler,), {"received": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    handler.url = f"http://127.0.0.1:{server.server_port}/hooks/breaks"
+    yield handler
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+class TestNotificationChannels:
+
+    @pytest.fixture
+    def all_channels(self, user, webhook_server):
+        return BreakInterval.objects.create(
+            user=user, channels=["email", "webhook", "in_app"], webhook_url=webhook_server.url,
+        )
+
+    def test_batch_fans_out_to_every_channel(self, user, all_channels, webhook_server):
+        send_break_reminders_batch([user.id])
+
+        assert [message.to for message in mail.outbox] == [[user.email]]
+        [(path, payload)] = webhook_server.received
+        assert path == "/hooks/breaks"
+        assert payload["text"].startswith(f"*{mail.outbox[0].subject}*")
+        assert Notification.objects.get(user=user).body == mail.outbox[0].body
+
+    def test_users_without_interval_get_email(self, user):
+        delivery = route_reminders([Reminder(user, "Break", "Stretch")])
+
+        assert delivery.sent == {"email": 1}
+        assert len(mail.outbox) == 1
+
+    def test_failing_webhook_does_not_block_other_channels(self, user, all_channels,
+                                                           webhook_server):
+        webhook_server.status = 500
+        user = User.objects.select_related("breakinterval").get(pk=user.pk)
+
+        delivery = route_reminders([Reminder(user, "Break", "Stretch")])
+
+        assert delivery.sent == {"email": 1, "webhook": 0, "in_app": 1}
+        [failure] = delivery.failures
+        assert failure.channel == "webhook" and "500" in failure.error
+        assert failure.retryable
+
+    def test_channel_preferences_api(self, authenticated_client, user, webhook_server):
+        url = reverse("break-interval-list")
+
+        response = authenticated_client.post(url, {"channels": ["sms"]}, format="json")
+        assert response.status_code == 400
+
+        response = authenticated_client.post(url, {"channels": ["webhook"]}, format="json")
+        assert "webhook_url" in response.data
+
+        response = authenticated_client.post(
+            url, {"channels": ["in_app", "webhook"], "webhook_url": webhook_server.url},
+            format="json",
+        )
+        assert response.status_code == 201
+        assert user.breakinterval.channels == ["in_app", "webhook"]
+
+    def test_in_app_notifications_api(self, authenticated_client, user):
+        older, newer = Notification.objects.bulk_create([
+            Notification(user=user, subject="Break", body="One"),
+            Notification(user=user, subject="Break", body="Two"),
+        ])
+
+        response = authenticated_client.get(reverse("notification-list"))
+        assert [row["id"] for row in response.data["results"]] == [newer.id, older.id]
+
+        authenticated_client.post(reverse("notification-read", kwargs={"pk": older.pk}))
+        response = authenticated_client.get(reverse("notification-list"), {"unread": 1})
+        assert [row["id"] for row in response.data["results"]] == [newer.id]
+
+        response = authenticated_client.post(reverse("notification-read-all"))
+        assert response.data == {"read": 1}
+
+
+@pytest.fixture
+def smtp_down():
+    with patch("breaks.notifications.get_connection") as mock_connection:
+        mock_connection.return_value.send_messages.side_effect = (
+            smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        )
+        yield mock_connection
+
+
+@pytest.mark.django_db
+class TestDeliveryRetries:
+
+    @patch("breaks.tasks.retry_reminder_delivery.apply_async")
+    def test_failed_send_is_retried_later(self, mock_retry, smtp_down, user, create_interval):
+        send_break_reminders_batch([user.id])
+
+        log = BreakLog.objects.get(user=user)
+        assert log.status == "pending"
+        ((failed, attempt),), options = mock_retry.call_args
+        [[user_id, channel, subject, body, triggered_at]] = failed
+        assert (user_id, channel, attempt) == (user.id, "email", 1)
+        assert triggered_at == log.triggered_at.isoformat()
+        assert 15 <= options["countdown"] <= 30
+
+    @patch("breaks.tasks.retry_reminder_delivery.apply_async")
+    def test_retry_sends_the_same_reminder(self, mock_retry, smtp_down, user, create_interval):
+        send_break_reminders_batch([user.id])
+        ((failed, attempt),), _ = mock_retry.call_args
+        smtp_down.return_value.send_messages.side_effect = None
+
+        retry_reminder_delivery(failed, attempt)
+
+        assert BreakLog.objects.get(user=user).status == "sent"
+        [(message,)], _ = smtp_down.return_value.send_messages.call_args
+        assert (message.subject, message.body) == tuple(failed[0][2:4])
+        assert mock_retry.call_count == 1
+
+    @patch("breaks.tasks.retry_reminder_delivery.apply_async")
+    def test_only_failed_channels_are_retried(self, mock_retry, user, webhook_server):
+        BreakInterval.objects.create(
+            user=user, channels=["email", "webhook", "in_app"], webhook_url=webhook_server.url,
+        )
+        webhook_server.status = 500
+
+        send_break_reminders_batch([user.id])
+
+        ((failed, _),), _ = mock_retry.call_args
+        assert [entry[1] for entry in failed] == ["webhook"]
+        assert len(mail.outbox) == 1
+        assert BreakLog.objects.get(user=user).status == "pending"
+
+    @patch("breaks.tasks.retry_reminder_delivery.apply_async")
+    def test_exhausted_retries_are_dead_lettered(
+        self, mock_retry, smtp_down, settings, user, create_interval
+    ):
+        settings.BREAK_DELIVERY_MAX_RETRIES = 2
+        send_break_reminders_batch([user.id])
+        for _ in range(2):
+            ((failed, attempt),), _ = mock_retry.call_args
+            retry_reminder_delivery(failed, attempt)
+
+        assert mock_retry.call_count == 2
+        letter = DeadLetter.objects.get(user=user)
+        assert (letter.channel, letter.attempts) == ("email", 3)
+        assert "unexpectedly closed" in letter.error
+        assert BreakLog.objects.get(user=user).status == "failed"
+
+    @patch("breaks.tasks.retry_reminder_delivery.apply_async")
+    @patch("breaks.notifications.get_connection")
+    def test_permanent_failures_are_dead_lettered_at_once(
+        self, mock_connection, mock_retry, user, webhook_server
+    ):
+        BreakInterval.objects.create(
+            user=user, channels=["email", "webhook"], webhook_url=webhook_server.url,
+        )
+        webhook_server.status = 404
+        mock_connection.return_value.send_messages.side_effect = smtplib.SMTPRecipientsRefused(
+            {user.email: (550, b"No such user")}
+        )
+
+        send_break_reminders_batch([user.id])
+
+        mock_retry.assert_not_called()
+        letters = DeadLetter.objects.order_by("channel")
+        assert [(letter.channel, letter.attempts) for letter in letters] == [
+            ("email", 1), ("webhook", 1),
+        ]
+        assert BreakLog.objects.get(user=user).status == "failed"
+
+    @patch("breaks.tasks.retry_reminder_delivery.apply_async")
+    def test_dead_lettered_channel_keeps_log_failed(self, mock_retry, smtp_down, user):
+        BreakInterval.objects.create(user=user, channels=["email", "webhook"], webhook_url="")
+
+        send_break_reminders_batch([user.id])
+        ((failed, attempt),), _ = mock_retry.call_args
+        smtp_down.return_value.send_messages.side_effect = None
+        retry_reminder_delivery(failed, attempt)
+
+        assert [entry[1] for entry in failed] == ["email"]
+        assert DeadLetter.objects.get(user=user).error == "No webhook URL"
+        assert BreakLog.objects.get(user=user).status == "failed"
+
+    @pytest.mark.parametrize("error, permanent", [
+        (smtplib.SMTPRecipientsRefused({"a@example.com": (550, b"No such user")}), True),
+        (smtplib.SMTPRecipientsRefused({"a@example.com": (450, b"Mailbox busy")}), False),
+        (smtplib.SMTPDataError(554, b"Rejected"), True),
+        (smtplib.SMTPDataError(421, b"Try again later"), False),
+        (aiosmtplib.SMTPRecipientsRefused([
+            aiosmtplib.SMTPRecipientRefused(550, "No such user", "a@example.com"),
+        ]), True),
+        (aiosmtplib.SMTPResponseException(451, "Local error"), False),
+        (smtplib.SMTPServerDisconnected("Connection unexpectedly closed"), False),
+    ])
+    def test_permanent_smtp_errors(self, error, permanent):
+        assert permanent_smtp_error(error) is permanent
+
+    def test_backoff_grows_with_jitter(self, settings):
+        settings.BREAK_DELIVERY_RETRY_BASE_SECONDS = 10
+        settings.BREAK_DELIVERY_RETRY_MAX_SECONDS = 60
+
+        delays = [retry_delay(attempt) for attempt in range(5) for _ in range(20)]
+
+        assert all(5 <= delay <= 10 for delay in delays[:20])
+        assert all(20 <= delay <= 40 for delay in delays[40:60])
+        assert all(30 <= delay <= 60 for delay in delays[60:])
+        assert len(set(delays[:20])) > 1
+
+    @pytest.fixture
+    def dead_letters(self, user):
+        other = User.objects.create_user(username="other_user", password="pass123")
+        triggered_at = timezone.now()
+        letters = []
+        for owner, channel in ((user, "email"), (other, "email"), (other, "webhook")):
+            BreakLog.objects.create(user=owner, triggered_at=triggered_at, status="failed")
+            letters.append(DeadLetter.objects.create(
+                user=owner, channel=channel, subject="Break", body="Stretch",
+                triggered_at=triggered_at, attempts=6,
+            ))
+        return letters
+
+    @patch("breaks.tasks.retry_reminder_delivery.delay")
+    def test_replay_dead_letters(
+        self, mock_retry, dead_letters, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command(
+                "replay_dead_letters", "--channel", "email", "--chunk-size", "1",
+                stdout=StringIO(),
+            )
+
+        assert [call.args[1] for call in mock_retry.call_args_list] == [0, 0]
+        replayed = [call.args[0][0][0] for call in mock_retry.call_args_list]
+        assert replayed == [dead_letters[0].user_id, dead_letters[1].user_id]
+        assert list(DeadLetter.objects.all()) == [dead_letters[2]]
+        assert set(BreakLog.objects.values_list("status", flat=True)) == {"pending"}
+
+    @patch("breaks.tasks.retry_reminder_delivery.delay")
+    def test_replay_dry_run(self, mock_retry, dead_letters):
+        out = StringIO()
+
+        call_command("replay_dead_letters", "--dry-run", stdout=out)
+
+        assert "3 dead letters would be replayed" in out.getvalue()
+        mock_retry.assert_not_called()
+        assert DeadLetter.objects.count() == 3
+
+
+@pytest.fixture
+def async_redis(redis_client, monkeypatch):
+    """Async clients for the event hub, on the same fake server as redis_client."""
+    server = redis_client.connection_pool.connection_kwargs["server"]
+    monkeypatch.setattr(
+        "breaks.events.get_async_redis", lambda: fakeredis.FakeAsyncRedis(server=server)
+    )
+
+
+class TestReminderEvents:
+
+    def test_publish_reminders(self, redis_client):
+        user = User(id=7, username="remote")
+        pubsub = redis_client.pubsub()
+        pubsub.subscribe(EVENTS_CHANNEL)
+        assert pubsub.get_message(timeout=1)["type"] == "subscribe"
+
+        publish_reminders([Reminder(user, "Break", "Stretch")], timezone.now())
+
+        message = pubsub.get_message(timeout=1)
+        [event] = json.loads(message["data"])
+        assert (event["user_id"], event["subject"]) == (7, "Break")
+
+    def test_hub_routes_events_to_user_streams(self, async_redis):
+        async def scenario():
+            first, second, other = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+            hub.dispatch([{"user_id": 1, "subject": "Break"}])
+
+            assert first.get_nowait() == second.get_nowait() == {"user_id": 1, "subject": "Break"}
+            assert other.empty()
+
+            for user_id, queue in ((1, first), (1, second), (2, other)):
+                hub.unsubscribe(user_id, queue)
+            assert hub.connections == 0
+
+            stream = stream_events(3)
+            await anext(stream)
+            assert hub.connections == 1
+            await stream.aclose()
+            assert hub.connections == 0
+
+        asyncio.run(scenario())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stream_delivers_published_reminders(self, async_redis, user):
+        token = issue_token(user)
+
+        async def scenario():
+            response = await AsyncClient().get(
+                reverse("reminder-events"), headers={"Authorization": f"Bearer {token}"}
+            )
+            assert response["Content-Type"] == "text/event-stream"
+            chunks = aiter(response.streaming_content)
+            assert b": connected" in await anext(chunks)
+
+            await asyncio.wait_for(hub.subscribed.wait(), timeout=5)
+            publish_reminders([Reminder(user, "Break", "Stretch")], timezone.now())
+
+            chunk = (await asyncio.wait_for(anext(chunks), timeout=5)).decode()
+            assert chunk.startswith("event: reminder\n")
+            assert json.loads(chunk.split("data: ")[1])["body"] == "Stretch"
+            await chunks.aclose()
+
+        asyncio.run(scenario())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stream_requires_authentication(self):
+        response = asyncio.run(AsyncClient().get(reverse("reminder-events")))
+        assert response.status_code == 401
@@ -5,11 +5,15 @@ from . import views
 router = routers.DefaultRouter()
 router.register(r'break-intervals', views.BreakIntervalViewSet, basename='break-interval')
 router.register(r'break-logs', views.BreakLoglViewSet, basename='break-log')
+router.register(r'notifications', views.NotificationViewSet, basename='notification')
 
 urlpatterns = [
     path('register/', views.register_view, name='register'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('dashboard/', views.dashboard_view, name='dashboard'),
+    path('api/token/', views.ObtainTokenView.as_view(), name='api-token'),
+    path('api/analytics/', views.BreakAnalyticsView.as_view(), name='break-analytics'),
+    path('api/events/', views.reminder_stream_view, name='reminder-events'),
     path('api/', include(router.urls)),
 ]
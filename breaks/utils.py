@@ -1,15 +1,69 @@
 import yaml
 from pathlib import Path
 import logging
+import redis
+import redis.asyncio
 import requests
 import random
+import time
+from contextlib import contextmanager
+from uuid import uuid4
 from django.conf import settings
+from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
 
-def get_reminder_content():
-    file = Path(__file__).parent / "messages.yaml"
+_redis_client = None
+
+
+def get_redis():
+    """Process-wide Redis client for state shared between workers."""
+    global _redis_client
+
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def get_async_redis():
+    """New asyncio Redis client, owned by the caller: asyncio clients are bound to one loop."""
+    return redis.asyncio.Redis.from_url(settings.REDIS_URL)
+
+
+@contextmanager
+def redis_lock(name, timeout):
+    """Non-blocking lock shared by all workers; yields whether it was acquired.
+
+    The lock expires after ``timeout`` seconds so a crashed holder cannot
+    block others forever, and is only released by the worker holding it.
+    """
+    client = get_redis()
+    token = uuid4().hex
+    acquired = client.set(name, token, nx=True, ex=timeout)
+    try:
+        yield bool(acquired)
+    finally:
+        if acquired:
+            with client.pipeline() as pipeline:
+                try:
+                    pipeline.watch(name)
+                    if pipeline.get(name) == token.encode():
+                        pipeline.multi()
+                        pipeline.delete(name)
+                        pipeline.execute()
+                except redis.WatchError:
+                    pass
+
+
+MESSAGES_FILE = Path(__file__).parent / "messages.yaml"
+
+# (path, mtime_ns, variants) of the last successful load of MESSAGES_FILE.
+_reminder_cache = (None, None, None)
+
+
+def load_reminder_variants(file):
+    """Parse and validate a messages file into a list of (subject, message) pairs."""
     try:
         with open(file, encoding="utf-8") as f:
             data = yaml.safe_load(f)
@@ -18,30 +72,150 @@ def get_reminder_content():
         raise
 
     try:
-        subject = data["break_reminder"]["subject"]
-        message = data["break_reminder"]["message"]
-    except (KeyError, TypeError) as e:
+        reminder = data["break_reminder"]
+        entries = [reminder] + list(reminder.get("variants") or [])
+        variants = [(entry["subject"], entry["message"]) for entry in entries]
+    except (KeyError, TypeError, AttributeError) as e:
         logger.error(f"Missing keys in messages.yaml: {e}")
         raise
 
-    return subject, message
+    for subject, message in variants:
+        if not isinstance(subject, str) or not isinstance(message, str):
+            error = ValueError(f"Reminder subject and message must be strings: {subject!r}")
+            logger.error(f"Invalid reminder in messages.yaml: {error}")
+            raise error
 
+    return variants
 
-def fetch_inspirational_quote():
+
+def get_reminder_variants():
+    """Return the cached reminder variants, re-reading the file only when its mtime changes."""
+    global _reminder_cache
+
+    file = MESSAGES_FILE
+    try:
+        mtime = file.stat().st_mtime_ns
+    except FileNotFoundError as e:
+        logger.error(f"Failed to load or parse messages.yaml: {e}")
+        raise
+
+    cached_file, cached_mtime, variants = _reminder_cache
+    if cached_file != file or cached_mtime != mtime:
+        variants = load_reminder_variants(file)
+        _reminder_cache = (file, mtime, variants)
+
+    return variants
+
+
+def get_reminder_content(user_id=None):
+    """Pick the reminder variant for a user (the default reminder when no user is given)."""
+    variants = get_reminder_variants()
+    if user_id is None:
+        return variants[0]
+
+    return variants[user_id % len(variants)]
+
+
+def fetch_inspirational_quotes():
+    """Fetch a batch of quotes from ZenQuotes, formatted as '"quote" - author'."""
     try:
         response = requests.get(settings.ZEN_QUOTES_URL, timeout=5)
         response.raise_for_status()
         data = response.json()
 
         if data and isinstance(data, list):
-            quote_data = random.choice(data)
-            quote = quote_data.get("q")
-            author = quote_data.get("a")
-
-            if quote and author:
-                return f'"{quote}" - {author}'
+            return [
+                f'"{item["q"]}" - {item["a"]}'
+                for item in data
+                if isinstance(item, dict) and item.get("q") and item.get("a")
+            ]
 
     except Exception as e:
         logger.error(f"Failed to fetch quote: {e}")
 
-    return None
+    return []
+
+
+def fetch_inspirational_quote():
+    quotes = fetch_inspirational_quotes()
+    return random.choice(quotes) if quotes else None
+
+
+QUOTE_POOL_KEY = "breaks:quotes"
+QUOTE_FAILURES_KEY = "breaks:quotes:failures"
+QUOTE_CIRCUIT_OPEN_KEY = "breaks:quotes:circuit-open"
+
+
+def refill_quote_pool():
+    """Fetch fresh quotes into the Redis pool and evict expired or excess ones.
+
+    Returns the number of quotes fetched. Consecutive fetch failures open a
+    circuit breaker that skips the quote API until the cooldown expires.
+    """
+    client = get_redis()
+    now = time.time()
+
+    if client.exists(QUOTE_CIRCUIT_OPEN_KEY):
+        logger.warning("Quote API circuit is open, skipping refill")
+        quotes = []
+    else:
+        quotes = fetch_inspirational_quotes()
+        if quotes:
+            client.delete(QUOTE_FAILURES_KEY)
+        else:
+            record_quote_failure(client)
+
+    pipeline = client.pipeline()
+    if quotes:
+        pipeline.zadd(QUOTE_POOL_KEY, {quote: now for quote in quotes})
+    pipeline.zremrangebyscore(QUOTE_POOL_KEY, "-inf", now - settings.QUOTE_POOL_TTL_SECONDS)
+    pipeline.zremrangebyrank(QUOTE_POOL_KEY, 0, -settings.QUOTE_POOL_MAX_SIZE - 1)
+    pipeline.execute()
+
+    return len(quotes)
+
+
+def record_quote_failure(client):
+    failures = client.incr(QUOTE_FAILURES_KEY)
+    client.expire(QUOTE_FAILURES_KEY, settings.QUOTE_CIRCUIT_COOLDOWN_SECONDS)
+
+    if failures >= settings.QUOTE_CIRCUIT_FAILURE_THRESHOLD:
+        client.set(QUOTE_CIRCUIT_OPEN_KEY, 1, ex=settings.QUOTE_CIRCUIT_COOLDOWN_SECONDS)
+        client.delete(QUOTE_FAILURES_KEY)
+        logger.error(f"Quote API failed {failures} times in a row, opening circuit")
+
+
+def get_pooled_quotes(count):
+    """Draw up to ``count`` distinct random quotes from the pool without any HTTP call."""
+    try:
+        quotes = get_redis().zrandmember(QUOTE_POOL_KEY, count)
+    except redis.RedisError as e:
+        logger.error(f"Failed to read quote pool: {e}")
+        return []
+
+    return [quote.decode("utf-8") for quote in quotes or []]
+
+
+def get_pooled_quote():
+    quotes = get_pooled_quotes(1)
+    return quotes[0] if quotes else None
+
+
+USER_CACHE_VERSION_KEY = "breaks:cache-version:{user_id}"
+
+
+def user_cache_key(user_id, name, *parts):
+    """Cache key for data derived from one user's intervals and breaks.
+
+    Keys embed a per-user version, so invalidate_user_caches drops every
+    cached view of a user with one delete; stale entries expire on their own.
+    """
+    version = cache.get_or_set(
+        USER_CACHE_VERSION_KEY.format(user_id=user_id), lambda: uuid4().hex[:8], None
+    )
+    return ":".join(["breaks", name, str(user_id), version, *parts])
+
+
+def invalidate_user_caches(user_ids):
+    """Drop cached dashboards and API responses so they reflect new breaks or intervals."""
+    cache.delete_many([USER_CACHE_VERSION_KEY.format(user_id=user_id) for user_id in user_ids])
@@ -1,15 +1,41 @@
+import hashlib
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from django.contrib.auth import login, logout
+from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
 from django.shortcuts import render, redirect
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 
 from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied, ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .models import BreakInterval, BreakLog
-from .serializers import BreakIntervalSerializer, BreakLogSerializer
-
-from datetime import timedelta
+from .analytics import BUCKETS, DEFAULT_RANGES, MAX_BUCKETS, break_analytics, bucket_count
+from .authentication import SignedTokenAuthentication, issue_token
+from .bulk import import_intervals
+from .events import stream_events
+from .export import EXPORT_FORMATS, export_queryset, iter_rows
+from .filters import DateRangeFilter, parse_moment
+from .models import BreakDailyRollup, BreakInterval, BreakLog, Notification
+from .pagination import KeysetPagination, NotificationPagination
+from .serializers import (
+    BreakDailyRollupSerializer,
+    BreakIntervalSerializer,
+    BreakLogSerializer,
+    NotificationSerializer,
+)
+from .utils import invalidate_user_caches, user_cache_key
 
 
 def register_view(request):
@@ -42,43 +68,247 @@ def logout_view(request):
     return HttpResponse("Logout successful!")
 
 
+class ObtainTokenView(APIView):
+    """Exchange a username and password for a signed API token."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        user = authenticate(
+            request,
+            username=request.data.get('username'),
+            password=request.data.get('password'),
+        )
+        if user is None:
+            raise ValidationError("Unable to log in with the provided credentials.")
+
+        return Response({
+            'token': issue_token(user),
+            'expires_in': settings.API_TOKEN_MAX_AGE_SECONDS,
+        })
+
+
 class BreakIntervalViewSet(viewsets.ModelViewSet):
     serializer_class = BreakIntervalSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return BreakInterval.objects.filter(user=self.request.user)
+        return BreakInterval.objects.filter(user=self.request.user).select_related('user')
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user=self.request.user).reschedule()
+
+    def perform_update(self, serializer):
+        serializer.save().reschedule()
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        """Create or update many users' intervals from a list of ``username``/``interval_minutes``.
+
+        Valid rows are saved even when others fail; rejected rows are listed
+        under ``errors`` by their index in the request.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError("Expected a list of {username, interval_minutes} objects.")
+        if len(rows) > settings.BREAK_INTERVAL_BULK_MAX_ROWS:
+            raise ValidationError(
+                f"At most {settings.BREAK_INTERVAL_BULK_MAX_ROWS} rows per request; "
+                f"use the import_break_intervals command for larger imports."
+            )
+
+        return Response(import_intervals(rows))
 
 
 class BreakLoglViewSet(viewsets.ModelViewSet):
     serializer_class = BreakLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [DateRangeFilter]
 
     def get_queryset(self):
-        return BreakLog.objects.filter(user=self.request.user).order_by('-triggered_at')
+        return (
+            BreakLog.objects.filter(user=self.request.user)
+            .select_related('user')
+            .order_by('-triggered_at', '-id')
+        )
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        invalidate_user_caches([instance.user_id])
+
+    @action(detail=False, pagination_class=None)
+    def daily(self, request):
+        """Breaks per day from the daily rollups, which outlive pruned raw logs."""
+        def build():
+            rollups = BreakDailyRollup.objects.filter(user=request.user).order_by('day')
+            rollups = DateRangeFilter('day').filter_queryset(request, rollups, self)
+            return BreakDailyRollupSerializer(rollups, many=True).data
+
+        return Response(cached_for_user(request, 'daily', build))
+
+    @action(detail=False, pagination_class=None)
+    def export(self, request):
+        """Stream the full history as ``?output=csv`` (default) or ``ndjson``.
+
+        Staff can pass ``?all_users=1`` to export every user's logs. The
+        ``since``/``until`` filters apply as for the list.
+        """
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({'output': f"Choose one of: {', '.join(EXPORT_FORMATS)}."})
+
+        user = request.user
+        if request.query_params.get('all_users'):
+            if not user.is_staff:
+                raise PermissionDenied("Only staff can export all users' break logs.")
+            user = None
+        queryset = export_queryset(self.filter_queryset(BreakLog.objects.all()), user)
+
+        stream, content_type = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(stream(iter_rows(queryset)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="break-logs.{output}"'
+        return response
+
+
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    """In-app reminders, newest first; ``?unread=1`` lists only unread ones."""
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = NotificationPagination
+
+    def get_queryset(self):
+        notifications = Notification.objects.filter(user=self.request.user)
+        if self.action == 'list' and self.request.query_params.get('unread'):
+            notifications = notifications.filter(read_at=None)
+        return notifications.order_by('-created_at', '-id')
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        notification = self.get_object()
+        if notification.read_at is None:
+            notification.read_at = timezone.now()
+            notification.save(update_fields=['read_at'])
+        return Response(self.get_serializer(notification).data)
+
+    @action(detail=False, methods=['post'], url_path='read-all')
+    def read_all(self, request):
+        updated = Notification.objects.filter(user=request.user, read_at=None).update(
+            read_at=timezone.now()
+        )
+        return Response({'read': updated})
+
+
+class BreakAnalyticsView(APIView):
+    """Bucketed break counts, streaks and adherence to the configured interval.
+
+    Query parameters: ``bucket`` (hour, day or week), ``since`` and ``until``
+    (ISO 8601; default to a bucket-dependent window ending now). Staff can
+    pass ``all_users=1`` to aggregate across every user.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in BUCKETS:
+            raise ValidationError({'bucket': f"Choose one of: {', '.join(BUCKETS)}."})
+
+        until = self.get_moment(request, 'until') or timezone.now()
+        since = self.get_moment(request, 'since') or until - DEFAULT_RANGES[bucket]
+        if bucket_count(since, until, bucket) > MAX_BUCKETS:
+            raise ValidationError(f"Ranges are limited to {MAX_BUCKETS} {bucket} buckets.")
+
+        user = request.user
+        if request.query_params.get('all_users'):
+            if not user.is_staff:
+                raise PermissionDenied("Only staff can view analytics for all users.")
+            user = None
+
+        return Response(cached_for_user(
+            request, 'analytics', lambda: break_analytics(since, until, bucket, user)
+        ))
+
+    @staticmethod
+    def get_moment(request, param):
+        value = request.query_params.get(param)
+        if not value:
+            return None
+        moment = parse_moment(value)
+        if moment is None:
+            raise ValidationError({param: 'Enter a valid ISO 8601 date or datetime.'})
+        return moment
+
+
+@require_GET
+async def reminder_stream_view(request):
+    """Server-sent events stream of the user's reminders, served by the ASGI app.
+
+    Authenticates with the session or a Bearer token; browsers' EventSource,
+    which cannot set headers, may pass the token as ``?token=``.
+    """
+    user = await stream_user(request)
+    if user is None:
+        return JsonResponse({'detail': "Authentication credentials were not provided."}, status=401)
+
+    response = StreamingHttpResponse(stream_events(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def stream_user(request):
+    header = request.headers.get('Authorization', '')
+    keyword = f"{SignedTokenAuthentication.keyword} "
+    token = header[len(keyword):] if header.startswith(keyword) else request.GET.get('token')
+    if token:
+        try:
+            return await sync_to_async(SignedTokenAuthentication().authenticate_token)(token)
+        except AuthenticationFailed:
+            return None
+
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def cached_for_user(request, name, build, timeout=None):
+    """Return ``build()``, cached per user and query string until the user's data changes."""
+    query = hashlib.sha1(urlencode(sorted(request.GET.lists()), doseq=True).encode()).hexdigest()
+    key = user_cache_key(request.user.id, name, query)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, settings.API_CACHE_SECONDS if timeout is None else timeout)
+    return data
 
 
 def dashboard_view(request):
-    logs_qs = BreakLog.objects.filter(user=request.user)
-    logs = logs_qs.order_by('-triggered_at')[:5]
-    total_breaks = logs_qs.count()
+    context = cached_for_user(
+        request, 'dashboard', lambda: build_dashboard_context(request.user),
+        timeout=settings.DASHBOARD_CACHE_SECONDS,
+    )
+    return render(request, 'dashboard.html', context)
 
-    interval = BreakInterval.objects.filter(user=request.user).first()
-    last_break = logs.first() if interval else None
 
-    if interval and last_break:
-        next_break = last_break.triggered_at + timedelta(minutes=interval.interval_minutes)
-    else:
+def build_dashboard_context(user):
+    """Dashboard data from the user's stats and interval rows, never counting BreakLog."""
+    user = User.objects.select_related('break_stats', 'breakinterval').get(pk=user.pk)
+    logs = BreakLog.objects.filter(user=user).order_by('-triggered_at')[:5]
+
+    try:
+        total_breaks = user.break_stats.total_breaks
+    except ObjectDoesNotExist:
+        total_breaks = 0
+
+    try:
+        next_break = user.breakinterval.next_due_at
+    except ObjectDoesNotExist:
         next_break = None
 
-    context = {
-        'break_logs': logs,
+    return {
+        'break_logs': [{'triggered_at': triggered_at}
+                       for triggered_at in logs.values_list('triggered_at', flat=True)],
         'total_breaks': total_breaks,
         'next_break': next_break,
-        'username': request.user.get_full_name() or request.user.username,
+        'username': user.get_full_name() or user.username,
     }
-
-    return render(request, 'dashboard.html', context)
@@ -0,0 +1,92 @@
+"""
+Working hours in a user's own timezone.
+
+A user's working time is a daily window from ``work_start`` to ``work_end``
+(local wall-clock times; a window ending at or before its start runs past
+midnight) on the weekdays set in the ``work_days`` bitmask, where bit 0 is
+Monday. Without a window, working days are worked around the clock.
+
+Reminders are never evaluated against these rules at dispatch time: each
+reschedule moves next_due_at to the first working moment, so the indexed
+``next_due_at <= now`` query only ever finds users who are at work.
+"""
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, available_timezones
+
+from django.core.exceptions import ValidationError
+
+ALL_DAYS = 0b1111111
+WEEKDAYS = 0b0011111
+DAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    return ZoneInfo(name)
+
+
+def validate_timezone(value):
+    if value not in available_timezones():
+        raise ValidationError(f"{value} is not a known IANA timezone.")
+
+
+def days_to_mask(days):
+    mask = 0
+    for day in days:
+        mask |= 1 << day
+    return mask
+
+
+def mask_to_days(mask):
+    return [day for day in range(7) if mask & (1 << day)]
+
+
+def next_working_time(moment, zone_name, work_start, work_end, work_days):
+    """The earliest time at or after ``moment`` within working hours; None if there is none."""
+    if not work_days & ALL_DAYS:
+        return None
+    if work_start is None:
+        work_start = work_end = time.min
+
+    zone = get_zone(zone_name)
+    local = moment.astimezone(zone)
+    # Start a day early: yesterday's window may run past midnight into today.
+    for offset in range(-1, 8):
+        day = local.date() + timedelta(days=offset)
+        if not work_days & (1 << day.weekday()):
+            continue
+        start = datetime.combine(day, work_start, tzinfo=zone)
+        end_day = day if work_end > work_start else day + timedelta(days=1)
+        end = datetime.combine(end_day, work_end, tzinfo=zone)
+        if local < start:
+            return start.astimezone(moment.tzinfo)
+        if local < end:
+            return moment
+    return None
+
+
+def working_time(since, until, zone_name, work_start, work_end, work_days):
+    """How much of the span from ``since`` to ``until`` falls within working hours."""
+    if until <= since:
+        return timedelta(0)
+    if work_start is None:
+        if work_days & ALL_DAYS == ALL_DAYS:
+            return until - since
+        work_start = work_end = time.min
+
+    zone = get_zone(zone_name)
+    since, until = since.astimezone(dt_timezone.utc), until.astimezone(dt_timezone.utc)
+    total = timedelta(0)
+    # As in next_working_time, the day before may run past midnight into the span.
+    day = since.astimezone(zone).date() - timedelta(days=1)
+    while day <= until.astimezone(zone).date():
+        if work_days & (1 << day.weekday()):
+            end_day = day if work_end > work_start else day + timedelta(days=1)
+            # Subtract in UTC: wall-clock differences are off across a DST change.
+            start = datetime.combine(day, work_start, tzinfo=zone).astimezone(dt_timezone.utc)
+            end = datetime.combine(end_day, work_end, tzinfo=zone).astimezone(dt_timezone.utc)
+            total += max(min(end, until) - max(start, since), timedelta(0))
+        day += timedelta(days=1)
+    return total
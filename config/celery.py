@@ -17,4 +17,20 @@ app.conf.beat_schedule = {
         'task': 'breaks.tasks.check_and_schedule_breaks',
         'schedule': crontab(minute='*/1'),
     },
+    'refill-quote-pool': {
+        'task': 'breaks.tasks.refill_quotes',
+        'schedule': crontab(minute='*/5'),
+    },
+    'flush-break-log-buffer': {
+        'task': 'breaks.tasks.flush_break_log_buffer',
+        'schedule': crontab(minute='*/1'),
+    },
+    'rollup-break-logs': {
+        'task': 'breaks.tasks.rollup_break_logs',
+        'schedule': crontab(minute='*/15'),
+    },
+    'prune-break-logs': {
+        'task': 'breaks.tasks.prune_old_break_logs',
+        'schedule': crontab(hour=3, minute=30),
+    },
 }
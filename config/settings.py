@@ -15,6 +15,7 @@ from pathlib import Path
 # Load environment variables from .env file
 import os
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -81,12 +82,52 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgres is meant for production: many Celery workers and web
+# processes writing BreakLog rows concurrently. SQLite is fine for development.
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "postgres":
+    # With DB_POOL_MAX_SIZE > 0 every process (web worker or Celery child) keeps a
+    # psycopg pool of up to that many connections. Django's pool cannot be combined
+    # with persistent connections, so CONN_MAX_AGE only applies without a pool.
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 0))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("DB_NAME", "breaks"),
+            'USER': os.getenv("DB_USER", "breaks"),
+            'PASSWORD': os.getenv("DB_PASSWORD", ""),
+            'HOST': os.getenv("DB_HOST", "localhost"),
+            'PORT': os.getenv("DB_PORT", "5432"),
+            'CONN_MAX_AGE': 0 if DB_POOL_MAX_SIZE else int(os.getenv("DB_CONN_MAX_AGE", 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+                    'max_size': DB_POOL_MAX_SIZE,
+                    'timeout': int(os.getenv("DB_POOL_TIMEOUT", 10)),
+                },
+            } if DB_POOL_MAX_SIZE else {},
+        }
     }
-}
+elif DB_ENGINE == "sqlite":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv("DB_NAME", BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # WAL lets readers run alongside the single writer, and IMMEDIATE
+                # transactions take the write lock up front instead of failing with
+                # "database is locked" when a read transaction tries to upgrade.
+                'init_command': "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+                'transaction_mode': 'IMMEDIATE',
+                # Seconds a writer waits for the lock before "database is locked".
+                'timeout': 20,
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unsupported DB_ENGINE {DB_ENGINE!r}; use 'sqlite' or 'postgres'.")
 
 
 # Password validation
@@ -137,9 +178,15 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
+        'breaks.authentication.SignedTokenAuthentication',
     ],
 }
 
+# Signed API tokens from /api/token/ (see breaks.authentication).
+API_TOKEN_MAX_AGE_SECONDS = int(os.getenv("API_TOKEN_MAX_AGE_SECONDS", 30 * 24 * 3600))
+# Verified token -> user entries are cached this long; 0 verifies every request.
+API_TOKEN_CACHE_SECONDS = int(os.getenv("API_TOKEN_CACHE_SECONDS", 300))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -169,18 +216,140 @@ LOGGING = {
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
+REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
+
+# Cache: shared Redis cache (on its own database) with sessions cached in it,
+# or per-process local memory when USE_REDIS_CACHE is off, e.g. in tests.
+USE_REDIS_CACHE = os.getenv("USE_REDIS_CACHE", "False") == "True"
+REDIS_CACHE_DB = int(os.getenv("REDIS_CACHE_DB", 1))
+
+if USE_REDIS_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_CACHE_DB}",
+        }
+    }
+    # Sessions are read from the cache and written through to the database.
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 # Celery settings
-CELERY_BROKER_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
+CELERY_BROKER_URL = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Scheduling and delivery have their own queues (and workers, see docker-compose.yml),
+# so a backlog of reminder batches never holds up the scheduler's beat tasks.
+BREAK_SCHEDULING_QUEUE = 'scheduling'
+BREAK_DELIVERY_QUEUE = 'delivery'
+CELERY_TASK_ROUTES = {
+    'breaks.tasks.check_and_schedule_breaks': {'queue': BREAK_SCHEDULING_QUEUE},
+    'breaks.tasks.schedule_breaks_shard': {'queue': BREAK_SCHEDULING_QUEUE},
+    'breaks.tasks.send_break_reminder': {'queue': BREAK_DELIVERY_QUEUE},
+    'breaks.tasks.send_break_reminders_batch': {'queue': BREAK_DELIVERY_QUEUE},
+    'breaks.tasks.retry_reminder_delivery': {'queue': BREAK_DELIVERY_QUEUE},
+}
+# Batches wait in the broker rather than prefetched behind a slow one.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 
 # Email configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Reminders go through a per-process pool of reused connections to EMAIL_POOL_BACKEND.
+EMAIL_BACKEND = 'breaks.mail.PooledEmailBackend'
 EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
 EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "True") == "True"
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
+EMAIL_POOL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_POOL_MAX_CONNECTIONS = int(os.getenv("EMAIL_POOL_MAX_CONNECTIONS", 2))
+EMAIL_POOL_MAX_IDLE_SECONDS = int(os.getenv("EMAIL_POOL_MAX_IDLE_SECONDS", 300))
+EMAIL_POOL_BATCH_SIZE = int(os.getenv("EMAIL_POOL_BATCH_SIZE", 100))
+# Outbound mail shares one Redis token bucket across all workers: at most
+# EMAIL_RATE_LIMIT_PER_SECOND on average, in bursts of up to EMAIL_RATE_LIMIT_BURST.
+# 0 disables the limit.
+EMAIL_RATE_LIMIT_PER_SECOND = float(os.getenv("EMAIL_RATE_LIMIT_PER_SECOND", 0))
+EMAIL_RATE_LIMIT_BURST = int(os.getenv("EMAIL_RATE_LIMIT_BURST", 50))
 
 ZEN_QUOTES_URL = os.getenv("ZEN_QUOTES_URL")
+
+# Quote pool: reminders draw from quotes prefetched into Redis by a periodic task
+QUOTE_POOL_TTL_SECONDS = int(os.getenv("QUOTE_POOL_TTL_SECONDS", 86400))
+QUOTE_POOL_MAX_SIZE = int(os.getenv("QUOTE_POOL_MAX_SIZE", 500))
+QUOTE_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("QUOTE_CIRCUIT_FAILURE_THRESHOLD", 3))
+QUOTE_CIRCUIT_COOLDOWN_SECONDS = int(os.getenv("QUOTE_CIRCUIT_COOLDOWN_SECONDS", 900))
+
+# Break scheduling
+BREAK_SCHEDULE_BATCH_SIZE = int(os.getenv("BREAK_SCHEDULE_BATCH_SIZE", 5000))
+# "sweep" scans the next_due_at index every beat tick; "queue" keeps users in a
+# Redis sorted set by due time and only pops expired entries (see run_break_dispatcher).
+BREAK_SCHEDULER_MODE = os.getenv("BREAK_SCHEDULER_MODE", "sweep")
+BREAK_DISPATCH_LEASE_SECONDS = int(os.getenv("BREAK_DISPATCH_LEASE_SECONDS", 300))
+# With more than one shard, every tick fans out into parallel per-shard sweeps.
+BREAK_SCHEDULER_SHARDS = int(os.getenv("BREAK_SCHEDULER_SHARDS", 1))
+BREAK_SCHEDULER_LOCK_SECONDS = int(os.getenv("BREAK_SCHEDULER_LOCK_SECONDS", 55))
+BREAK_REMINDER_CHUNK_SIZE = int(os.getenv("BREAK_REMINDER_CHUNK_SIZE", 100))
+# The scheduler only enqueues as many batches as keep the delivery queue at or
+# below this depth, and defers the rest to its next tick. 0 disables the limit.
+BREAK_DELIVERY_MAX_QUEUE_DEPTH = int(os.getenv("BREAK_DELIVERY_MAX_QUEUE_DEPTH", 50))
+# "sync" sends batches through EMAIL_BACKEND; "async" drives up to BREAK_ASYNC_CONCURRENCY
+# SMTP connections from one asyncio loop per worker process, kept open between batches
+# for EMAIL_POOL_MAX_IDLE_SECONDS.
+BREAK_DELIVERY_MODE = os.getenv("BREAK_DELIVERY_MODE", "sync")
+BREAK_ASYNC_CONCURRENCY = int(os.getenv("BREAK_ASYNC_CONCURRENCY", 50))
+# Reminders that fail on a channel are retried on it up to BREAK_DELIVERY_MAX_RETRIES
+# times, after a backoff doubling from BREAK_DELIVERY_RETRY_BASE_SECONDS (with jitter),
+# then kept in the DeadLetter table for replay_dead_letters. Keep the cap under the
+# broker's one-hour visibility timeout, past which Redis redelivers a waiting retry.
+BREAK_DELIVERY_MAX_RETRIES = int(os.getenv("BREAK_DELIVERY_MAX_RETRIES", 5))
+BREAK_DELIVERY_RETRY_BASE_SECONDS = int(os.getenv("BREAK_DELIVERY_RETRY_BASE_SECONDS", 30))
+BREAK_DELIVERY_RETRY_MAX_SECONDS = int(os.getenv("BREAK_DELIVERY_RETRY_MAX_SECONDS", 1800))
+
+# Reminder channels users can choose from, by name. Each transport sends whole
+# batches; remote channels of one batch are sent in parallel.
+NOTIFICATION_TRANSPORTS = {
+    'email': 'breaks.notifications.EmailTransport',
+    'webhook': 'breaks.notifications.WebhookTransport',
+    'in_app': 'breaks.notifications.InAppTransport',
+}
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", 20))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", 5))
+
+# Live reminder streams (/api/events/, served by the ASGI app): idle streams get
+# a keep-alive comment this often, and a stream that stops reading drops events
+# beyond EVENT_STREAM_QUEUE_SIZE. Clients reconnect after EVENT_STREAM_RETRY_MS.
+EVENT_STREAM_HEARTBEAT_SECONDS = float(os.getenv("EVENT_STREAM_HEARTBEAT_SECONDS", 15))
+EVENT_STREAM_QUEUE_SIZE = int(os.getenv("EVENT_STREAM_QUEUE_SIZE", 100))
+EVENT_STREAM_RETRY_MS = int(os.getenv("EVENT_STREAM_RETRY_MS", 5000))
+
+# "direct" inserts BreakLog rows in the reminder task; "buffered" queues them in
+# Redis for run_break_log_flusher to bulk insert every BREAK_LOG_FLUSH_INTERVAL_MS
+# or as soon as BREAK_LOG_FLUSH_BATCH_SIZE events are waiting.
+BREAK_LOG_WRITE_MODE = os.getenv("BREAK_LOG_WRITE_MODE", "direct")
+BREAK_LOG_FLUSH_BATCH_SIZE = int(os.getenv("BREAK_LOG_FLUSH_BATCH_SIZE", 1000))
+BREAK_LOG_FLUSH_INTERVAL_MS = int(os.getenv("BREAK_LOG_FLUSH_INTERVAL_MS", 500))
+
+# Rendered dashboard context and per-user API responses (daily totals,
+# analytics) are cached for this long; they are also dropped whenever the
+# user's breaks or interval change.
+DASHBOARD_CACHE_SECONDS = int(os.getenv("DASHBOARD_CACHE_SECONDS", 30))
+API_CACHE_SECONDS = int(os.getenv("API_CACHE_SECONDS", 60))
+
+# Rows fetched per database round trip by streaming break-log exports.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+
+# Bulk interval imports are written this many rows per transaction; the bulk
+# API endpoint accepts at most BREAK_INTERVAL_BULK_MAX_ROWS rows per request.
+BREAK_INTERVAL_IMPORT_CHUNK_SIZE = int(os.getenv("BREAK_INTERVAL_IMPORT_CHUNK_SIZE", 1000))
+BREAK_INTERVAL_BULK_MAX_ROWS = int(os.getenv("BREAK_INTERVAL_BULK_MAX_ROWS", 10000))
+
+# Break history retention: raw BreakLog rows older than this many days are
+# pruned once rolled up into daily totals (0 keeps them forever). With an
+# archive directory, pruned rows are first written there as gzipped NDJSON.
+BREAK_LOG_RETENTION_DAYS = int(os.getenv("BREAK_LOG_RETENTION_DAYS", 365))
+BREAK_LOG_PRUNE_BATCH_SIZE = int(os.getenv("BREAK_LOG_PRUNE_BATCH_SIZE", 5000))
+BREAK_LOG_ARCHIVE_DIR = os.getenv("BREAK_LOG_ARCHIVE_DIR", "")
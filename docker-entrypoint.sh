@@ -8,6 +8,16 @@ done
 
 echo "Redis started"
 
+if [ "$DB_ENGINE" = "postgres" ]; then
+  echo "Waiting for PostgreSQL..."
+
+  while ! nc -z "${DB_HOST:-db}" "${DB_PORT:-5432}"; do
+    sleep 1
+  done
+
+  echo "PostgreSQL started"
+fi
+
 python manage.py migrate
 
 python create_superuser.py